@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event
+from dataregistry import DataRegistry
+from dataregistry.schema import DEFAULT_NAMESPACE
+
+"""
+A script to count the database round trips (statements executed and
+commits) made by `DatasetTable.register()`.
+
+Datasets are registered into the database of the given config (use a test
+database, the entries are left in place), for a few typical cases:
+    - "copy"      : a file copied in from an `old_location`, with keywords
+    - "bump"      : as "copy", with the version bumped (`version="patch"`)
+    - "meta_only" : no data, only metadata
+"""
+
+parser = argparse.ArgumentParser(
+    description="Count the round trips made by DatasetTable.register()",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+parser.add_argument("--config", help="Path to the data registry config file")
+parser.add_argument("--namespace", default=DEFAULT_NAMESPACE)
+parser.add_argument("--schema", help="Schema to connect to (bypasses namespace)")
+parser.add_argument(
+    "--root_dir", help="root_dir to copy data to, default is a temporary directory"
+)
+parser.add_argument(
+    "--num", type=int, default=20, help="Datasets registered per case"
+)
+parser.add_argument(
+    "--keywords", nargs="*", default=["simulation", "observation"],
+    help="Keywords to tag the datasets with (must be registered)",
+)
+args = parser.parse_args()
+
+tmp_dir = tempfile.TemporaryDirectory()
+root_dir = args.root_dir or os.path.join(tmp_dir.name, "root_dir")
+os.makedirs(root_dir, exist_ok=True)
+
+src = os.path.join(tmp_dir.name, "source.txt")
+with open(src, "w") as f:
+    f.write("benchmark data")
+
+datareg = DataRegistry(
+    config_file=args.config,
+    namespace=args.namespace,
+    schema=args.schema,
+    root_dir=root_dir,
+)
+engine = datareg.db_connection.engine
+
+counts = {"statements": 0, "commits": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counts["statements"] += 1
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    counts["commits"] += 1
+
+
+tag = f"{os.getpid()}_{int(time.time())}"
+cases = {
+    "copy": lambda i: dict(
+        name=f"benchmark_register_copy_{tag}_{i}",
+        version="1.0.0",
+        old_location=src,
+        keywords=args.keywords,
+    ),
+    "bump": lambda i: dict(
+        name=f"benchmark_register_bump_{tag}",
+        version="patch",
+        old_location=src,
+        keywords=args.keywords,
+    ),
+    "meta_only": lambda i: dict(
+        name=f"benchmark_register_meta_{tag}_{i}",
+        version="1.0.0",
+        location_type="meta_only",
+    ),
+}
+
+print(f"{'case':<10} {'statements':>10} {'commits':>8} {'ms':>8}  (per register)")
+for case, spec in cases.items():
+    counts["statements"] = counts["commits"] = 0
+    tic = time.time()
+    for i in range(args.num):
+        datareg.Registrar.dataset.register(**spec(i))
+    elapsed = time.time() - tic
+    print(
+        f"{case:<10} {counts['statements']/args.num:>10.1f} "
+        f"{counts['commits']/args.num:>8.1f} {1000*elapsed/args.num:>8.1f}"
+    )
@@ -3,6 +3,7 @@ import pandas as pd
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     DateTime,
     Boolean,
@@ -40,12 +41,14 @@ The schema contains the following six tables:
     - "provenance"      : Contains information about the database/schema
     - "keyword"         : A list of keywords that can be tagged to datasets
     - "dataset_keyword" : Many-many link between keywords and datasets
+    - "dataset_manifest": Per-file manifest of the data ingested for datasets
 """
 
 # Conversion from string types in `schema.yaml` to SQLAlchemy
 _TYPE_TRANSLATE = {
     "String": String,
     "Integer": Integer,
+    "BigInteger": BigInteger,
     "DateTime": DateTime,
     "StringShort": String(20),
     "StringLong": String(250),
@@ -153,7 +156,9 @@ def _get_table_metadata(schema, table):
     if "indexs" in schema_data[table].keys():
         for index_att in schema_data[table]["indexs"].keys():
             table_args.append(
-                Index(*schema_data[table]["indexs"][index_att]["index_list"])
+                Index(
+                    index_att, *schema_data[table]["indexs"][index_att]["index_list"]
+                )
             )
 
     # Handle unique constraints
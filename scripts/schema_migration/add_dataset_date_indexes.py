@@ -0,0 +1,63 @@
+import os
+import argparse
+from sqlalchemy import text
+from dataregistry.db_basic import DbConnection
+from dataregistry.db_basic import _insert_provenance
+from dataregistry.schema.schema_version import (
+    _DB_VERSION_MAJOR,
+    _DB_VERSION_MINOR,
+    _DB_VERSION_PATCH,
+    _DB_VERSION_COMMENT
+)
+
+parser = argparse.ArgumentParser(
+    description="Update specified schema, using specified config, adding indexes on dataset.register_date and dataset.delete_date (for `as_of` queries)",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+parser.add_argument("schema",
+                    help="name of schema whose tables are to be modified.")
+
+home = os.getenv('HOME')
+alt_config = os.path.join(home, '.config_100_alt_admin')
+parser.add_argument("--config", help="Path to the data registry config file. Determines database (regular or alt) to be modified", default=alt_config)
+args = parser.parse_args()
+
+if args.schema.endswith('production'):
+    assoc_production = args.schema
+    entry_mode = 'production'
+elif args.schema.endswith('working'):
+    assoc_production = args.schema.replace('working', 'production')
+    entry_mode = 'working'
+else:
+    raise ValueError('Schema name must end with "production" or "working"')
+
+query_mode = entry_mode
+
+db_connection = DbConnection(schema=args.schema, config_file=args.config,
+                             entry_mode=entry_mode, query_mode=query_mode)
+
+# Older schemas were created with the `dataset_index` index misnamed after
+# its first column, which then ended up on (owner, owner_type) only
+statements = [
+    f"drop index if exists {args.schema}.relative_path",
+    f"create index if not exists dataset_index on {args.schema}.dataset (relative_path, owner, owner_type)",
+    f"create index if not exists dataset_register_date_index on {args.schema}.dataset (register_date)",
+    f"create index if not exists dataset_delete_date_index on {args.schema}.dataset (delete_date)",
+]
+
+with db_connection.engine.connect() as conn:
+    for stmt in statements:
+        print("To be executed: ", stmt)
+        conn.execute(text(stmt))
+    conn.commit()
+
+# If we got this far add a row to the provenance table
+_insert_provenance(
+    db_connection,
+    _DB_VERSION_MAJOR,
+    _DB_VERSION_MINOR,
+    _DB_VERSION_PATCH,
+    "MIGRATE",
+    comment=_DB_VERSION_COMMENT,
+    associated_production=assoc_production
+)
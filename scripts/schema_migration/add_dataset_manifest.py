@@ -0,0 +1,97 @@
+import os
+import argparse
+from sqlalchemy import text
+from dataregistry.db_basic import DbConnection
+from dataregistry.db_basic import _insert_provenance
+from dataregistry.schema.schema_version import (
+    _DB_VERSION_MAJOR,
+    _DB_VERSION_MINOR,
+    _DB_VERSION_PATCH,
+    _DB_VERSION_COMMENT
+)
+
+parser = argparse.ArgumentParser(
+    description="Update specified schema, using specified config, adding the dataset_manifest table (per-file manifest of ingested data)",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+parser.add_argument("schema",
+                    help="name of schema whose tables are to be modified.")
+parser.add_argument("--no-permission-restrictions", action="store_true")
+
+home = os.getenv('HOME')
+alt_config = os.path.join(home, '.config_100_alt_admin')
+parser.add_argument("--config", help="Path to the data registry config file. Determines database (regular or alt) to be modified", default=alt_config)
+args = parser.parse_args()
+
+if args.schema.endswith('production'):
+    assoc_production = args.schema
+    entry_mode = 'production'
+elif args.schema.endswith('working'):
+    assoc_production = args.schema.replace('working', 'production')
+    entry_mode = 'working'
+else:
+    raise ValueError('Schema name must end with "production" or "working"')
+
+query_mode = entry_mode
+
+db_connection = DbConnection(schema=args.schema, config_file=args.config,
+                             entry_mode=entry_mode, query_mode=query_mode)
+
+manifest_cols = [
+    "dataset_manifest_id integer primary key generated by default as identity",
+    f"dataset_id integer not null references {args.schema}.dataset(dataset_id)",
+    "relative_path character varying not null",
+    "size bigint not null",
+    "mtime timestamp not null",
+    "digest character varying",
+    "digest_type character varying(20)",
+    "constraint dataset_manifest_unique unique (dataset_id, relative_path)",
+]
+statements = [
+    f"create table if not exists {args.schema}.dataset_manifest ({','.join(manifest_cols)})",
+    f"create index if not exists dataset_manifest_dataset_index on {args.schema}.dataset_manifest (dataset_id)",
+]
+
+with db_connection.engine.connect() as conn:
+    for stmt in statements:
+        print("To be executed: ", stmt)
+        conn.execute(text(stmt))
+    conn.commit()
+
+# Add permissions for the new table
+for acct in ["reg_reader", "reg_writer"]:
+    try:
+        with db_connection.engine.connect() as conn:
+            if (acct == "reg_reader" or entry_mode == "production") and (
+                not args.no_permission_restrictions
+            ):
+                privs = "SELECT"
+            else:
+                privs = "SELECT, INSERT, UPDATE"
+            conn.execute(
+                text(f"GRANT {privs} ON TABLE {args.schema}.dataset_manifest TO {acct}")
+            )
+
+            # Need select access to sequences to create entries
+            if (
+                acct == "reg_writer" and entry_mode != "production"
+            ) or args.no_permission_restrictions:
+                conn.execute(
+                    text(
+                        f"GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA {args.schema} TO {acct}"
+                    )
+                )
+            conn.commit()
+    except Exception:
+        print(f"Could not grant access to {acct} on schema {args.schema}")
+
+# If we got this far add a row to the provenance table
+_insert_provenance(
+    db_connection,
+    _DB_VERSION_MAJOR,
+    _DB_VERSION_MINOR,
+    _DB_VERSION_PATCH,
+    "MIGRATE",
+    comment=_DB_VERSION_COMMENT,
+    associated_production=assoc_production
+)
@@ -22,6 +22,7 @@ class DataRegistry:
         schema=None,
         entry_mode="working",
         query_mode="working",
+        default_projection="full",
     ):
         """
         Primary data registry wrapper class.
@@ -71,6 +72,13 @@ class DataRegistry:
             By default query_mode="working",
             however this can be set to either "production" to search only
             that schema or "both" to search both.
+        default_projection : str, optional
+            Columns of the dataset table returned by `find_datasets` when no
+            `property_names` are given: "full" (default, all non-deferred
+            columns), "standard" (leaving out the large text columns) or
+            "minimal" (only the name, version and owner of the datasets).
+            Deferred columns, such as `access_api_configuration`, are only
+            returned when named explicitly.
         """
 
         # Establish connection to database
@@ -92,7 +100,9 @@ class DataRegistry:
         self.Registrar = self.registrar  # for backward compatibility
 
         # Create query object
-        self.query = Query(self.db_connection, self.root_dir)
+        self.query = Query(
+            self.db_connection, self.root_dir, default_projection=default_projection
+        )
         self.Query = self.query  # for backward compatibility
 
     def _get_root_dir(self, root_dir, site):
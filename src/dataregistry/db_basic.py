@@ -1,11 +1,12 @@
 from sqlalchemy import engine_from_config
 from sqlalchemy.engine import make_url
 from sqlalchemy import MetaData
-from sqlalchemy import column, insert, select
+from sqlalchemy import column, func, insert, select
 import yaml
 import os
 import stat
 import logging
+import time
 from datetime import datetime
 from dataregistry import __version__
 from dataregistry.exceptions import DataRegistryException
@@ -19,6 +20,7 @@ Low-level utility routines and classes for accessing the registry
 __all__ = [
     "DbConnection",
     "add_table_row",
+    "add_table_rows",
 ]
 
 _OTHER_ACCESS = stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP | stat.S_IROTH |\
@@ -26,6 +28,10 @@ _OTHER_ACCESS = stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP | stat.S_IROTH |\
 
 _DEFAULT_LOC_NERSC = "/global/common/software/lsst/dbaccess/dataregistry/data/.writer_config"
 
+# Keywords cached by `DbConnection.get_keywords()` are reloaded after this
+# many seconds
+_KEYWORD_CACHE_TTL = 300
+
 
 def _get_dataregistry_config(logger, config_file=None):
     """
@@ -109,6 +115,103 @@ def add_table_row(conn, table_meta, values, commit=True):
     return result.inserted_primary_key[0]
 
 
+def add_table_rows(conn, table_meta, rows, commit=True):
+    """
+    Insert many rows into a table, returning their primary keys.
+
+    On Postgres this is a multi-row INSERT ... RETURNING, with the keys
+    sorted to match `rows`. sqlite cannot guarantee the order of the returned
+    keys for reflected tables, so there the rows are inserted one at a time
+    (within the same transaction).
+
+    Parameters
+    ----------
+    conn : SQLAlchemy Connection object
+        Connection to the database
+    table_meta : SqlAlchemy Metadata object
+        Table we are inserting data into
+    rows : list[dict]
+        Properties to be entered for each row (all with the same keys)
+    commit : bool, optional
+        True to commit changes to database (default True)
+
+    Returns
+    -------
+    - : list[int]
+        Primary key for each new row, in the order of `rows`
+    """
+
+    if len(rows) == 0:
+        return []
+
+    if conn.dialect.name == "sqlite":
+        keys = [add_table_row(conn, table_meta, r, commit=False) for r in rows]
+    else:
+        pkey = table_meta.primary_key.columns.values()[0]
+        result = conn.execute(
+            insert(table_meta).returning(pkey, sort_by_parameter_order=True), rows
+        )
+        keys = list(result.scalars())
+
+    if commit:
+        conn.commit()
+
+    return keys
+
+
+def _is_unique_violation(error, constraint):
+    """
+    Was an `IntegrityError` caused by a row clashing with the unique
+    constraint `constraint`?
+
+    Postgres reports the name of the constraint. sqlite does not, any unique
+    constraint failure is taken to be `constraint` there.
+
+    Parameters
+    ----------
+    error : sqlalchemy.exc.IntegrityError
+    constraint : str
+        Name of the unique constraint
+
+    Returns
+    -------
+    - : bool
+    """
+
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name == constraint
+    return "UNIQUE constraint failed" in str(error.orig)
+
+
+def _lock_keys(conn, keys):
+    """
+    Serialize the transactions working on the same `keys` (e.g., allocating
+    the next version of a dataset name): the locks taken are held until the
+    current transaction of `conn` commits or rolls back.
+
+    Postgres takes a transaction-level advisory lock per key, in sorted order
+    so that two transactions locking overlapping keys cannot deadlock. sqlite
+    serializes all writers with its database lock, which is taken up front
+    (unless the transaction, having already written, holds it).
+
+    Parameters
+    ----------
+    conn : SQLAlchemy Connection object
+    keys : iterable[str]
+    """
+
+    if conn.dialect.name == "sqlite":
+        if not conn.connection.dbapi_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        return
+
+    for key in sorted(set(keys)):
+        conn.execute(
+            select(func.pg_advisory_xact_lock(func.hashtextextended(key, 0)))
+        )
+
+
 _PQ_AUTH_PREFIX = "postgresql://"
 
 
@@ -256,6 +359,9 @@ class DbConnection:
 
         # Dict to store schema/table information (filled in `_reflect()`)
         self.metadata = {}
+
+        # Keywords of each schema (see `get_keywords()`)
+        self._keyword_cache = {}
         self._creation_mode = creation_mode
 
         # What schema do new entries go into?
@@ -603,6 +709,62 @@ class DbConnection:
             raise ValueError(f"No such table {tbl}")
         return self.metadata["tables"][tbl]
 
+    def get_keywords(self, keywords=None, schema=None):
+        """
+        Look up keywords in the `keyword` table of a schema, through an
+        in-process cache.
+
+        The whole (small) table is loaded with one query, and reloaded once
+        older than `_KEYWORD_CACHE_TTL` seconds, or when a keyword asked for
+        is missing (e.g., it was created by another process). Keywords
+        created, enabled or disabled through this connection clear the cache
+        (see `_invalidate_keywords()`), changes made by other processes to
+        existing keywords may take up to the TTL to be seen.
+
+        Parameters
+        ----------
+        keywords : list[str], optional
+            The (lower case) keywords to look up, by default all of them
+        schema : str, optional
+            Which schema the keywords are from (see `get_table()`)
+
+        Returns
+        -------
+        found : dict[str, sqlalchemy Row object]
+            For each registered keyword, its `keyword_id` and `active` status
+            (in `keyword_id` order). Keywords that are not registered are
+            missing from the dict.
+        """
+
+        keyword_table = self.get_table("keyword", schema)
+        cached = self._keyword_cache.get(keyword_table.fullname)
+        if (
+            cached is None
+            or time.monotonic() > cached[0]
+            or (keywords is not None and not all(k in cached[1] for k in keywords))
+        ):
+            stmt = select(
+                keyword_table.c.keyword,
+                keyword_table.c.keyword_id,
+                keyword_table.c.active,
+            ).order_by(keyword_table.c.keyword_id)
+            with self._engine.connect() as conn:
+                rows = {r.keyword: r for r in conn.execute(stmt)}
+            cached = (time.monotonic() + _KEYWORD_CACHE_TTL, rows)
+            self._keyword_cache[keyword_table.fullname] = cached
+
+        if keywords is None:
+            return dict(cached[1])
+        return {k: cached[1][k] for k in keywords if k in cached[1]}
+
+    def _invalidate_keywords(self):
+        """
+        Clear the keyword cache (see `get_keywords()`), after keywords are
+        created, enabled or disabled.
+        """
+
+        self._keyword_cache = {}
+
 
 def _insert_provenance(
     db_connection,
@@ -728,4 +890,5 @@ def _insert_keyword(
     with db_connection.engine.connect() as conn:
         id = add_table_row(conn, keyword_table, values)
 
-        return id
+    db_connection._invalidate_keywords()
+    return id
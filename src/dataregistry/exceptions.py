@@ -1,7 +1,8 @@
 __all__ = ["DataRegistryException", "DataRegistryNYI",
            "DataRegistryRootDirBadState", "dataRegistryNoEntry",
            "DataRegistryUnmanaged", "DataRegistryColumnSpec",
-           "DataRegistryNoColumn"]
+           "DataRegistryNoColumn", "DataRegistryIngestCancelled",
+           "DataRegistryMissingInputs"]
 
 
 class DataRegistryException(Exception):
@@ -48,3 +49,19 @@ class DataRegistryNoColumn(DataRegistryException):
         msg = f"No such column as {column_spec}."
         self.msg = msg
         super().__init__(self.msg)
+
+
+class DataRegistryIngestCancelled(DataRegistryException):
+    def __init__(self, dataset_id=""):
+        msg = f"Ingest of the data of dataset id {dataset_id} was cancelled"
+        self.msg = msg
+        super().__init__(self.msg)
+
+
+class DataRegistryMissingInputs(DataRegistryException):
+    def __init__(self, missing=None):
+        self.missing = missing or {}
+        msg = "Input datasets do not exist: "
+        msg += ", ".join(f"{k} {v}" for k, v in self.missing.items())
+        self.msg = msg
+        super().__init__(self.msg)
@@ -0,0 +1,150 @@
+from collections import deque, namedtuple
+
+from dataregistry.exceptions import DataRegistryException
+
+__all__ = ["JoinPlanner", "JoinStep"]
+
+# A JoinStep describes one table to bring into a query, joined onto a table
+# already in the query (`parent`) with an explicit ON clause:
+#
+#     <table>.<column> == <parent>.<parent_column>
+JoinStep = namedtuple("JoinStep", ["table", "column", "parent", "parent_column"])
+
+# Allowed directions when joining the `dependency` table to `dataset`
+_DEPENDENCY_DIRECTIONS = ["input", "output"]
+
+
+class JoinPlanner:
+    def __init__(self, schema_yaml, root="dataset"):
+        """
+        Work out how to join tables for multi-table `find_datasets` queries.
+
+        The join graph is built from the foreign keys declared in the
+        `schema.yaml` file. Only foreign keys that stay within the same schema
+        (`foreign_key_schema: "self"`) and do not point back to the same table
+        are used. Every query is rooted at the `root` table (`dataset`), from
+        which the minimal set of joins needed to reach the required tables is
+        found with a breadth-first search.
+
+        Neighbours are always visited in sorted order, so a given set of
+        required tables always results in the same joins, in the same order.
+
+        Parameters
+        ----------
+        schema_yaml : dict
+            The loaded `schema.yaml` file (see `load_schema()`)
+        root : str, optional
+            The table every query starts from
+        """
+
+        self.root = root
+
+        # Adjacency list, table -> list of (other_table, column, other_column)
+        self._edges = {}
+
+        for table, table_def in schema_yaml["tables"].items():
+            self._edges.setdefault(table, [])
+            for column, col_def in table_def["column_definitions"].items():
+                if not col_def["foreign_key"]:
+                    continue
+
+                # Links to the production schema are not joinable here
+                if col_def["foreign_key_schema"] != "self":
+                    continue
+
+                # Self references (e.g., alias -> alias) are not followed
+                if col_def["foreign_key_table"] == table:
+                    continue
+
+                self._add_edge(
+                    table,
+                    column,
+                    col_def["foreign_key_table"],
+                    col_def["foreign_key_column"],
+                )
+
+    def _add_edge(self, table, column, other_table, other_column):
+        """Add an (undirected) join condition between two tables"""
+
+        self._edges.setdefault(table, []).append((other_table, column, other_column))
+        self._edges.setdefault(other_table, []).append(
+            (table, other_column, column)
+        )
+
+    def _get_edges(self, dependency_direction):
+        """
+        Return the adjacency list for a given `dependency_direction`.
+
+        For "input" the `dependency` table joins through
+        `dependency.input_id == dataset.dataset_id`, i.e., the rows describe
+        the executions the dataset was an input to. For "output" it joins
+        through `dependency.execution_id == dataset.execution_id`, i.e., the
+        rows describe the inputs of the execution that produced the dataset.
+        """
+
+        if dependency_direction not in _DEPENDENCY_DIRECTIONS:
+            raise ValueError(
+                f"`dependency_direction` must be one of {_DEPENDENCY_DIRECTIONS}"
+            )
+
+        if dependency_direction == "input":
+            return self._edges
+
+        edges = {
+            t: [
+                e for e in v
+                if {t, e[0]} != {"dependency", self.root}
+            ]
+            for t, v in self._edges.items()
+        }
+        edges["dependency"].append((self.root, "execution_id", "execution_id"))
+        edges[self.root].append(("dependency", "execution_id", "execution_id"))
+        return edges
+
+    def plan(self, tables_required, dependency_direction="input"):
+        """
+        Find the joins needed to connect `tables_required` to the root table.
+
+        Parameters
+        ----------
+        tables_required : list[str]
+            Names of the tables the query needs
+        dependency_direction : str, optional
+            How to join the `dependency` table, "input" (default) or "output"
+
+        Returns
+        -------
+        steps : list[JoinStep]
+            The joins, in the order they should be applied. Tables closer to
+            the root come first. The root itself is not included.
+        """
+
+        edges = self._get_edges(dependency_direction)
+
+        # Breadth-first search from the root, remembering how we got to each
+        # table (and how far away it is)
+        parents = {self.root: None}
+        depth = {self.root: 0}
+        queue = deque([self.root])
+        while queue:
+            table = queue.popleft()
+            for other, column, other_column in sorted(edges.get(table, [])):
+                if other in parents:
+                    continue
+                parents[other] = JoinStep(other, other_column, table, column)
+                depth[other] = depth[table] + 1
+                queue.append(other)
+
+        # Walk back from each required table to the root
+        needed = {}
+        for table in sorted(set(tables_required)):
+            if table not in parents:
+                raise DataRegistryException(
+                    f"No join path from {self.root} to {table}"
+                )
+            step = parents[table]
+            while step is not None and step.table not in needed:
+                needed[step.table] = step
+                step = parents[step.parent]
+
+        return sorted(needed.values(), key=lambda s: (depth[s.table], s.table))
@@ -1,11 +1,31 @@
+import json
 from collections import namedtuple
 
 import pandas as pd
-from sqlalchemy import DateTime, Float, Integer, Numeric, func, select
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Integer,
+    Numeric,
+    distinct,
+    exists,
+    func,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
 from sqlalchemy.exc import DBAPIError
 
 from dataregistry.exceptions import DataRegistryException, DataRegistryColumnSpec, DataRegistryNoEntry, DataRegistryUnmanaged, DataRegistryNoColumn
-from dataregistry.registrar.registrar_util import _form_dataset_path
+from dataregistry.join_planner import JoinPlanner
+from dataregistry.registrar.dataset_util import VALID_STATUS_BITS
+from dataregistry.registrar.registrar_util import (
+    _decompress_configuration,
+    _form_dataset_path,
+)
+from dataregistry.schema import load_schema
 
 __all__ = ["Query", "Filter"]
 
@@ -40,17 +60,99 @@ ILIKE_ALLOWED = [
     "dataset.access_api",
 ]
 
+# Tables whose columns are gathered into lists by `collapse_keywords`
+_KEYWORD_TABLES = ["keyword", "dataset_keyword"]
+
+# Named sets of dataset columns ("projections") `find_datasets` can return in
+# place of a list of columns. "full" is every non-deferred column of the
+# dataset table, the others leave out the large text columns too. Deferred
+# columns (e.g. `access_api_configuration`) are only returned when named.
+_PROJECTIONS = {
+    "minimal": [
+        "dataset.dataset_id",
+        "dataset.name",
+        "dataset.version_string",
+        "dataset.owner",
+        "dataset.owner_type",
+    ],
+}
+_PROJECTIONS["standard"] = _PROJECTIONS["minimal"] + [
+    "dataset.version_major",
+    "dataset.version_minor",
+    "dataset.version_patch",
+    "dataset.relative_path",
+    "dataset.location_type",
+    "dataset.data_org",
+    "dataset.access_api",
+    "dataset.nfiles",
+    "dataset.total_disk_space",
+    "dataset.status",
+    "dataset.creation_date",
+    "dataset.register_date",
+    "dataset.execution_id",
+]
+_PROJECTIONS["full"] = None
+
 
 def is_orderable_type(ctype):
     return isinstance(ctype, ALL_ORDERABLE)
 
 
+def _filter_clause(f, column, orderable):
+    """
+    Render a dataregistry filter as a SQL expression (for a WHERE clause).
+
+    Parameters
+    ----------
+    f : dataregistry filter
+        Logic filter to render
+    column : sqlalchemy Column
+        The column `f` refers to
+    orderable : bool
+        Is the column of an orderable type (see `is_orderable_type`)
+
+    Returns
+    -------
+    - : sqlalchemy expression
+    """
+
+    # Extract the filter operator (also making sure it is an allowed one)
+    if f[1] not in _colops.keys():
+        raise ValueError(f'check_filter: "{f[1]}" is not a supported operator')
+    else:
+        the_op = _colops[f[1]]
+
+    # Make sure the property we are ordering on is orderable
+    if not orderable and f[1] not in ["~==", "~=", "==", "=", "!="]:
+        raise ValueError(f'check_filter: Cannot apply "{f[1]}" to "{f[0]}"')
+    else:
+        value = f[2]
+
+    # String partial matching with wildcard
+    if f[1] in ["~=", "~=="]:
+        if f[0] not in ILIKE_ALLOWED:
+            raise ValueError(f"Can only perform ~= search on {ILIKE_ALLOWED}")
+
+        tmp = value.replace("%", r"\%").replace("_", r"\_").replace("*", "%")
+
+        # Case insensitive wildcard matching (wildcard is '*')
+        if f[1] == "~=":
+            return column.ilike(tmp, escape="\\")
+        # Case sensitive wildcard matching (wildcard is '*')
+        else:
+            return column.like(tmp, escape="\\")
+
+    # General case using traditional boolean operator
+    else:
+        return column.__getattribute__(the_op)(value)
+
+
 class Query:
     """
     Class implementing supported queries
     """
 
-    def __init__(self, db_connection, root_dir):
+    def __init__(self, db_connection, root_dir, default_projection="full"):
         """
         Create a new Query object. Note this call should be preceded
         by creation of a DbConnection object
@@ -62,6 +164,10 @@ class Query:
             and schema version
         root_dir : str
             Used to form absolute path of dataset
+        default_projection : str, optional
+            Projection ("minimal", "standard" or "full") returned by
+            `find_datasets` when no `property_names` are given. Deferred
+            columns are only returned when named explicitly
         """
         self.db_connection = db_connection
         self.db_connection._reflect()
@@ -70,6 +176,7 @@ class Query:
         self._dialect = db_connection.dialect
         self._schema = db_connection.schema
         self._root_dir = root_dir
+        self.default_projection = default_projection
 
         # Helper dict for aggregate functions
         self.agg_funcs = {
@@ -83,6 +190,52 @@ class Query:
         for tbl in tbls:
             self._schema_org[tbl] = self.get_all_columns(table=tbl)
 
+        # Large (configuration) columns, stored compressed and only returned
+        # when asked for, in <table_name>.<column_name> format
+        schema_yaml = load_schema()
+        self._compressed_columns, self._deferred_columns = set(), set()
+        for tbl, tbl_def in schema_yaml["tables"].items():
+            for col, col_def in tbl_def["column_definitions"].items():
+                if col_def["compressed"]:
+                    self._compressed_columns.add(f"{tbl}.{col}")
+                if col_def["deferred"]:
+                    self._deferred_columns.add(f"{tbl}.{col}")
+
+        # Plans the joins for multi-table queries (from the schema FKs)
+        self._join_planner = JoinPlanner(schema_yaml)
+
+    @property
+    def default_projection(self):
+        """
+        Projection returned by `find_datasets` when no `property_names` are
+        given, one of "minimal", "standard" or "full".
+        """
+        return self._default_projection
+
+    @default_projection.setter
+    def default_projection(self, projection):
+        if projection not in _PROJECTIONS:
+            raise ValueError(
+                f"{projection} is not a valid projection "
+                f"(valid={list(_PROJECTIONS)})"
+            )
+        self._default_projection = projection
+
+    def _decompress_columns(self, df):
+        """
+        Decompress (in place) the columns of a query result that are stored
+        compressed (see `_compress_configuration`).
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            With columns named <table_name>.<column_name>
+        """
+
+        for c in df.columns:
+            if c in self._compressed_columns:
+                df[c] = df[c].map(_decompress_configuration)
+
     def _regularize_property_names(self, col_list):
         """
         Return list of column identifiers in standard form, namely
@@ -90,16 +243,34 @@ class Query:
 
         Parmeters
         ---------
-        None or list of column identifiers, optionally including table names
-        None is replaced with all columns belonging to dataset table
+        None, the name of a projection or list of column identifiers,
+        optionally including table names
+        None is replaced with the `default_projection`. The "full" projection
+        is every non-deferred column of the dataset table; deferred columns
+        (e.g. `access_api_configuration`) are only returned when named
 
         Returns
         -------
         List of strings (column identifieers) in canonical format
         """
+        if col_list is None:
+            col_list = self._default_projection
+        if isinstance(col_list, str):
+            if col_list not in _PROJECTIONS:
+                raise ValueError(
+                    f"{col_list} is not a valid projection "
+                    f"(valid={list(_PROJECTIONS)})"
+                )
+            col_list = _PROJECTIONS[col_list]
+            if col_list is not None:
+                return list(col_list)
+
         # If columns unspecified, Select all columns from the dataset table
         if col_list is None:
-            canon_names = self._schema_org["dataset"]
+            canon_names = [
+                c for c in self._schema_org["dataset"]
+                if c not in self._deferred_columns
+            ]
         else:
             canon_names = []
             for c in col_list:
@@ -455,44 +626,13 @@ class Query:
             [f[0]], schema_mode=schema_mode
         )
 
-        # Extract the filter operator (also making sure it is an allowed one)
-        if f[1] not in _colops.keys():
-            raise ValueError(f'check_filter: "{f[1]}" is not a supported operator')
-        else:
-            the_op = _colops[f[1]]
-
-        # Extract the property we are ordering on (also making sure it
-        # is orderable)
         # characteristics don't depend on schema, so just pick the first one
         sch_key = list(column_is_orderable.keys())[0]
-        if not column_is_orderable[sch_key][0] and f[1] not in [
-            "~==",
-            "~=",
-            "==",
-            "=",
-            "!=",
-        ]:
-            raise ValueError(f'check_filter: Cannot apply "{f[1]}" to "{f[0]}"')
-        else:
-            value = f[2]
-
-        # String partial matching with wildcard
-        if f[1] in ["~=", "~=="]:
-            if f[0] not in ILIKE_ALLOWED:
-                raise ValueError(f"Can only perform ~= search on {ILIKE_ALLOWED}")
-
-            tmp = value.replace("%", r"\%").replace("_", r"\_").replace("*", "%")
-
-            # Case insensitive wildcard matching (wildcard is '*')
-            if f[1] == "~=":
-                return stmt.where(column_ref[sch_key][0].ilike(tmp))
-            # Case sensitive wildcard matching (wildcard is '*')
-            else:
-                return stmt.where(column_ref[sch_key][0].like(tmp))
-
-        # General case using traditional boolean operator
-        else:
-            return stmt.where(column_ref[sch_key][0].__getattribute__(the_op)(value))
+        return stmt.where(
+            _filter_clause(
+                f, column_ref[sch_key][0], column_is_orderable[sch_key][0]
+            )
+        )
 
     def _append_filter_tables(self, tables_required, filters, schema_mode):
         """
@@ -528,6 +668,127 @@ class Query:
 
         return list(tables_required)
 
+    def _build_join(
+        self, tables_required, schema_str, dependency_direction="input", isouter=False
+    ):
+        """
+        Join the tables needed for a query onto the `dataset` table.
+
+        The join order and the ON clause for each join come from the
+        `JoinPlanner`, which follows the foreign keys in `schema.yaml`. Only
+        tables needed to connect `tables_required` to `dataset` are joined.
+
+        Parameters
+        ----------
+        tables_required : list[str]
+            Names of the tables the query needs
+        schema_str : str
+            "<schema>." prefix for the table names ("" for sqlite)
+        dependency_direction : str, optional
+            "input" joins `dependency` rows where the dataset is an input,
+            "output" joins `dependency` rows of the execution that made the
+            dataset
+        isouter : bool, optional
+            True to use LEFT OUTER joins, so datasets without a matching row
+            in the joined tables are kept
+
+        Returns
+        -------
+        j : SQLAlchemy Join object
+        """
+
+        tables = self.db_connection.metadata["tables"]
+
+        j = tables[f"{schema_str}{self._join_planner.root}"]
+        for step in self._join_planner.plan(
+            tables_required, dependency_direction=dependency_direction
+        ):
+            tbl = tables[f"{schema_str}{step.table}"]
+            parent = tables[f"{schema_str}{step.parent}"]
+            j = j.join(
+                tbl, tbl.c[step.column] == parent.c[step.parent_column], isouter=isouter
+            )
+
+        return j
+
+    def _select_collapsed_keywords(self, columns, schema_str):
+        """
+        Build a SELECT returning one row per dataset, with any keyword columns
+        aggregated into a list.
+
+        On Postgres the lists are built with `array_agg(DISTINCT ... ORDER BY
+        ...)`. On sqlite `json_group_array(DISTINCT ...)` is used, and the
+        JSON strings are decoded (and sorted) after the query (see
+        `find_datasets`).
+
+        Parameters
+        ----------
+        columns : list[sqlalchemy.sql.schema.Column]
+            The columns being selected
+        schema_str : str
+            "<schema>." prefix for the table names ("" for sqlite)
+
+        Returns
+        -------
+        stmt : SQLAlchemy Select object
+        """
+
+        dataset_table = self.db_connection.metadata["tables"][f"{schema_str}dataset"]
+
+        selected = []
+        group_by = [dataset_table.c.dataset_id]
+        for p in columns:
+            label = f"{p.table.name}.{p.name}"
+            if p.table.name in _KEYWORD_TABLES:
+                if self.db_connection.dialect == "sqlite":
+                    agg = func.json_group_array(distinct(p))
+                else:
+                    agg = func.array_agg(aggregate_order_by(distinct(p), p))
+                selected.append(agg.label(label))
+            else:
+                selected.append(p.label(label))
+                group_by.append(p)
+
+        return select(*selected).group_by(*group_by)
+
+    def _as_of_clause(self, as_of, schema_str):
+        """
+        WHERE clause restricting datasets to those that were current at a
+        given time.
+
+        A dataset was current at `as_of` if it was a valid dataset registered
+        at or before `as_of`, had not been deleted by then, and had not yet
+        been replaced by a dataset registered at or before `as_of`.
+
+        Parameters
+        ----------
+        as_of : datetime
+            Point in time
+        schema_str : str
+            "<schema>." prefix for the table names ("" for sqlite)
+
+        Returns
+        -------
+        - : SQLAlchemy boolean clause
+        """
+
+        dataset_table = self.db_connection.metadata["tables"][f"{schema_str}dataset"]
+        replacement = aliased(dataset_table)
+        valid_bit = 1 << VALID_STATUS_BITS["valid"]
+
+        return (
+            (dataset_table.c.register_date <= as_of)
+            & (dataset_table.c.status.op("&")(valid_bit) == valid_bit)
+            & (
+                dataset_table.c.delete_date.is_(None)
+                | (dataset_table.c.delete_date > as_of)
+            )
+            & ~exists().where(
+                (replacement.c.dataset_id == dataset_table.c.replace_id)
+                & (replacement.c.register_date <= as_of)
+            )
+        )
+
     def get_keyword_list(self, query_mode=None):
         """Get list of keywords from the keywords table"""
 
@@ -541,10 +802,9 @@ class Query:
             )
             return None
 
-        results = self.find_datasets(
-            property_names=["keyword.keyword"], schema_mode=query_mode
-        )
-        return results["keyword.keyword"]
+        # Through the keyword cache of the connection
+        schema = self.db_connection.get_schema_list(query_mode)[0]
+        return list(self.db_connection.get_keywords(schema=schema).keys())
 
     def find_datasets(
         self,
@@ -553,15 +813,24 @@ class Query:
         return_format="property_dict",
         strip_table_names=False,
         schema_mode=None,
+        dependency_direction="input",
+        collapse_keywords=False,
+        as_of=None,
     ):
         """
         Get specified properties for datasets satisfying all filters. Both
         schemas (i.e., the working and production schema) are searched, with
         the results combined.
 
-        If property_names is None, return all properties from the dataset table
-        (only). Otherwise, return the property_names columns for each
-        discovered dataset (which can be from multiple tables via a join).
+        If property_names is None, return the `default_projection` columns of
+        the dataset table. The "full" projection (the default) is every
+        non-deferred column of the dataset table (only); "standard" and
+        "minimal" leave out the large text columns too. Deferred columns,
+        such as `access_api_configuration`, are never part of a projection
+        and are only returned when named in property_names. Otherwise, return
+        the property_names columns for each discovered dataset (which can be
+        from multiple tables via a join). Configuration columns are stored
+        compressed, and returned decompressed.
 
         Filters should be a list of dataregistry Filter objects, which are
         logic constraints on column values.
@@ -570,8 +839,9 @@ class Query:
 
         Parameters
         ----------
-        property_names : list, optional
-            List of database columns to return (SELECT clause)
+        property_names : list or str, optional
+            List of database columns to return (SELECT clause), or the name
+            of a projection ("minimal", "standard" or "full")
         filters : list, optional
             List of filters (WHERE clauses) to apply
         return_format : str, optional
@@ -584,6 +854,23 @@ class Query:
             May be "production", "working" or None.  Defaults to None,
             in which case query mode established at connection time is used.
             Ignored unless query mode was "both"
+        dependency_direction : str, optional
+            How `dependency` columns relate to the returned datasets. With
+            "input" (default) the dependency rows are those where the dataset
+            was an input to an execution. With "output" they are the inputs
+            of the execution that produced the dataset.
+        collapse_keywords : bool, optional
+            If True, and columns from the `keyword` or `dataset_keyword`
+            tables are requested, return one row per dataset with those
+            columns as (sorted, distinct) lists, rather than one row per
+            dataset-keyword pair. The lists are built by the database. Note
+            that filters on keyword columns restrict which keywords end up in
+            the lists.
+        as_of : datetime, optional
+            Only return datasets as the registry had them at this time, i.e.,
+            valid datasets registered at or before `as_of` which had not yet
+            been deleted or replaced. Times in the registry are naive local
+            times, so `as_of` should be too.
 
         Returns
         -------
@@ -615,6 +902,20 @@ class Query:
             tables_required, filters, schema_mode
         )
 
+        # Keyword lists are collected per dataset, so we need the dataset table
+        collapsed_names = [
+            c for c in canonical_names if c.split(".")[0] in _KEYWORD_TABLES
+        ]
+        if collapse_keywords and len(collapsed_names) > 0:
+            if "dataset" not in tables_required:
+                tables_required.append("dataset")
+        else:
+            collapse_keywords = False
+
+        # Temporal queries are always against the dataset table
+        if as_of is not None and "dataset" not in tables_required:
+            tables_required.append("dataset")
+
         # Can only strip table names for queries against a single table
         if strip_table_names and len(tables_required) > 1:
             raise DataRegistryException(
@@ -625,49 +926,18 @@ class Query:
         for sch in column_list.keys():  # Loop over each schema
             schema_str = "" if self.db_connection.dialect == "sqlite" else f"{sch}."
             filter_mode = None if schema_str == "" else sch.split("_")[-1]
-            stmt = select(
-                *[p.label(f"{p.table.name}.{p.name}") for p in column_list[sch]]
-            )
+            if collapse_keywords:
+                stmt = self._select_collapsed_keywords(column_list[sch], schema_str)
+            else:
+                stmt = select(
+                    *[p.label(f"{p.table.name}.{p.name}") for p in column_list[sch]]
+                )
 
             # Create joins
             if len(tables_required) > 1:
-                j = self.db_connection.metadata["tables"][f"{schema_str}dataset"]
-                for i in range(len(tables_required)):
-                    if tables_required[i] in ["dataset", "keyword", "dependency"]:
-                        continue
-
-                    j = j.join(
-                        self.db_connection.metadata["tables"][
-                            f"{schema_str}{tables_required[i]}"
-                        ]
-                    )
-
-                # Special case for many-to-many keyword join
-                if "keyword" in tables_required:
-                    j = j.join(
-                        self.db_connection.metadata["tables"][
-                            f"{schema_str}dataset_keyword"
-                        ]
-                    ).join(
-                        self.db_connection.metadata["tables"][f"{schema_str}keyword"]
-                    )
-
-                # Special case for dependencies
-                if "dependency" in tables_required:
-                    dataset_table = self.db_connection.metadata["tables"][
-                        f"{schema_str}dataset"
-                    ]
-                    dependency_table = self.db_connection.metadata["tables"][
-                        f"{schema_str}dependency"
-                    ]
-
-                    j = j.join(
-                        dependency_table,
-                        dependency_table.c.input_id
-                        == dataset_table.c.dataset_id,  # Explicit join condition
-                    )
-
-                stmt = stmt.select_from(j)
+                stmt = stmt.select_from(
+                    self._build_join(tables_required, schema_str, dependency_direction)
+                )
             else:
                 stmt = stmt.select_from(
                     self.db_connection.metadata["tables"][
@@ -680,6 +950,10 @@ class Query:
                 for f in filters:
                     stmt = self._render_filter(f, stmt, filter_mode)
 
+            # Restrict to the datasets current at `as_of`
+            if as_of is not None:
+                stmt = stmt.where(self._as_of_clause(as_of, schema_str))
+
             # Report the constructed SQL query
             self.db_connection.logger.debug(f"Executing query: {stmt}")
 
@@ -694,6 +968,15 @@ class Query:
 
             # Store result
             df = pd.DataFrame(result)
+
+            # sqlite returns the keyword lists as JSON strings
+            if collapse_keywords and self.db_connection.dialect == "sqlite":
+                for c in collapsed_names:
+                    if c in df:
+                        df[c] = df[c].map(lambda x: sorted(json.loads(x)))
+
+            self._decompress_columns(df)
+
             results.append(df)
 
         # Combine results across schemas
@@ -711,6 +994,121 @@ class Query:
         else:
             return return_result
 
+    def facets(self, filters=[], facets=["dataset.owner", "dataset.owner_type"]):
+        """
+        Count the datasets taking each value of one or more properties (the
+        "facets"), for the datasets satisfying all filters.
+
+        All facets are computed in a single query per schema, using GROUPING
+        SETS on Postgres and UNION ALL on sqlite. If `query_mode="both"` the
+        counts from the working and production schemas are summed.
+
+        Tables needed for the facets are LEFT OUTER joined to the dataset
+        table, so every dataset is counted in every facet. Datasets with no
+        value for a facet (e.g., datasets without keywords for
+        "keyword.keyword") are counted under `None`.
+
+        Parameters
+        ----------
+        filters : list, optional
+            List of filters (WHERE clauses) to apply
+        facets : list[str], optional
+            List of properties to count datasets over
+
+        Returns
+        -------
+        counts : dict[str, dict]
+            For each facet, the number of (distinct) datasets for each value
+
+        Example
+        -------
+        .. code-block:: python
+
+           f = datareg.query.gen_filter("dataset.location_type", "==", "dummy")
+           counts = datareg.query.facets(
+               filters=[f], facets=["dataset.owner", "keyword.keyword"]
+           )
+        """
+
+        if len(facets) == 0:
+            raise ValueError("Must specify at least one facet")
+
+        schema_mode = self.db_connection._query_mode
+        if self.db_connection.dialect == "sqlite":
+            schema_mode = None
+
+        # What tables and what columns are required for this query? (each
+        # facet once, however often or however it is spelled in `facets`)
+        canonical_names = list(
+            dict.fromkeys(self._regularize_property_names(facets))
+        )
+        tables_required, column_list, _ = self._parse_selected_columns(
+            canonical_names, schema_mode=schema_mode
+        )
+        tables_required = self._append_filter_tables(
+            tables_required, filters, schema_mode
+        )
+        if "dataset" not in tables_required:
+            tables_required.append("dataset")
+
+        counts = {name: {} for name in canonical_names}
+
+        for sch in column_list.keys():  # Loop over each schema
+            schema_str = "" if self.db_connection.dialect == "sqlite" else f"{sch}."
+            filter_mode = None if schema_str == "" else sch.split("_")[-1]
+            j = self._build_join(tables_required, schema_str, isouter=True)
+            dataset_id = self.db_connection.metadata["tables"][
+                f"{schema_str}dataset"
+            ].c.dataset_id
+            n_datasets = func.count(distinct(dataset_id)).label("count")
+
+            if self.db_connection.dialect == "sqlite":
+                # One grouped SELECT per facet, labelled by facet index
+                parts = []
+                for i, col in enumerate(column_list[sch]):
+                    part = select(
+                        literal(i).label("facet"), col.label("value"), n_datasets
+                    ).select_from(j)
+                    for f in filters:
+                        part = self._render_filter(f, part, filter_mode)
+                    parts.append(part.group_by(col))
+                stmt = union_all(*parts)
+            else:
+                # GROUPING(col) is 0 for the rows grouped on `col`
+                stmt = select(
+                    *[func.grouping(col) for col in column_list[sch]],
+                    *column_list[sch],
+                    n_datasets,
+                ).select_from(j)
+                for f in filters:
+                    stmt = self._render_filter(f, stmt, filter_mode)
+                stmt = stmt.group_by(func.grouping_sets(*column_list[sch]))
+
+            # Report the constructed SQL query
+            self.db_connection.logger.debug(f"Executing query: {stmt}")
+
+            with self._engine.connect() as conn:
+                try:
+                    result = conn.execute(stmt).all()
+                except DBAPIError as e:
+                    self.db_connection.logger.error("Original error:")
+                    self.db_connection.logger.error(e.StatementError.orig)
+                    return None
+
+            # Unpack each row into (facet, value, count)
+            n_facets = len(canonical_names)
+            for row in result:
+                if self.db_connection.dialect == "sqlite":
+                    i, value, count = row
+                else:
+                    i = list(row[:n_facets]).index(0)
+                    value, count = row[n_facets + i], row[-1]
+
+                facet = counts[canonical_names[i]]
+                facet[value] = facet.get(value, 0) + count
+
+        return counts
+
     def gen_filter(self, property_name, bin_op, value):
         """
         Generate a binary filter for a data registry query.
@@ -741,6 +1139,199 @@ class Query:
 
         return Filter(property_name, bin_op, value)
 
+    def _resolve_schema_type(self, schema):
+        """
+        Resolve which schema type a single-schema lookup should use.
+
+        Parameters
+        ----------
+        schema : str or None
+            "working", "production" or None. If None, it defaults to
+            `query_mode` if `query_mode` is not "both", else "working"
+
+        Returns
+        -------
+        schema : str
+        """
+
+        # Handle ambiguous `query_mode`
+        if not schema:
+            if self.db_connection._query_mode == "both":
+                schema = "working"
+            else:
+                schema = self.db_connection._query_mode
+        elif schema not in ("production", "working"):
+            raise ValueError(
+                f"Unknown schema value {schema}. Schema must be either 'working' or 'production'."
+            )
+
+        return schema
+
+    def _get_dataset_table(self, schema):
+        """
+        Return the `dataset` table of a given schema type.
+
+        Parameters
+        ----------
+        schema : str or None
+            "working", "production" or None (see `_resolve_schema_type`)
+
+        Returns
+        -------
+        - : SQLAlchemy Table object
+        """
+
+        schema = self._resolve_schema_type(schema)
+
+        if self.db_connection.dialect == "sqlite":
+            return self.db_connection.metadata["tables"]["dataset"]
+
+        sch = self.db_connection.get_schema_list(schema)[0]
+        return self.db_connection.metadata["tables"][f"{sch}.dataset"]
+
+    def get_replace_history(
+        self,
+        name,
+        version_string,
+        owner,
+        owner_type,
+        schema=None,
+        return_format="property_dict",
+    ):
+        """
+        Return every iteration of a dataset, following its `replace_id` chain
+        from the original registration (`replace_iteration=0`) to the latest
+        replacement.
+
+        The chain is walked with a recursive CTE, in a single query.
+
+        Parameters
+        ----------
+        name/version_string/owner/owner_type : str
+            Identifiers for the dataset
+        schema : str, optional
+            Which schema to search. May be "working", "production" or None.
+            If None, it defaults to `query_mode` if `query_mode` is not
+            "both", else "working"
+        return_format : str, optional
+            The format the result is returned in.  Options are "DataFrame",
+            or "property_dict". Note this is not case sensitive.
+
+        Returns
+        -------
+        result : dict, or DataFrame (depending on `return_format`)
+            All columns of the dataset table (as "dataset.<column>") for each
+            iteration, ordered by `replace_iteration`
+        """
+
+        _allowed_return_formats = ["dataframe", "property_dict"]
+        if return_format.lower() not in _allowed_return_formats:
+            raise ValueError(
+                f"{return_format} is a bad return format (valid={_allowed_return_formats})"
+            )
+
+        dataset_table = self._get_dataset_table(schema)
+
+        # Start from the original registration...
+        history = (
+            select(*dataset_table.c)
+            .where(dataset_table.c.name == name)
+            .where(dataset_table.c.version_string == version_string)
+            .where(dataset_table.c.owner == owner)
+            .where(dataset_table.c.owner_type == owner_type)
+            .where(dataset_table.c.replace_iteration == 0)
+            .cte("history", recursive=True)
+        )
+
+        # ...and follow each `replace_id` to the dataset that replaced it
+        history = history.union_all(
+            select(*dataset_table.c).where(
+                dataset_table.c.dataset_id == history.c.replace_id
+            )
+        )
+
+        stmt = select(
+            *[history.c[c.name].label(f"dataset.{c.name}") for c in dataset_table.c]
+        ).order_by(history.c.replace_iteration)
+
+        # Report the constructed SQL query
+        self.db_connection.logger.debug(f"Executing query: {stmt}")
+
+        with self._engine.connect() as conn:
+            result = conn.execute(stmt)
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        self._decompress_columns(df)
+
+        if return_format.lower() == "property_dict":
+            return df.to_dict("list")
+        else:
+            return df
+
+    def get_current(self, dataset_ids, schema=None):
+        """
+        Map each dataset to the latest iteration in its replace chain.
+
+        Following `replace_id` from each of the `dataset_ids` is done with a
+        single recursive CTE, so any number of (possibly stale) ids are
+        resolved in one statement. Datasets that were never replaced map to
+        themselves. Note the latest iteration may itself be deleted.
+
+        Parameters
+        ----------
+        dataset_ids : list[int]
+            The datasets to resolve
+        schema : str, optional
+            Which schema to search. May be "working", "production" or None.
+            If None, it defaults to `query_mode` if `query_mode` is not
+            "both", else "working"
+
+        Returns
+        -------
+        current : dict[int, int]
+            For each of `dataset_ids`, the id of the latest iteration. Ids
+            that do not exist in the schema map to None.
+        """
+
+        dataset_ids = list(dataset_ids)
+        current = {d_id: None for d_id in dataset_ids}
+        if len(dataset_ids) == 0:
+            return current
+
+        dataset_table = self._get_dataset_table(schema)
+
+        # Each chain remembers the dataset it started from
+        chain = (
+            select(
+                dataset_table.c.dataset_id.label("start_id"),
+                dataset_table.c.dataset_id,
+                dataset_table.c.replace_id,
+            )
+            .where(dataset_table.c.dataset_id.in_(dataset_ids))
+            .cte("chain", recursive=True)
+        )
+
+        chain = chain.union_all(
+            select(
+                chain.c.start_id,
+                dataset_table.c.dataset_id,
+                dataset_table.c.replace_id,
+            ).where(dataset_table.c.dataset_id == chain.c.replace_id)
+        )
+
+        # The end of each chain has not been replaced
+        stmt = select(chain.c.start_id, chain.c.dataset_id).where(
+            chain.c.replace_id.is_(None)
+        )
+
+        # Report the constructed SQL query
+        self.db_connection.logger.debug(f"Executing query: {stmt}")
+
+        with self._engine.connect() as conn:
+            for start_id, dataset_id in conn.execute(stmt):
+                current[start_id] = dataset_id
+
+        return current
+
     def get_dataset_absolute_path(self, dataset_id, schema=None,
                                   silent=True):
         """
@@ -768,16 +1359,7 @@ class Query:
             Absolute path of the dataset if found, otherwise None.
         """
 
-        # Handle ambiguous `query_mode`
-        if not schema:
-            if self.db_connection._query_mode == "both":
-                schema = "working"
-            else:
-                schema = self.db_connection._query_mode
-        elif schema not in ("production", "working"):
-            raise ValueError(
-                f"Unknown schema value {schema}. Schema must be either 'working' or 'production'."
-            )
+        schema = self._resolve_schema_type(schema)
 
         # Query the database
         results = self.find_datasets(
@@ -934,6 +1516,10 @@ class Query:
         """
         Return requested columns from dataset_alias table, subject to filters
 
+        By default all columns are returned, except `access_api_configuration`
+        (which must be asked for). Configuration text is returned decompressed,
+        except in the "CursorResult" format.
+
         This searches for aliases in a single schema, defined by the
         `alias_query_schema` property of this object. The schema choice is
         derived from `DbConnection` options, see `alias_query_schema()`
@@ -965,7 +1551,12 @@ class Query:
             tbl_name = f"{self.alias_query_schema}.dataset_alias"
         tbl = self.db_connection.metadata["tables"][tbl_name]
         if property_names is None:
-            stmt = select("*").select_from(tbl)
+            stmt = select(
+                *[
+                    c for c in tbl.c
+                    if f"dataset_alias.{c.name}" not in self._deferred_columns
+                ]
+            )
 
         else:
             cols = []
@@ -1001,6 +1592,9 @@ class Query:
         # Make sure we are working with the correct return format.
         if return_format.lower() != "cursorresult":
             result = pd.DataFrame(result)
+            for c in result.columns:
+                if f"dataset_alias.{c.split('.')[-1]}" in self._compressed_columns:
+                    result[c] = result[c].map(_decompress_configuration)
 
             if return_format.lower() == "property_dict":
                 result = result.to_dict("list")
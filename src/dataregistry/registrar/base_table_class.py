@@ -1,13 +1,30 @@
 import os
+from itertools import islice
 from dateutil import parser
+from dataregistry.exceptions import DataRegistryNoColumn
+from dataregistry.query import Filter, _filter_clause, is_orderable_type
 from dataregistry.schema import load_schema
-from sqlalchemy import select, update, DateTime
+from .registrar_util import _CompressedText, _compress_configuration
+from sqlalchemy import (
+    bindparam,
+    cast,
+    column,
+    select,
+    type_coerce,
+    update,
+    values,
+    DateTime,
+)
 
 # Allowed owner types
 _OWNER_TYPES = {"user", "project", "group", "production"}
 
 # Default maximum allowed length of configuration file allowed to be ingested
-_DEFAULT_MAX_CONFIG = 10000
+# (configurations are stored compressed)
+_DEFAULT_MAX_CONFIG = 100000
+
+# Entries are updated by `modify_many` in batches of this size
+_MODIFY_BATCH_SIZE = 1000
 
 
 class BaseTable:
@@ -97,8 +114,20 @@ class BaseTable:
         # First make sure the given entry is in the registry
         previous_entry = self.find_entry(entry_id, raise_if_not_found=True)
 
+        self._check_modifiable(modify_fields.keys())
+        self._modify(modify_fields, entry_id)
+
+    def _check_modifiable(self, columns):
+        """
+        Make sure each of `columns` exists in the schema, and is modifiable.
+
+        Parameters
+        ----------
+        columns : iterable[str]
+        """
+
         # Loop over each column to be modified
-        for key, v in modify_fields.items():
+        for key in columns:
             # Make sure the column is in the schema
             if (
                 key
@@ -113,13 +142,33 @@ class BaseTable:
                 key
             ]["modifiable"]:
                 raise ValueError(f"The column {key} is not modifiable")
-        self._modify(modify_fields, entry_id)
 
-    def _modify(self, modify_fields, entry_id):
+    def _process_fields(self, modify_fields):
+        """
+        Convert the new values of `modify_fields` to what the database
+        expects (e.g., strings for datetime columns are parsed, configuration
+        text is compressed).
+
+        Parameters
+        ----------
+        modify_fields : dict
+
+        Returns
+        -------
+        processed_fields : dict
+            A converted copy of `modify_fields`
+        """
+
         my_table = self._get_table_metadata(self.which_table)
+        column_defs = self.schema_yaml["tables"][self.which_table][
+            "column_definitions"
+        ]
         # Create a copy of modify_fields to avoid modifying the input dictionary
         processed_fields = modify_fields.copy()
         for key, v in modify_fields.items():
+            # Configuration text is stored compressed
+            if column_defs[key]["compressed"] and isinstance(v, str):
+                processed_fields[key] = _compress_configuration(v)
             # Handle datetime conversion if needed
             column_type = my_table.c[key].type
             if isinstance(column_type, DateTime) and isinstance(v, str):
@@ -130,6 +179,11 @@ class BaseTable:
                     raise ValueError(
                         f"Could not convert string '{v}' to datetime for column {key}"
                     )
+        return processed_fields
+
+    def _modify(self, modify_fields, entry_id):
+        my_table = self._get_table_metadata(self.which_table)
+        processed_fields = self._process_fields(modify_fields)
         with self._engine.connect() as conn:
             # Update the metadata with processed fields
             if len(processed_fields.keys()) > 0:
@@ -141,6 +195,183 @@ class BaseTable:
                 conn.execute(update_stmt)
             conn.commit()
 
+    def modify_many(self, updates=None, filters=None, modify_fields=None):
+        """
+        Modify many entries in the DESC data registry at once, in a single
+        transaction.
+
+        Either give the new values of each entry (`updates`), or the same new
+        values (`modify_fields`) for all the entries matching `filters`. As
+        for `modify()`, only the columns defined as modifiable in the schema
+        yaml file can be modified.
+
+        With `updates`, the entries are updated with one
+        `UPDATE ... FROM (VALUES ...)` statement per batch of entries on
+        Postgres, and one `executemany` UPDATE on SQLite. With `filters`, a
+        single UPDATE modifies all the matching entries.
+
+        Parameters
+        ----------
+        updates : dict, optional
+            Dict where key is the dataset/execution/etc ID of an entry, and
+            value is its `modify_fields` dict (column -> new value)
+        filters : list[Filter], optional
+            Modify the entries matching all these filters (see
+            `Query.gen_filter()`) on the columns of this table (for datasets,
+            also on "keyword.keyword")
+        modify_fields : dict, optional
+            With `filters`, the columns to modify and their new values
+
+        Returns
+        -------
+        num_modified : int
+            Number of entries modified
+        """
+
+        if (updates is None) == (filters is None):
+            raise ValueError("Must give one of `updates` or `filters`")
+
+        my_table = self._get_table_metadata(self.which_table)
+        id_column = getattr(my_table.c, self.entry_id)
+
+        # Filtered modification, with the same values for all entries
+        if filters is not None:
+            if type(modify_fields) is not dict or len(modify_fields) == 0:
+                raise ValueError(
+                    "modify_fields is expected as a dict, {'column': new_values}"
+                )
+            self._check_modifiable(modify_fields.keys())
+            processed_fields = self._process_fields(modify_fields)
+
+            with self._engine.connect() as conn:
+                result = conn.execute(
+                    update(my_table)
+                    .where(*self._filter_clauses(filters))
+                    .values(processed_fields)
+                )
+                conn.commit()
+            return result.rowcount
+
+        if type(updates) is not dict:
+            raise ValueError(
+                "updates is expected as a dict, {entry_id: {'column': new_values}}"
+            )
+        for modify_fields in updates.values():
+            if type(modify_fields) is not dict:
+                raise ValueError(
+                    "modify_fields is expected as a dict, {'column': new_values}"
+                )
+
+        # Validate all the columns at once
+        self._check_modifiable(
+            set(key for modify_fields in updates.values() for key in modify_fields)
+        )
+
+        # Entries modifying the same columns are updated together
+        groups = {}
+        for entry_id, modify_fields in updates.items():
+            if len(modify_fields) > 0:
+                columns = tuple(sorted(modify_fields))
+                groups.setdefault(columns, []).append(
+                    (entry_id, self._process_fields(modify_fields))
+                )
+
+        with self._engine.connect() as conn:
+            # First make sure the given entries are in the registry
+            found = set()
+            entry_ids = iter(list(updates))
+            while batch := list(islice(entry_ids, _MODIFY_BATCH_SIZE)):
+                found.update(
+                    conn.execute(select(id_column).where(id_column.in_(batch)))
+                    .scalars()
+                    .all()
+                )
+            missing = [x for x in updates if x not in found]
+            if len(missing) > 0:
+                raise ValueError(
+                    f"Entries {missing} not found in {self.which_table}"
+                )
+
+            for columns, entries in groups.items():
+                if self._dialect == "sqlite":
+                    conn.execute(
+                        update(my_table)
+                        .where(id_column == bindparam("b_entry_id"))
+                        .values({c: bindparam(f"b_{c}") for c in columns}),
+                        [
+                            {
+                                "b_entry_id": entry_id,
+                                **{f"b_{c}": fields[c] for c in columns},
+                            }
+                            for entry_id, fields in entries
+                        ],
+                    )
+                    continue
+
+                it = iter(entries)
+                while batch := list(islice(it, _MODIFY_BATCH_SIZE)):
+                    new_values = values(
+                        column(self.entry_id, id_column.type),
+                        *[column(c, my_table.c[c].type) for c in columns],
+                        name="new_values",
+                    ).data(
+                        [
+                            (entry_id, *[fields[c] for c in columns])
+                            for entry_id, fields in batch
+                        ]
+                    )
+                    conn.execute(
+                        update(my_table)
+                        .where(id_column == new_values.c[self.entry_id])
+                        .values(
+                            {
+                                c: cast(new_values.c[c], my_table.c[c].type)
+                                for c in columns
+                            }
+                        )
+                    )
+            conn.commit()
+
+        return sum(len(entries) for entries in groups.values())
+
+    def _filter_clauses(self, filters):
+        """
+        Render dataregistry filters as WHERE clauses on this table.
+
+        Filters can be on any column of this table (e.g., "execution.name",
+        or simply "name").
+
+        Parameters
+        ----------
+        filters : list[Filter]
+
+        Returns
+        -------
+        clauses : list[sqlalchemy expression]
+        """
+
+        my_table = self._get_table_metadata(self.which_table)
+
+        clauses = []
+        for f in filters:
+            property_name = f[0]
+            if "." not in property_name:
+                property_name = f"{self.which_table}.{property_name}"
+            table_name, column_name = property_name.split(".", 1)
+            if table_name != self.which_table or column_name not in my_table.c:
+                raise DataRegistryNoColumn(property_name)
+
+            column = my_table.c[column_name]
+            clauses.append(
+                _filter_clause(
+                    Filter(property_name, f[1], f[2]),
+                    column,
+                    is_orderable_type(column.type),
+                )
+            )
+
+        return clauses
+
     def find_entry(self, entry_id, raise_if_not_found=False):
         """
         Find an entry in the database.
@@ -159,9 +390,20 @@ class BaseTable:
             Found entry (None if no entry found)
         """
 
-        # Search for entry in the registry.
+        # Search for entry in the registry (configurations are stored
+        # compressed, and read decompressed)
         my_table = self._get_table_metadata(self.which_table)
-        stmt = select(my_table).where(getattr(my_table.c, self.entry_id) == entry_id)
+        column_defs = self.schema_yaml["tables"][self.which_table][
+            "column_definitions"
+        ]
+        stmt = select(
+            *[
+                type_coerce(c, _CompressedText()).label(c.name)
+                if column_defs[c.name]["compressed"]
+                else c
+                for c in my_table.c
+            ]
+        ).where(getattr(my_table.c, self.entry_id) == entry_id)
 
         with self._engine.connect() as conn:
             result = conn.execute(stmt)
@@ -1,16 +1,38 @@
 import inspect
 import os
+import threading
 import time
-from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain, islice
 import shutil
 import warnings
 
-from dataregistry.db_basic import add_table_row
+from dataregistry.db_basic import (
+    _is_unique_violation,
+    _lock_keys,
+    add_table_rows,
+)
 from dataregistry.exceptions import DataRegistryRootDirBadState
 from dataregistry.exceptions import DataRegistryNoEntry
-from sqlalchemy import select, update
+from dataregistry.exceptions import DataRegistryMissingInputs
+from sqlalchemy import (
+    Integer,
+    String,
+    bindparam,
+    cast,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from functools import wraps
-from dataregistry.query import Filter
+from dataregistry.query import Filter, _filter_clause
 from dataregistry.globus.transfer import transfer_NERSC
 
 from .base_table_class import BaseTable
@@ -18,18 +40,80 @@ from .registrar_util import (
     _bump_version,
     _copy_data,
     _form_dataset_path,
+    get_directory_info,
+    _journal_path,
+    _list_trash,
+    _move_to_trash,
+    _resume_copy,
+    _staging_path,
+    _swap_in,
+    _trash_path,
+    _increment_version,
     _parse_version_string,
     _read_configuration_file,
     _relpath_from_name,
-    get_directory_info,
 )
-from .dataset_util import set_dataset_status, get_dataset_status
+from .dataset_util import (
+    VALID_STATUS_BITS,
+    get_dataset_status,
+    set_dataset_status,
+)
+from .ingest_job import IngestJob, _DEFAULT_INGEST_WORKERS, _list_journals
+from .ingest_util import (
+    _DEFAULT_COPY_WORKERS,
+    _DEFAULT_LARGE_FILE_THRESHOLD,
+    _DEFAULT_LARGE_FILE_WORKERS,
+    _DEFAULT_PURGE_WORKERS,
+    _INGEST_MODES,
+    _INCREMENTAL_MODES,
+    _INFRA_DIR_MODE,
+    _IngestJournal,
+    _MANIFEST_HASH,
+    ManifestEntry,
+    _Reuse,
+    _makedirs,
+    _parallel_rmtree,
+    _scan_tree,
+    _verify_manifest,
+)
 
 _ILLEGAL_NAME_CHAR = ["$", "*", "&", "/", "?", "\\", " "]
 _ILLEGAL_RELPATH_CHAR = ["$", "*", "&", "?", "\\", " "]
 _TO_MBYTE = 1024 * 1024
+
+# Manifest rows are inserted in batches of this size
+_MANIFEST_BATCH_SIZE = 10000
+
+# What `_handle_data` found out about (and did with) a dataset's data. `scan`
+# is the scan of a directory (see `_scan_tree`), reused when copying it
+_DataInfo = namedtuple(
+    "_DataInfo",
+    [
+        "dataset_organization",
+        "num_files",
+        "total_size",
+        "ds_creation_date",
+        "ingest_mode",
+        "manifest",
+        "scan",
+    ],
+)
 _ADMIN_USER = 'descdr'
 
+# Days the data of deleted datasets stays in the trash before it is purged
+_DEFAULT_TRASH_RETENTION = 7
+
+# What `delete_many` deleted (or would delete, for a dry run). `num_files` and
+# `total_size` (bytes) count the data moved out of the `root_dir`
+DeleteReport = namedtuple(
+    "DeleteReport", ["dataset_ids", "num_files", "total_size", "dry_run"]
+)
+
+# What `purge_trash` removed from the trash (or would remove, for a dry run)
+PurgeReport = namedtuple(
+    "PurgeReport", ["dataset_ids", "num_files", "total_size", "dry_run"]
+)
+
 
 class DatasetTable(BaseTable):
     def __init__(
@@ -54,11 +138,32 @@ class DatasetTable(BaseTable):
         # Does the user have write permission to the root_dir?
         self.root_dir_write_access = os.access(root_dir, os.W_OK)
 
+        # Threads used to copy the files of a directory into the root_dir.
+        # Files of at least `large_file_threshold` bytes get their own pool.
+        self.copy_workers = _DEFAULT_COPY_WORKERS
+        self.large_file_workers = _DEFAULT_LARGE_FILE_WORKERS
+        self.large_file_threshold = _DEFAULT_LARGE_FILE_THRESHOLD
+
+        # Datasets registered with `background=True` are ingested by a pool of
+        # `ingest_workers` threads, created when first needed
+        self.ingest_workers = _DEFAULT_INGEST_WORKERS
+        self._ingest_pool = None
+        self._jobs = []
+        self._jobs_lock = threading.Lock()
+
+        # The data of deleted datasets is moved to the trash, where the
+        # deletion can still be undone (see `undelete()`), and purged once it
+        # has been there `trash_retention` days, by `purge_workers` threads
+        self.trash_retention = _DEFAULT_TRASH_RETENTION
+        self.purge_workers = _DEFAULT_PURGE_WORKERS
+        self._purge_thread = None
+
     def _validate_register_inputs(
         self,
         name,
         version,
         kwargs_dict,
+        check_keywords=True,
     ):
         """
         An internal helper function to ensure the inputs to the register
@@ -72,6 +177,10 @@ class DatasetTable(BaseTable):
         Parameters
         ----------
         See `register()` function
+
+        check_keywords : bool, optional
+            False to skip validating the keywords (`register_many()` looks
+            them up for all datasets at once)
         """
 
         # If the root_dir does not exist, stop
@@ -181,7 +290,7 @@ class DatasetTable(BaseTable):
                     raise ValueError(msg)
 
         # Keywords
-        if len(kwargs_dict["keywords"]) > 0:
+        if check_keywords and len(kwargs_dict["keywords"]) > 0:
             # Validate the keywords (make sure they are registered)
             kwargs_dict["keyword_ids"] = self.keyword_table.validate_keywords(
                 kwargs_dict["keywords"]
@@ -191,6 +300,13 @@ class DatasetTable(BaseTable):
         if kwargs_dict["max_config_length"] is None:
             kwargs_dict["max_config_length"] = self._DEFAULT_MAX_CONFIG
 
+        # How the data is brought into the `root_dir`
+        if kwargs_dict["ingest_mode"] not in _INGEST_MODES:
+            raise ValueError(
+                f"Invalid ingest_mode {kwargs_dict['ingest_mode']} "
+                f"(valid={_INGEST_MODES})"
+            )
+
     def _check_write_permission(self, dataset_id):
         """
         In order to modify or delete an entry, user must have same
@@ -219,6 +335,62 @@ class DatasetTable(BaseTable):
 
         return True
 
+    def _check_relative_path_available(self, previous_dataset, kwargs_dict):
+        """
+        Make sure a dataset can use its `relative_path` in the `root_dir`,
+        given the latest previous entry with the same `owner`, `owner_type`
+        and `relative_path`.
+
+        We can only use the old `relative_path` if that dataset is now deleted
+        (and not archived). If no data is being copied in, a warning is issued
+        instead of raising an exception.
+
+        Parameters
+        ----------
+        previous_dataset : sqlalchemy Row object
+            Must include the `dataset_id` and `status` of the previous entry
+        kwargs_dict : dict
+            See `register()`
+        """
+
+        will_copy = kwargs_dict["old_location"]
+        dest = _form_dataset_path(
+            kwargs_dict["owner_type"],
+            kwargs_dict["owner"],
+            kwargs_dict["relative_path"],
+            schema=self._schema,
+            root_dir=self._root_dir,
+        )
+
+        warned = False
+        if get_dataset_status(previous_dataset.status, "archived"):
+            if will_copy:
+                raise ValueError(
+                    f"Relative path {dest} is reserved "
+                    f"for archived datasetid={previous_dataset.dataset_id}"
+                )
+            else:
+                warnings.warn(
+                    "Warning: found existing entry with path "
+                    f"{kwargs_dict['relative_path']}",
+                    UserWarning,
+                )
+                warned = True
+
+        if not get_dataset_status(previous_dataset.status, "deleted"):
+            if will_copy:
+                raise ValueError(
+                    f"Relative path {dest} is taken by "
+                    f"datasetid={previous_dataset.dataset_id}"
+                )
+            else:
+                if not warned:
+                    warnings.warn(
+                        "Warning: found existing entry with path "
+                        f"{kwargs_dict['relative_path']}",
+                        UserWarning,
+                    )
+
     def _compute_version_string(self, name, version, kwargs_dict):
         """
         Compute version string (either manually, or from bumping)
@@ -282,34 +454,193 @@ class DatasetTable(BaseTable):
 
         return wrapper
 
-    def _register_row(self, name, version, kwargs_dict, gen_path=False):
+    def _register_row(self, name, version, kwargs_dict, gen_path=False,
+                      stage=False, reuse=None, replaces=None,
+                      background=False, check_path=None):
         """
         Register a new row in the dataset table
 
+        The execution, dataset and keyword rows are inserted in a single
+        transaction (see `_insert_row`). Unless there is data to copy, this
+        completes the registration. Otherwise the data is then copied, and
+        the row updated and marked valid (see `_ingest_row`).
+
+        Parameters
+        ----------
+        name : str
+        version : str
+        kwargs_dict : dict
+        gen_path : bool, optional
+            True if `relative_path` is generated from the name and version
+        stage, reuse, replaces :
+            See `_ingest_row`
+        background : bool, optional
+            Return once the row is created, leaving the data to be ingested
+            by the pool of background workers (see `jobs()`)
+        check_path : callable, optional
+            See `_insert_row`
+
+        Returns
+        -------
+        prim_key : int or IngestJob
+            The dataset ID of the new row relating to this entry (else None),
+            or the job ingesting its data with `background=True`
+        """
+
+        # Fill final values into the dict
+        kwargs_dict["name"] = name
+        kwargs_dict["register_date"] = datetime.now()
+        kwargs_dict["fetch_date"] = kwargs_dict["register_date"]
+        kwargs_dict["creator_uid"] = self._uid
+        kwargs_dict["register_root_dir"] = self._root_dir
+        if kwargs_dict["access_api_configuration"]:
+            kwargs_dict["access_api_configuration"] = _read_configuration_file(
+                kwargs_dict["access_api_configuration"],
+                kwargs_dict["max_config_length"],
+            )
+
+        # We tentatively start with an "invalid" dataset in the database. This
+        # will be upgraded to valid if data copying (if any) was successful.
+        # (the `ingest_mode` column records how data was actually ingested,
+        # which is set once the data has been copied)
+        kwargs_dict["status"] = 0
+        kwargs_dict["data_org"] = None
+        kwargs_dict["nfiles"] = None
+        kwargs_dict["total_disk_space"] = None
+
+        # Without data to copy the entry is complete (and valid) from the
+        # start, so a single transaction registers it
+        copies = (
+            kwargs_dict["location_type"] == "dataregistry"
+            and kwargs_dict["old_location"]
+        )
+        if not (copies or background):
+            if kwargs_dict["location_type"] == "dataregistry":
+                data_info = self._handle_data(
+                    kwargs_dict["relative_path"],
+                    None,
+                    kwargs_dict["owner"],
+                    kwargs_dict["owner_type"],
+                )
+            else:
+                data_info = _DataInfo(
+                    kwargs_dict["location_type"], 0, 0, None, None, [], None
+                )
+            kwargs_dict["data_org"] = data_info.dataset_organization
+            kwargs_dict["nfiles"] = data_info.num_files
+            kwargs_dict["total_disk_space"] = data_info.total_size / _TO_MBYTE
+            kwargs_dict["creation_date"] = (
+                kwargs_dict["creation_date"] or data_info.ds_creation_date
+            )
+            kwargs_dict["status"] = set_dataset_status(0, valid=True)
+
+        # Create the new rows in the data registry database
+        with self._engine.connect() as conn:
+            prim_key = self._insert_row(conn, name, version, kwargs_dict,
+                                        gen_path=gen_path,
+                                        check_path=check_path)
+            conn.commit()
+
+        if background:
+            job = IngestJob(prim_key, kwargs_dict["execution_id"])
+            self._submit(job, self._ingest_row, prim_key, kwargs_dict,
+                         gen_path=gen_path, stage=stage, reuse=reuse,
+                         replaces=replaces)
+            return job
+
+        if copies:
+            self._ingest_row(prim_key, kwargs_dict, gen_path=gen_path,
+                             stage=stage, reuse=reuse, replaces=replaces)
+        return prim_key
+
+    def _insert_row(self, conn, name, version, kwargs_dict, gen_path=False,
+                    check_path=None):
+        """
+        Insert the rows of a new dataset: its execution (if one needs to be
+        fabricated), the dataset itself and its keyword tags, within the
+        transaction of `conn` (without committing).
+
+        A version bump (`version` "major", "minor" or "patch") is computed by
+        the database within the INSERT, as is an automatically generated
+        `relative_path` (which includes the version). Either way the version
+        and `relative_path` of the new row are filled into `kwargs_dict`.
+        Bumps of the same name are serialized (see `_version_lock_key()`), the
+        caller should commit soon after.
+
         Parameters
         ----------
+        conn : sqlalchemy.engine.Connection
         name : str
         version : str
         kwargs_dict : dict
+            See `register()`
+        gen_path : bool, optional
+            True if `relative_path` is generated from the name and version
+        check_path : callable, optional
+            Called with the connection, within the transaction, to check the
+            `relative_path` is free: before the rows are inserted, or just
+            after for a generated path with a bumped version (which is only
+            known then), with the ID of the new row to leave out
 
         Returns
         -------
         prim_key : int
-            The dataset ID of the new row relating to this entry (else None)
+            The dataset ID of the new row
         """
 
+        dataset_table = self._get_table_metadata("dataset")
+
+        # Keywords (unless already validated, see `replace()`)
+        if "keyword_ids" not in kwargs_dict:
+            lowered = [k.lower() for k in kwargs_dict["keywords"]]
+            found = self.keyword_table._lookup_keywords(lowered)
+            if not all(k in found for k in lowered):
+                raise ValueError("Not all keywords selected are registered")
+            kwargs_dict["keyword_ids"] = [
+                found[k].keyword_id for k in lowered if found[k].active
+            ]
+
+        values = {
+            c.name: kwargs_dict.get(c.name)
+            for c in dataset_table.c
+            if c.name != "dataset_id"
+        }
+        values["ingest_mode"] = None
+
+        # The version (and any path made from it)
+        version_string = kwargs_dict.get("version_string")
+        if version in ["major", "minor", "patch"]:
+            # Until this transaction ends, other bumps of `name` wait for it
+            # (rather than computing the same next version)
+            _lock_keys(conn, [self._version_lock_key(name)])
+            v_fields = self._bumped_version(dataset_table, name, version)
+            version_string = v_fields.pop("string")
+            values.update({f"version_{k}": v for k, v in v_fields.items()})
+            values["version_string"] = version_string
+            if gen_path:
+                # Split the path around the version, to put it back together
+                # around the computed version
+                prefix, suffix = _relpath_from_name(
+                    name, "\0", kwargs_dict["old_location"]
+                ).split("\0")
+                values["relative_path"] = prefix + version_string + suffix
+
+        bumped_path = gen_path and version in ["major", "minor", "patch"]
+        if check_path is not None and not bumped_path:
+            check_path(conn)
+
         # If no execution_id is supplied, create a minimal entry
         if kwargs_dict["execution_id"] is None:
-            if kwargs_dict["execution_name"] is None:
-                kwargs_dict[
-                    "execution_name"
-                ] = f"for_dataset_{name}-{kwargs_dict['version_string']}"
+            execution_name = kwargs_dict["execution_name"]
+            if execution_name is None:
+                execution_name = f"for_dataset_{name}-" + version_string
             if kwargs_dict["execution_description"] is None:
                 kwargs_dict[
                     "execution_description"
                 ] = "Fabricated execution for dataset"
-            kwargs_dict["execution_id"] = self.execution_table.register(
-                kwargs_dict["execution_name"],
+            kwargs_dict["execution_id"] = self.execution_table._insert(
+                conn,
+                execution_name,
                 description=kwargs_dict["execution_description"],
                 execution_start=kwargs_dict["execution_start"],
                 site=kwargs_dict["execution_site"],
@@ -317,77 +648,251 @@ class DatasetTable(BaseTable):
                 input_datasets=kwargs_dict["input_datasets"],
                 input_production_datasets=kwargs_dict["input_production_datasets"],
             )
+        values["execution_id"] = kwargs_dict["execution_id"]
+
+        # The `dataset_unique` constraint stops a second dataset with the
+        # same name, version, owner and owner_type
+        stmt = (
+            insert(dataset_table)
+            .values(values)
+            .returning(
+                dataset_table.c.dataset_id,
+                dataset_table.c.version_major,
+                dataset_table.c.version_minor,
+                dataset_table.c.version_patch,
+                dataset_table.c.version_string,
+                dataset_table.c.relative_path,
+            )
+        )
+        try:
+            row = conn.execute(stmt).one()
+        except IntegrityError as e:
+            if _is_unique_violation(e, "dataset_unique"):
+                raise ValueError(
+                    "There is already a dataset with combination name,"
+                    "version_string, owner, owner_type"
+                ) from e
+            raise
+
+        prim_key = row.dataset_id
+        for col in ["version_major", "version_minor", "version_patch",
+                    "version_string", "relative_path"]:
+            kwargs_dict[col] = getattr(row, col)
+        if check_path is not None and bumped_path:
+            check_path(conn, prim_key)
+
+        # Tag the keywords, with one multi-row INSERT
+        keyword_ids = set(kwargs_dict["keyword_ids"])
+        if len(keyword_ids) > 0:
+            conn.execute(
+                insert(self._get_table_metadata("dataset_keyword")),
+                [
+                    {"dataset_id": prim_key, "keyword_id": k}
+                    for k in sorted(keyword_ids)
+                ],
+            )
 
-        # Fill final values into the dict
-        kwargs_dict["name"] = name
-        kwargs_dict["register_date"] = datetime.now()
-        kwargs_dict["fetch_date"] = kwargs_dict["register_date"]
-        kwargs_dict["creator_uid"] = self._uid
-        kwargs_dict["register_root_dir"] = self._root_dir
-        if kwargs_dict["access_api_configuration"]:
-            kwargs_dict["access_api_configuration"] = _read_configuration_file(
-                kwargs_dict["access_api_configuration"],
-                kwargs_dict["max_config_length"],
+        return prim_key
+
+    def _version_lock_key(self, name):
+        """
+        The key locked (see `db_basic._lock_keys()`) while the next version of
+        the dataset `name` is allocated, and until it is committed.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        -------
+        - : str
+        """
+
+        return f"{self._schema}.dataset.version:{name}"
+
+    @staticmethod
+    def _bumped_version(dataset_table, name, bump):
+        """
+        SQL expressions for the next version of the dataset `name`, bumping
+        the "major", "minor" or "patch" field of its latest version (so the
+        database computes the version as the row is inserted).
+
+        Parameters
+        ----------
+        dataset_table : sqlalchemy.Table
+        name : str
+        bump : str
+            "major", "minor" or "patch"
+
+        Returns
+        -------
+        v_fields : dict
+            SQL expressions for the "major", "minor" and "patch" fields and
+            the version "string"
+        """
+
+        latest = (
+            select(dataset_table.c.version_major)
+            .where(dataset_table.c.name == name)
+            .order_by(
+                dataset_table.c.version_major.desc(),
+                dataset_table.c.version_minor.desc(),
+                dataset_table.c.version_patch.desc(),
+            )
+            .limit(1)
+        )
+        v_fields = {
+            k: func.coalesce(
+                latest.with_only_columns(
+                    dataset_table.c[f"version_{k}"]
+                ).scalar_subquery(),
+                0,
             )
+            for k in ["major", "minor", "patch"]
+        }
+        v_fields = _increment_version(v_fields, bump)
+        for k in ["major", "minor", "patch"]:
+            if isinstance(v_fields[k], int):
+                v_fields[k] = literal(v_fields[k], Integer)
+
+        v_fields["string"] = (
+            cast(v_fields["major"], String) + "."
+            + cast(v_fields["minor"], String) + "."
+            + cast(v_fields["patch"], String)
+        )
+        return v_fields
 
-        # We tentatively start with an "invalid" dataset in the database. This
-        # will be upgraded to valid if data copying (if any) was successful.
-        kwargs_dict["status"] = 0
+    def _ingest_row(self, prim_key, kwargs_dict, gen_path=False, stage=False,
+                    reuse=None, replaces=None, job=None):
+        """
+        Ingest the data of a newly created (invalid) dataset row, then
+        complete the row and mark it valid.
 
-        # Create a new row in the data registry database.
-        dataset_table = self._get_table_metadata("dataset")
-        with self._engine.connect() as conn:
-            prim_key = add_table_row(conn,
-                                     dataset_table,
-                                     kwargs_dict,
-                                     commit=True)
+        Parameters
+        ----------
+        prim_key : int
+            The dataset ID of the row
+        kwargs_dict : dict
+        gen_path : bool, optional
+        stage : bool, optional
+            Stage the data and swap it in place of existing data (see
+            `_handle_data`)
+        reuse : _Reuse, optional
+            Files of a previous iteration to reuse (see `_handle_data`)
+        replaces : int, optional
+            The dataset being replaced (kept in the ingest journal, so a
+            resumed replace can be completed)
+        job : IngestJob, optional
+            When ingesting in the background, the job doing so
+        """
 
         # Get dataset characteristics; copy to `root_dir` if requested
+        journal = None
         if kwargs_dict["location_type"] == "dataregistry":
-            (
-                dataset_organization,
-                num_files,
-                total_size,
-                ds_creation_date,
-            ) = self._handle_data(
-                kwargs_dict["relative_path"],
-                kwargs_dict["old_location"],
-                kwargs_dict["owner"],
-                kwargs_dict["owner_type"],
-                gen_path=gen_path,
-            )
+            # Keep a journal of the files copied, so an interrupted copy can
+            # be resumed (see `resume()`)
+            if kwargs_dict["old_location"]:
+                creation_date = kwargs_dict["creation_date"]
+                journal = _IngestJournal(
+                    _journal_path(
+                        prim_key, schema=self._schema, root_dir=self._root_dir
+                    ),
+                    keywords=kwargs_dict["keywords"],
+                    creation_date=(
+                        None if creation_date is None
+                        else creation_date.isoformat()
+                    ),
+                    replaces=replaces,
+                )
+            try:
+                (
+                    dataset_organization,
+                    num_files,
+                    total_size,
+                    ds_creation_date,
+                    ingest_mode,
+                    manifest,
+                    _,
+                ) = self._handle_data(
+                    kwargs_dict["relative_path"],
+                    kwargs_dict["old_location"],
+                    kwargs_dict["owner"],
+                    kwargs_dict["owner_type"],
+                    gen_path=gen_path,
+                    ingest_mode=kwargs_dict["ingest_mode"],
+                    checksum=kwargs_dict["checksum"],
+                    stage=stage,
+                    reuse=reuse,
+                    journal=journal,
+                    job=job,
+                    replaces=replaces,
+                )
+            finally:
+                if journal is not None:
+                    journal.close()
         else:
             dataset_organization = kwargs_dict["location_type"]
             num_files = 0
             total_size = 0
             ds_creation_date = None
+            ingest_mode = None
+            manifest = []
 
         # Case where user is overwriting the dataset `creation_date`
         if kwargs_dict["creation_date"]:
             ds_creation_date = kwargs_dict["creation_date"]
 
         # Copy was successful
+        self._set_data_info(
+            prim_key,
+            dataset_organization,
+            num_files,
+            total_size,
+            ds_creation_date,
+            ingest_mode,
+            manifest,
+            set_dataset_status(kwargs_dict["status"], valid=True),
+        )
+
+        if journal is not None:
+            journal.remove()
+
+        return prim_key
+
+    def _set_data_info(self, dataset_id, dataset_organization, num_files,
+                       total_size, ds_creation_date, ingest_mode, manifest,
+                       status):
+        """
+        Update a dataset entry with the characteristics of its data, and
+        record its manifest, once the data is in place.
+
+        Parameters
+        ----------
+        dataset_id : int
+        dataset_organization, num_files, total_size, ds_creation_date,
+        ingest_mode, manifest :
+            See `_handle_data()`
+        status : int
+            The new status of the dataset
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
         with self._engine.connect() as conn:
-            # Update the entry with dataset metadata
             update_stmt = (
                 update(dataset_table)
-                .where(dataset_table.c.dataset_id == prim_key)
+                .where(dataset_table.c.dataset_id == dataset_id)
                 .values(
                     data_org=dataset_organization,
                     nfiles=num_files,
                     total_disk_space=total_size / _TO_MBYTE,
                     creation_date=ds_creation_date,
-                    status=set_dataset_status(kwargs_dict["status"],
-                                              valid=True),
+                    ingest_mode=ingest_mode,
+                    status=status,
                 )
             )
             conn.execute(update_stmt)
+            self._insert_manifest(conn, self._manifest_rows(dataset_id, manifest))
             conn.commit()
-        self.keyword_table.add_keywords_to_dataset(
-            prim_key,
-            kwargs_dict["keywords"])
-
-        return prim_key
 
     @_extract_kwargs_to_dict
     def register(
@@ -417,6 +922,9 @@ class DatasetTable(BaseTable):
         contact_email=None,
         test_production=False,
         relative_path=None,
+        ingest_mode="copy",
+        checksum=False,
+        background=False,
         kwargs_dict=None,
     ):
         """
@@ -471,6 +979,28 @@ class DatasetTable(BaseTable):
                          code for production owner_type
         relative_path** : str, optional. Always None for datasets with
                           location_type "external" or "meta_only"
+        ingest_mode : str, optional
+            How data from `old_location` is brought into the `root_dir`:
+            "copy" (default) a regular copy, "reflink" a copy-on-write clone
+            (where the filesystem supports it), "hardlink" hard links to the
+            source files (the data is then shared with `old_location`),
+            "move" a rename of `old_location` (same device only, the source is
+            gone afterwards) or "auto" the cheapest of a reflink, an in-kernel
+            `copy_file_range` or a copy. Whenever a mode is not possible the
+            data is copied instead. The mode actually used is recorded in the
+            `ingest_mode` column.
+        checksum : bool, optional
+            Compute a digest of each ingested file (while it is copied) for
+            the `dataset_manifest` table. Off by default, as hashing reads all
+            the data, also for the ingest modes that otherwise do not
+            ("reflink", "hardlink", "move", ...). The manifest (path, size and
+            modification time of each file) is recorded either way for data
+            ingested from `old_location`.
+        background : bool, optional
+            Return as soon as the (invalid) dataset entry is created, with a
+            job handle, rather than when the data has been ingested. The data
+            is then copied, and the entry completed, by a pool of
+            `ingest_workers` background threads (see `jobs()`).
         kwargs_dict : dict
             Stores all the keyword arguments passed to this function (and
             defaults). Automatically generated by the decorator, do not pass
@@ -482,13 +1012,25 @@ class DatasetTable(BaseTable):
             The dataset ID of the new row relating to this entry (else None)
         execution_id : int
             The execution ID associated with the dataset
+
+        With `background=True` an `IngestJob` is returned instead, whose
+        `wait()` returns the two values above once the ingest is done.
         """
 
-        # Validate the inputs we are working with
-        self._validate_register_inputs(name, version, kwargs_dict)
+        # Validate the inputs we are working with (the keywords are looked up
+        # as the dataset is inserted)
+        self._validate_register_inputs(
+            name, version, kwargs_dict, check_keywords=False
+        )
+        for k in kwargs_dict["keywords"]:
+            if not isinstance(k, str):
+                raise ValueError(f"{k} is not a valid keyword string")
 
-        # Compute version string
-        self._compute_version_string(name, version, kwargs_dict)
+        # Compute version string (a version bump is computed by the database,
+        # as the dataset is inserted)
+        bump = version in ["major", "minor", "patch"]
+        if not bump:
+            self._compute_version_string(name, version, kwargs_dict)
 
         # If `relative_path` not passed, automatically generate it
         # But for location types "external" and "meta_only" it should
@@ -499,133 +1041,717 @@ class DatasetTable(BaseTable):
             kwargs_dict["relative_path"] = None
         elif kwargs_dict["relative_path"] is None:
             gen_path = True
-            kwargs_dict["relative_path"] = _relpath_from_name(
-                name, kwargs_dict["version_string"],
-                kwargs_dict["old_location"]
-            )
+            if not bump:
+                kwargs_dict["relative_path"] = _relpath_from_name(
+                    name, kwargs_dict["version_string"],
+                    kwargs_dict["old_location"]
+                )
 
-        # Make sure the relative_path in the `root_dir` is avaliable
+        # Make sure the relative_path in the `root_dir` is avaliable (checked
+        # in the same transaction the dataset is inserted in). Even a
+        # generated path with a bumped version can be taken, e.g., by an
+        # entry made before `.gen_paths` was reserved.
+        check_path = None
         if kwargs_dict["location_type"] in ["dataregistry", "dummy"]:
-            will_copy = kwargs_dict["old_location"]
-            previous_datasets = self._find_previous(
-                None,
-                None,
-                kwargs_dict["owner"],
-                kwargs_dict["owner_type"],
-                relative_path=kwargs_dict["relative_path"],
-            )
+            def check_path(conn, dataset_id=None):
+                previous_datasets = [
+                    d for d in self._find_previous(
+                        None,
+                        None,
+                        kwargs_dict["owner"],
+                        kwargs_dict["owner_type"],
+                        relative_path=kwargs_dict["relative_path"],
+                        conn=conn,
+                    )
+                    if d.dataset_id != dataset_id
+                ]
 
-            # If results are found, we can only use the old `relative_path` if
-            # that dataset is now deleted (and not archived)
-            if len(previous_datasets) > 0:
-                dest = _form_dataset_path(
-                    kwargs_dict["owner_type"],
-                    kwargs_dict["owner"],
-                    kwargs_dict["relative_path"],
-                    schema=self._schema,
-                    root_dir=self._root_dir,
-                )
+                if len(previous_datasets) > 0:
+                    self._check_relative_path_available(
+                        previous_datasets[-1], kwargs_dict
+                    )
 
-                warned = False
-                if get_dataset_status(previous_datasets[-1].status, "archived"):
-                    if will_copy:
-                        raise ValueError(
-                            f"Relative path {dest} is reserved "
-                            f"for archived datasetid={previous_datasets[-1].dataset_id}"
-                        )
-                    else:
-                        warnings.warn(
-                            "Warning: found existing entry with path "
-                            f"{kwargs_dict['relative_path']}",
-                            UserWarning,
-                        )
-                        warned = True
+        # Register the new row in the dataset table. There cannot already be a
+        # database entry with this name/version combination (enforced by the
+        # `dataset_unique` constraint)
+        kwargs_dict["replace_iteration"] = 0
+        prim_key = self._register_row(name, version, kwargs_dict,
+                                      gen_path=gen_path,
+                                      background=kwargs_dict["background"],
+                                      check_path=check_path)
+        if kwargs_dict["background"]:
+            return prim_key
 
-                if not get_dataset_status(previous_datasets[-1].status,
-                                          "deleted"):
-                    if will_copy:
-                        raise ValueError(
-                            "Relative path {dest} is taken by "
-                            f"datasetid={previous_datasets[-1].dataset_id}"
-                        )
-                    else:
-                        if not warned:
-                            warnings.warn(
-                                "Warning: found existing entry with path "
-                                f"{kwargs_dict['relative_path']}",
-                                UserWarning,
-                            )
+        return prim_key, kwargs_dict["execution_id"]
 
-        # Make sure there is not already a database entry with this
-        # name/version combination
-        kwargs_dict["replace_iteration"] = 0
-        if kwargs_dict["location_type"] in ["dataregistry", "dummy"]:
-            previous_datasets = self._find_previous(
-                name,
-                kwargs_dict["version_string"],
-                kwargs_dict["owner"],
-                kwargs_dict["owner_type"],
-            )
+    def _submit(self, job, fn, *args, **kwargs):
+        """
+        Run `fn(*args, job=job, **kwargs)` in the pool of background ingest
+        workers.
+        """
 
-            if len(previous_datasets) > 0:
-                raise ValueError(
-                    "There is already a dataset with combination name,"
-                    "version_string, owner, owner_type"
+        with self._jobs_lock:
+            if self._ingest_pool is None:
+                self._ingest_pool = ThreadPoolExecutor(
+                    max_workers=self.ingest_workers,
+                    thread_name_prefix="dataregistry-ingest",
                 )
+            self._jobs = [j for j in self._jobs if not j.done()]
+            job._future = self._ingest_pool.submit(fn, *args, job=job,
+                                                   **kwargs)
+            self._jobs.append(job)
 
-        # Register the new row in the dataset table
-        prim_key = self._register_row(name, version, kwargs_dict,
-                                      gen_path=gen_path)
+    def jobs(self):
+        """
+        The background ingest jobs (see `register(..., background=True)`)
+        of this instance that are queued or running.
 
-        return prim_key, kwargs_dict["execution_id"]
+        Returns
+        -------
+        jobs : list[IngestJob]
+        """
 
-    @_extract_kwargs_to_dict
-    def replace(
-        self,
-        name,
-        version,
-        creation_date=None,
-        description=None,
-        execution_id=None,
-        access_api=None,
-        access_api_configuration=None,
-        is_overwritable=False,
-        old_location=None,
-        owner=None,
-        owner_type=None,
-        execution_name=None,
-        execution_description=None,
-        execution_start=None,
-        execution_site=None,
-        execution_configuration=None,
-        input_datasets=[],
-        input_production_datasets=[],
-        max_config_length=None,
-        keywords=[],
-        location_type="dataregistry",
-        url=None,
-        contact_email=None,
-        test_production=False,
-        kwargs_dict=None,
-    ):
+        with self._jobs_lock:
+            return [j for j in self._jobs if not j.done()]
+
+    def list_ingest_jobs(self):
         """
-        Replace a dataset in the registry.
+        The data ingests in flight in this schema, from any process, found
+        from their ingest journals (see `resume()`).
 
-        This is so a user can keep the same
+        Ingests that are still "running" are listed along with those that
+        were "interrupted" (and can be resumed).
+
+        Returns
+        -------
+        jobs : list[dict]
+            One per ingest, sorted by dataset ID, with the "dataset_id",
+            "name", "version_string" and "owner" of the dataset, the
+            "source" of the data, the "state", "files_done", "num_files",
+            "bytes_done" and "total_size" of the ingest (see `JobProgress`)
+            and the time of the "last_update" to its journal
+        """
+
+        journal_dir = os.path.dirname(
+            _journal_path(0, schema=self._schema, root_dir=self._root_dir)
+        )
+        found = _list_journals(journal_dir)
+        if len(found) == 0:
+            return []
+
+        dataset_table = self._get_table_metadata("dataset")
+        stmt = select(
+            dataset_table.c.dataset_id,
+            dataset_table.c.name,
+            dataset_table.c.version_string,
+            dataset_table.c.owner,
+        ).where(dataset_table.c.dataset_id.in_([j.dataset_id for j in found]))
+        with self._engine.connect() as conn:
+            entries = {r.dataset_id: r for r in conn.execute(stmt)}
+
+        jobs = []
+        for j in found:
+            entry = entries.get(j.dataset_id)
+            jobs.append(
+                {
+                    "dataset_id": j.dataset_id,
+                    "name": None if entry is None else entry.name,
+                    "version_string": (
+                        None if entry is None else entry.version_string
+                    ),
+                    "owner": None if entry is None else entry.owner,
+                    "source": j.source,
+                    **j.progress._asdict(),
+                    "last_update": j.last_update,
+                }
+            )
+        return jobs
+
+    def _insert_many_rows(self, conn, todo, exec_rows, now):
+        """
+        Insert the fabricated executions (and their dependencies) and the
+        dataset rows of a batch of `register_many()` entries, with multi-row
+        INSERTs. Nothing is committed.
+
+        Parameters
+        ----------
+        conn : SQLAlchemy Connection object
+        todo : dict[int, tuple]
+            The (name, version, kwargs_dict) of each entry, keyed by index
+        exec_rows : dict[int, dict]
+            The execution row to fabricate, for the entries that need one
+        now : datetime
+            Registration time
+
+        Returns
+        -------
+        inserted : dict[int, tuple]
+            The (execution_id, dataset_id) of each entry of `todo`
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
+        exec_table = self._get_table_metadata("execution")
+        dependency_table = self._get_table_metadata("dependency")
+        columns = [c.name for c in dataset_table.c if c.name != "dataset_id"]
+
+        exec_ids = {i: kd["execution_id"] for i, (_, _, kd) in todo.items()}
+        new_execs = [i for i in todo.keys() if i in exec_rows]
+        if len(new_execs) > 0:
+            e_ids = add_table_rows(
+                conn, exec_table, [exec_rows[i] for i in new_execs], commit=False
+            )
+            exec_ids.update(zip(new_execs, e_ids))
+
+            dependency_rows = []
+            for i in new_execs:
+                kwargs_dict = todo[i][2]
+                for col, ids in [
+                    ("input_id", kwargs_dict["input_datasets"]),
+                    ("input_production_id",
+                     kwargs_dict["input_production_datasets"]),
+                ]:
+                    for d in ids:
+                        row = {
+                            "register_date": now,
+                            "input_id": None,
+                            "input_production_id": None,
+                            "execution_id": exec_ids[i],
+                        }
+                        row[col] = d
+                        dependency_rows.append(row)
+            if len(dependency_rows) > 0:
+                conn.execute(insert(dependency_table), dependency_rows)
+
+        d_ids = add_table_rows(
+            conn,
+            dataset_table,
+            [
+                {
+                    **{c: kd.get(c) for c in columns if c != "ingest_mode"},
+                    "execution_id": exec_ids[i],
+                }
+                for i, (_, _, kd) in todo.items()
+            ],
+            commit=False,
+        )
+        return {i: (exec_ids[i], d_id) for i, d_id in zip(todo.keys(), d_ids)}
+
+    def register_many(self, specs, max_workers=None):
+        """
+        Create many new dataset entries in the DESC data registry at once.
+
+        Each entry of `specs` is a dict of the arguments that would be passed
+        to `register()` (including `name` and `version`). Rather than
+        registering each dataset in turn, the work is batched:
+
+            - The inputs of every dataset are validated up front
+            - Keywords, input datasets, previous versions (for version bumps)
+              and clashes with existing datasets are each found with a single
+              set-based query
+            - The fabricated executions, their dependencies and the dataset
+              rows are inserted with multi-row INSERTs, in one transaction
+            - Data is copied into the `root_dir` in parallel
+            - The datasets whose data was copied are marked valid, and tagged
+              with their keywords, in one transaction
+
+        A problem with one dataset (bad inputs, a clash with an existing
+        dataset or a failed copy) does not stop the others, it is reported in
+        `errors` instead. As with `register()`, a dataset whose data failed to
+        copy stays in the registry with an invalid status.
+
+        Parameters
+        ----------
+        specs : list[dict]
+            The `register()` arguments for each dataset
+        max_workers : int, optional
+            Number of threads used to copy the data (default is the
+            `concurrent.futures.ThreadPoolExecutor` default)
+
+        Returns
+        -------
+        dataset_ids : list[int]
+            The dataset ID of each entry in `specs` (in input order), None
+            where the registration failed
+        errors : dict[int, Exception]
+            What went wrong, keyed by index in `specs`
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
+        errors = {}
+
+        # Default value of every `register()` argument
+        defaults = {
+            k: p.default
+            for k, p in inspect.signature(self.register).parameters.items()
+            if p.default is not inspect.Parameter.empty and k != "kwargs_dict"
+        }
+
+        # Validate the inputs of each dataset
+        todo = {}
+        for i, spec in enumerate(specs):
+            try:
+                spec = dict(spec)
+                name = spec.pop("name", None)
+                version = spec.pop("version", None)
+                unknown = set(spec.keys()) - set(defaults.keys())
+                if len(unknown) > 0:
+                    raise ValueError(f"Unknown register arguments {sorted(unknown)}")
+
+                kwargs_dict = {**defaults, **spec}
+                self._validate_register_inputs(
+                    name, version, kwargs_dict, check_keywords=False
+                )
+                for k in kwargs_dict["keywords"]:
+                    if not isinstance(k, str):
+                        raise ValueError(f"{k} is not a valid keyword string")
+                if version not in ["major", "minor", "patch"]:
+                    _parse_version_string(version)
+
+                todo[i] = (name, version, kwargs_dict)
+            except Exception as e:
+                errors[i] = e
+
+        # Look up all the keywords at once
+        found = self.keyword_table._lookup_keywords(
+            [k.lower() for _, _, kd in todo.values() for k in kd["keywords"]]
+        )
+        for i, (_, _, kwargs_dict) in list(todo.items()):
+            lowered = [k.lower() for k in kwargs_dict["keywords"]]
+            if not all(k in found for k in lowered):
+                errors[i] = ValueError("Not all keywords selected are registered")
+                del todo[i]
+                continue
+            kwargs_dict["keyword_ids"] = [
+                found[k].keyword_id for k in lowered if found[k].active
+            ]
+
+        # Check all the input datasets (of the fabricated executions) exist
+        # at once
+        input_keys = ["input_datasets", "input_production_datasets"]
+        with_inputs = {
+            i: kd for i, (_, _, kd) in todo.items() if kd["execution_id"] is None
+        }
+        missing = self.execution_table._missing_inputs(
+            *[[d for kd in with_inputs.values() for d in kd[k]] for k in input_keys]
+        )
+        for i, kwargs_dict in with_inputs.items():
+            bad = {
+                k: [d for d in kwargs_dict[k] if d in missing.get(k, [])]
+                for k in input_keys
+            }
+            bad = {k: v for k, v in bad.items() if len(v) > 0}
+            if len(bad) > 0:
+                errors[i] = DataRegistryMissingInputs(bad)
+                del todo[i]
+
+        # One transaction from reading the latest versions to inserting the
+        # new ones, so that concurrent bumps of the same names wait for it
+        # (on sqlite the transaction is begun here, for the savepoints below)
+        with self._engine.connect() as conn:
+            # Latest existing version of each dataset name we bump the version of
+            bump_names = {
+                name for name, version, _ in todo.values()
+                if version in ["major", "minor", "patch"]
+            }
+            _lock_keys(conn, [self._version_lock_key(n) for n in bump_names])
+            latest = {}
+            if len(bump_names) > 0:
+                stmt = select(
+                    dataset_table.c.name,
+                    dataset_table.c.version_major,
+                    dataset_table.c.version_minor,
+                    dataset_table.c.version_patch,
+                ).where(dataset_table.c.name.in_(bump_names))
+                for r in conn.execute(stmt):
+                    v = (int(r.version_major), int(r.version_minor),
+                         int(r.version_patch))
+                    latest[r.name] = max(latest.get(r.name, (0, 0, 0)), v)
+
+            # Compute the version strings (in input order, so that bumps within
+            # the batch build on each other) and relative paths
+            for i, (name, version, kwargs_dict) in todo.items():
+                if version in ["major", "minor", "patch"]:
+                    old = dict(zip(["major", "minor", "patch"],
+                                   latest.get(name, (0, 0, 0))))
+                    v_fields = _increment_version(old, version)
+                    version_string = (
+                        f"{v_fields['major']}.{v_fields['minor']}.{v_fields['patch']}"
+                    )
+                else:
+                    v_fields = _parse_version_string(version)
+                    version_string = version
+                if name in bump_names:
+                    latest[name] = max(
+                        latest.get(name, (0, 0, 0)),
+                        (int(v_fields["major"]), int(v_fields["minor"]),
+                         int(v_fields["patch"])),
+                    )
+
+                kwargs_dict["version_major"] = v_fields["major"]
+                kwargs_dict["version_minor"] = v_fields["minor"]
+                kwargs_dict["version_patch"] = v_fields["patch"]
+                kwargs_dict["version_string"] = version_string
+
+                kwargs_dict["gen_path"] = False
+                if kwargs_dict["location_type"] in ["external", "meta_only"]:
+                    kwargs_dict["relative_path"] = None
+                elif kwargs_dict["relative_path"] is None:
+                    kwargs_dict["gen_path"] = True
+                    kwargs_dict["relative_path"] = _relpath_from_name(
+                        name, version_string, kwargs_dict["old_location"]
+                    )
+
+            # Find clashes with existing datasets (same name/version/owner/
+            # owner_type, or same relative_path/owner/owner_type for datasets
+            # with data in the `root_dir`)
+            name_keys = {
+                i: (name, kd["version_string"], kd["owner"], kd["owner_type"])
+                for i, (name, _, kd) in todo.items()
+            }
+            path_keys = {
+                i: (kd["relative_path"], kd["owner"], kd["owner_type"])
+                for i, (_, _, kd) in todo.items()
+                if kd["location_type"] in ["dataregistry", "dummy"]
+            }
+            taken_names = set()
+            previous_paths = {}
+            if len(name_keys) > 0:
+                name_cols = (
+                    dataset_table.c.name,
+                    dataset_table.c.version_string,
+                    dataset_table.c.owner,
+                    dataset_table.c.owner_type,
+                )
+                stmt = select(*name_cols).where(
+                    tuple_(*name_cols).in_(set(name_keys.values()))
+                )
+                taken_names = {tuple(r) for r in conn.execute(stmt)}
+            if len(path_keys) > 0:
+                path_cols = (
+                    dataset_table.c.relative_path,
+                    dataset_table.c.owner,
+                    dataset_table.c.owner_type,
+                )
+                stmt = (
+                    select(
+                        *path_cols,
+                        dataset_table.c.dataset_id,
+                        dataset_table.c.status,
+                    )
+                    .where(tuple_(*path_cols).in_(set(path_keys.values())))
+                    .order_by(dataset_table.c.register_date.asc())
+                )
+                for r in conn.execute(stmt):
+                    previous_paths[tuple(r[:3])] = r
+
+            batch_paths = set()
+            for i, (_, _, kwargs_dict) in list(todo.items()):
+                try:
+                    if name_keys[i] in taken_names:
+                        raise ValueError(
+                            "There is already a dataset with combination name,"
+                            "version_string, owner, owner_type"
+                        )
+                    if i in path_keys:
+                        if path_keys[i] in previous_paths:
+                            self._check_relative_path_available(
+                                previous_paths[path_keys[i]], kwargs_dict
+                            )
+                        if kwargs_dict["old_location"] and path_keys[i] in batch_paths:
+                            raise ValueError(
+                                f"Relative path {kwargs_dict['relative_path']} is "
+                                "used by more than one dataset in this batch"
+                            )
+                except Exception as e:
+                    errors[i] = e
+                    del todo[i]
+                    continue
+
+                # Later entries in the batch clash with this one
+                taken_names.add(name_keys[i])
+                if i in path_keys:
+                    batch_paths.add(path_keys[i])
+
+            # Build the execution and dataset rows
+            now = datetime.now()
+            exec_rows = {}
+            for i, (name, version, kwargs_dict) in list(todo.items()):
+                try:
+                    if kwargs_dict["execution_id"] is None:
+                        exec_rows[i] = {
+                            "name": kwargs_dict["execution_name"]
+                            or f"for_dataset_{name}-{kwargs_dict['version_string']}",
+                            "description": kwargs_dict["execution_description"]
+                            or "Fabricated execution for dataset",
+                            "execution_start": kwargs_dict["execution_start"],
+                            "site": kwargs_dict["execution_site"],
+                            "configuration": _read_configuration_file(
+                                kwargs_dict["execution_configuration"],
+                                kwargs_dict["max_config_length"],
+                            )
+                            if kwargs_dict["execution_configuration"]
+                            else None,
+                            "register_date": now,
+                            "creator_uid": self._uid,
+                        }
+
+                    kwargs_dict["name"] = name
+                    kwargs_dict["register_date"] = now
+                    kwargs_dict["fetch_date"] = now
+                    kwargs_dict["creator_uid"] = self._uid
+                    kwargs_dict["register_root_dir"] = self._root_dir
+                    kwargs_dict["replace_iteration"] = 0
+                    kwargs_dict["status"] = 0
+                    if kwargs_dict["access_api_configuration"]:
+                        kwargs_dict["access_api_configuration"] = (
+                            _read_configuration_file(
+                                kwargs_dict["access_api_configuration"],
+                                kwargs_dict["max_config_length"],
+                            )
+                        )
+                except Exception as e:
+                    errors[i] = e
+                    del todo[i]
+                    exec_rows.pop(i, None)
+
+            # Insert the executions, dependencies and datasets in one
+            # transaction
+            dataset_ids = [None] * len(specs)
+            if len(todo) > 0:
+                try:
+                    with conn.begin_nested():
+                        inserted = self._insert_many_rows(
+                            conn, todo, exec_rows, now
+                        )
+                except IntegrityError as e:
+                    if not _is_unique_violation(e, "dataset_unique"):
+                        raise
+
+                    # A concurrent writer registered a clashing dataset since
+                    # the checks above, insert the datasets one at a time to
+                    # find which
+                    inserted = {}
+                    for i in list(todo.keys()):
+                        try:
+                            with conn.begin_nested():
+                                inserted.update(
+                                    self._insert_many_rows(
+                                        conn, {i: todo[i]}, exec_rows, now
+                                    )
+                                )
+                        except IntegrityError as e:
+                            if not _is_unique_violation(e, "dataset_unique"):
+                                raise
+                            errors[i] = ValueError(
+                                "There is already a dataset with combination name,"
+                                "version_string, owner, owner_type"
+                            )
+                            del todo[i]
+
+                for i, (e_id, d_id) in inserted.items():
+                    todo[i][2]["execution_id"] = e_id
+                    dataset_ids[i] = d_id
+
+                conn.commit()
+
+        # Get dataset characteristics; prepare the destinations of data to
+        # copy (serially, as this may create directories)
+        to_copy = {}
+        for i, (_, _, kwargs_dict) in list(todo.items()):
+            if kwargs_dict["location_type"] != "dataregistry":
+                kwargs_dict["data_info"] = _DataInfo(
+                    kwargs_dict["location_type"], 0, 0, None, None, [], None
+                )
+                continue
+            try:
+                kwargs_dict["data_info"] = self._handle_data(
+                    kwargs_dict["relative_path"],
+                    kwargs_dict["old_location"],
+                    kwargs_dict["owner"],
+                    kwargs_dict["owner_type"],
+                    gen_path=kwargs_dict["gen_path"],
+                    copy_data=False,
+                )
+            except Exception as e:
+                errors[i] = e
+                del todo[i]
+                continue
+            if kwargs_dict["old_location"]:
+                to_copy[i] = _form_dataset_path(
+                    kwargs_dict["owner_type"],
+                    kwargs_dict["owner"],
+                    kwargs_dict["relative_path"],
+                    schema=self._schema,
+                    root_dir=self._root_dir,
+                )
+
+        # Copy the data in parallel
+        if len(to_copy) > 0:
+            tic = time.time()
+            self.db_connection.logger.debug(f"Copying {len(to_copy)} datasets..")
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    i: pool.submit(
+                        _copy_data,
+                        todo[i][2]["data_info"].dataset_organization,
+                        todo[i][2]["old_location"],
+                        dest,
+                        ingest_mode=todo[i][2]["ingest_mode"],
+                        checksum=todo[i][2]["checksum"],
+                        scan=todo[i][2]["data_info"].scan,
+                        **self._copy_options(),
+                    )
+                    for i, dest in to_copy.items()
+                }
+            for i, future in futures.items():
+                if future.exception() is not None:
+                    errors[i] = future.exception()
+                    del todo[i]
+                else:
+                    ingest_mode, manifest = future.result()
+                    todo[i][2]["data_info"] = todo[i][2]["data_info"]._replace(
+                        ingest_mode=ingest_mode, manifest=manifest
+                    )
+            self.db_connection.logger.debug(f"- took {time.time() - tic:.2f}s")
+
+        # Mark the datasets valid and tag their keywords in one transaction
+        if len(todo) > 0:
+            update_stmt = (
+                update(dataset_table)
+                .where(dataset_table.c.dataset_id == bindparam("b_dataset_id"))
+                .values(
+                    data_org=bindparam("b_data_org"),
+                    nfiles=bindparam("b_nfiles"),
+                    total_disk_space=bindparam("b_total_disk_space"),
+                    creation_date=bindparam("b_creation_date"),
+                    ingest_mode=bindparam("b_ingest_mode"),
+                    status=bindparam("b_status"),
+                )
+            )
+            update_rows = []
+            keyword_rows = []
+            for i, (_, _, kwargs_dict) in todo.items():
+                (org, num_files, total_size, ds_creation_date,
+                 ingest_mode, _, _) = kwargs_dict["data_info"]
+                if kwargs_dict["creation_date"]:
+                    ds_creation_date = kwargs_dict["creation_date"]
+                update_rows.append(
+                    {
+                        "b_dataset_id": dataset_ids[i],
+                        "b_data_org": org,
+                        "b_nfiles": num_files,
+                        "b_total_disk_space": total_size / _TO_MBYTE,
+                        "b_creation_date": ds_creation_date,
+                        "b_ingest_mode": ingest_mode,
+                        "b_status": set_dataset_status(
+                            kwargs_dict["status"], valid=True
+                        ),
+                    }
+                )
+                for keyword_id in set(kwargs_dict["keyword_ids"]):
+                    keyword_rows.append(
+                        {"dataset_id": dataset_ids[i], "keyword_id": keyword_id}
+                    )
+
+            with self._engine.connect() as conn:
+                conn.execute(update_stmt, update_rows)
+                self._insert_manifest(
+                    conn,
+                    chain.from_iterable(
+                        self._manifest_rows(
+                            dataset_ids[i], kwargs_dict["data_info"].manifest
+                        )
+                        for i, (_, _, kwargs_dict) in todo.items()
+                    ),
+                )
+                if len(keyword_rows) > 0:
+                    conn.execute(
+                        insert(self._get_table_metadata("dataset_keyword")),
+                        keyword_rows,
+                    )
+                conn.commit()
+
+        # Failed entries (e.g., failed copies) do not report an ID
+        for i in errors.keys():
+            dataset_ids[i] = None
+
+        return dataset_ids, dict(sorted(errors.items()))
+
+    @_extract_kwargs_to_dict
+    def replace(
+        self,
+        name,
+        version,
+        creation_date=None,
+        description=None,
+        execution_id=None,
+        access_api=None,
+        access_api_configuration=None,
+        is_overwritable=False,
+        old_location=None,
+        owner=None,
+        owner_type=None,
+        execution_name=None,
+        execution_description=None,
+        execution_start=None,
+        execution_site=None,
+        execution_configuration=None,
+        input_datasets=[],
+        input_production_datasets=[],
+        max_config_length=None,
+        keywords=[],
+        location_type="dataregistry",
+        url=None,
+        contact_email=None,
+        test_production=False,
+        ingest_mode="copy",
+        checksum=False,
+        incremental=None,
+        kwargs_dict=None,
+    ):
+        """
+        Replace a dataset in the registry.
+
+        This is so a user can keep the same
         name/version/ower/owner_type combination as a previous
         dataset. Note the original dataset must have `is_overwritable=True` to
         allow the replace to work.
 
         The process is as follows:
-            - The original dataset is deleted, and the entry in the database
-              tagged accordingly
             - A new entry is made with the same name/version combination as
               before, and the data goes into the same relative_path as before.
               All other properties are what the user specifies in the replace
               function
+            - The original dataset is deleted, and the entry in the database
+              tagged accordingly
             - The old dataset gets pointed to the new dataset saying it is the
               most up to date iteration
 
+        When data is ingested (`old_location`), the new iteration is first
+        copied into a staging directory next to the old data. Once the copy
+        is complete (and checked against its manifest) the new data is
+        swapped in place of the old data with an atomic rename, and the old
+        data goes to the trash, as for a deleted dataset. Readers of the
+        dataset's path see either the old or the new data (on platforms
+        without an atomic exchange there is a brief moment with no data, see
+        `_swap_in`), and a failed replace leaves the old data intact.
+
+        With `incremental`, files that did not change from the old iteration
+        (according to its manifest) are hard linked into the staging
+        directory, and only new or changed files are copied.
+
+        Parameters
+        ----------
+        See `register()` (`relative_path` cannot be changed), and
+
+        incremental : str, optional
+            None (default) to copy all the data, or how to decide a file is
+            unchanged from the previous iteration, "mtime" (same size and
+            modification time) or "digest" (same size and checksum, the
+            previous iteration must have been registered with
+            `checksum=True`). Only applies when the previous iteration's data
+            was ingested into the `root_dir`.
+
         Returns
         -------
         prim_key : int
@@ -641,6 +1767,12 @@ class DatasetTable(BaseTable):
         if version in ["major", "minor", "patch"]:
             raise ValueError("Invalid version string for replace, no bumping")
 
+        if kwargs_dict["incremental"] not in [None] + _INCREMENTAL_MODES:
+            raise ValueError(
+                f"Invalid incremental mode {kwargs_dict['incremental']} "
+                f"(valid={_INCREMENTAL_MODES})"
+            )
+
         # Compute version string
         self._compute_version_string(name, version, kwargs_dict)
 
@@ -691,35 +1823,247 @@ class DatasetTable(BaseTable):
             )
 
         # Tag the old dataset as overwritten, and delete
-        dataset_table = self._get_table_metadata("dataset")
-
-        # Delete the old data (if not already deleted)
-        if not get_dataset_status(previous_datasets[-1].status, "deleted"):
-            self._delete_by_id(previous_datasets[-1].dataset_id)
+        if (
+            kwargs_dict["location_type"] == "dataregistry"
+            and kwargs_dict["old_location"] is not None
+        ):
+            # Stage the new iteration (from the old one if incremental) and
+            # swap it in, then tag the old dataset deleted (its data has
+            # already been swapped out)
+            reuse = self._previous_iteration(previous_datasets[-1], kwargs_dict)
+            prim_key = self._register_row(
+                name,
+                version,
+                kwargs_dict,
+                stage=True,
+                reuse=reuse,
+                replaces=previous_datasets[-1].dataset_id,
+            )
+            self._delete_by_id(previous_datasets[-1].dataset_id,
+                               delete_data=False)
+        else:
+            # Delete the old data (if not already deleted)
+            if not get_dataset_status(previous_datasets[-1].status, "deleted"):
+                self._delete_by_id(previous_datasets[-1].dataset_id)
 
-        # Register the new row in the dataset table
-        prim_key = self._register_row(name, version, kwargs_dict)
+            # Register the new row in the dataset table
+            prim_key = self._register_row(name, version, kwargs_dict)
 
         # Update the metadata of the replaced dataset to point to the dataset
         # that replaced it
+        self._point_to_replacement(
+            previous_datasets[-1].dataset_id, previous_datasets[-1].status, prim_key
+        )
+
+        return prim_key, kwargs_dict["execution_id"]
+
+    def _point_to_replacement(self, dataset_id, status, replace_id):
+        """
+        Tag a dataset as replaced, pointing it to the dataset that replaced it.
+
+        Parameters
+        ----------
+        dataset_id : int
+            The replaced dataset
+        status : int
+            Its status before it was replaced
+        replace_id : int
+            The dataset that replaced it
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
         with self._engine.connect() as conn:
             update_stmt = (
                 update(dataset_table)
-                .where(dataset_table.c.dataset_id == previous_datasets[-1].dataset_id)
+                .where(dataset_table.c.dataset_id == dataset_id)
                 .values(
-                    status=set_dataset_status(
-                        previous_datasets[-1].status, replaced=True
-                    ),
-                    replace_id=prim_key,
+                    status=set_dataset_status(status, replaced=True),
+                    replace_id=replace_id,
                 )
             )
             conn.execute(update_stmt)
             conn.commit()
 
-        return prim_key, kwargs_dict["execution_id"]
+    def resume(self, dataset_id):
+        """
+        Resume the registration of a dataset whose data ingest was
+        interrupted (e.g., the job was killed while the data was copied).
+
+        While data is ingested, the files copied (and checked) so far are
+        recorded in an ingest journal, under
+        `<root_dir>/<schema>/.ingest_journal/`. Resuming copies only the files
+        not yet copied (or changed since), then completes the registration
+        as `register()` (or `replace()`) would have: the entry is updated,
+        keywords tagged and the dataset marked valid.
+
+        The source data (`old_location`) must still be in place.
+
+        Parameters
+        ----------
+        dataset_id : int
+            The (invalid) dataset to resume
+
+        Returns
+        -------
+        dataset_id : int
+        """
+
+        entry = self.find_entry(dataset_id, raise_if_not_found=True)
+        if get_dataset_status(entry.status, "valid"):
+            raise ValueError(f"Dataset {dataset_id} is already valid")
+        if get_dataset_status(entry.status, "deleted"):
+            raise ValueError(f"Dataset {dataset_id} has been deleted")
+
+        path = _journal_path(dataset_id, schema=self._schema,
+                             root_dir=self._root_dir)
+        if not os.path.isfile(path):
+            raise ValueError(
+                f"No ingest journal for dataset {dataset_id}, cannot resume"
+            )
+        journal, done = _IngestJournal.read(path)
+        header = journal.header
+        target = header["staged"] or header["dest"]
+
+        self.db_connection.logger.info(
+            f"Resuming ingest of {header['source']} ({len(done)} files "
+            f"already copied)"
+        )
+        journal.reopen()
+        try:
+            ingest_mode, manifest = _resume_copy(
+                header["dataset_organization"],
+                header["source"],
+                target,
+                done,
+                journal,
+                ingest_mode=header["ingest_mode"],
+                checksum=header["checksum"],
+                **self._copy_options(),
+            )
+        finally:
+            journal.close()
+
+        bad = _verify_manifest(target, manifest)
+        if len(bad) > 0:
+            raise DataRegistryRootDirBadState(
+                f"Data at {target} does not match the source "
+                f"({len(bad)} bad files, e.g., {bad[0]})"
+            )
+        if header["staged"]:
+            self._swap_in_staged(header["staged"], header["dest"],
+                                 header["replaces"])
+
+        creation_date = header["creation_date"] or header["ds_creation_date"]
+        self._set_data_info(
+            dataset_id,
+            header["dataset_organization"],
+            len(manifest),
+            sum(m.size for m in manifest),
+            datetime.fromisoformat(creation_date),
+            ingest_mode,
+            manifest,
+            set_dataset_status(entry.status, valid=True),
+        )
+        self.keyword_table.add_keywords_to_dataset(dataset_id,
+                                                   header["keywords"])
+
+        # Complete an interrupted replace
+        if header["replaces"] is not None:
+            previous = self.find_entry(header["replaces"],
+                                       raise_if_not_found=True)
+            if not get_dataset_status(previous.status, "deleted"):
+                self._delete_by_id(header["replaces"], delete_data=False)
+            self._point_to_replacement(header["replaces"], previous.status,
+                                       dataset_id)
+
+        journal.remove()
+
+        return dataset_id
+
+    def _previous_iteration(self, previous_dataset, kwargs_dict):
+        """
+        For an incremental replace, what can be reused from the previous
+        iteration of the dataset.
+
+        Parameters
+        ----------
+        previous_dataset : Row
+            The dataset being replaced
+        kwargs_dict : dict
+            The `replace()` arguments
+
+        Returns
+        -------
+        reuse : _Reuse
+            None if the replace is not incremental, or there is nothing to
+            reuse (e.g., the previous data was not ingested, so has no
+            manifest)
+        """
+
+        if kwargs_dict["incremental"] is None:
+            return None
+        if kwargs_dict["location_type"] != "dataregistry":
+            return None
+        if kwargs_dict["old_location"] is None:
+            return None
+        if previous_dataset.location_type != "dataregistry":
+            return None
+        if get_dataset_status(previous_dataset.status, "deleted"):
+            return None
+
+        previous_path = _form_dataset_path(
+            kwargs_dict["owner_type"],
+            kwargs_dict["owner"],
+            previous_dataset.relative_path,
+            schema=self._schema,
+            root_dir=self._root_dir,
+        )
+        if not os.path.exists(previous_path):
+            return None
+
+        manifest = self._get_manifest(previous_dataset.dataset_id)
+        if len(manifest) == 0:
+            return None
+
+        return _Reuse(previous_path, manifest, kwargs_dict["incremental"])
+
+    def _get_manifest(self, dataset_id):
+        """
+        The manifest of the files ingested for a dataset.
+
+        Parameters
+        ----------
+        dataset_id : int
+
+        Returns
+        -------
+        manifest : list[ManifestEntry]
+            Sorted by path (empty if the dataset has no manifest)
+        """
+
+        manifest_table = self._get_table_metadata("dataset_manifest")
+        stmt = (
+            select(
+                manifest_table.c.relative_path,
+                manifest_table.c.size,
+                manifest_table.c.mtime,
+                manifest_table.c.digest,
+            )
+            .where(manifest_table.c.dataset_id == dataset_id)
+            .order_by(manifest_table.c.relative_path)
+        )
+        with self._engine.connect() as conn:
+            result = conn.execute(stmt)
+
+        return [
+            ManifestEntry(r.relative_path, r.size, r.mtime.timestamp(), r.digest)
+            for r in result
+        ]
 
     def _handle_data(self, relative_path, old_location, owner, owner_type,
-                     gen_path=False):
+                     gen_path=False, copy_data=True, ingest_mode="copy",
+                     checksum=False, stage=False, reuse=None, journal=None,
+                     job=None, replaces=None):
         """
         Find characteristics of dataset (i.e., is it a file or directory, how
         many files and total disk space of the dataset).
@@ -740,17 +2084,49 @@ class DatasetTable(BaseTable):
             Owner type of the dataset
         gen_path : boolean
             True if relative_path was not explicitly provided by user
+        copy_data : boolean
+            False to prepare the destination, but leave copying the data
+            (from `old_location`) to the caller
+        ingest_mode : str
+            How to bring the data in, see `register()`
+        checksum : bool
+            Compute the digests of the files for the manifest
+        stage : bool
+            Copy the data into a staging directory next to `relative_path`,
+            then swap it in place of any data already there (see `_swap_in`)
+        reuse : _Reuse
+            The previous iteration of the dataset (being replaced), whose
+            unchanged files are hard linked rather than copied (with `stage`)
+        journal : _IngestJournal
+            Record the progress of the copy (see `resume()`)
+        job : IngestJob
+            The background job ingesting the data, which follows the progress
+            of (and can cancel) the copy
+        replaces : int
+            The dataset being replaced (with `stage`), to whose trash the
+            data swapped out goes
 
         Returns
         -------
-        dataset_organization : str
-            "file" or "directory"
-        num_files : int
-            Total number of files making up dataset
-        total_size : float
-            Total disk space of dataset in bytes
-        ds_creation_date : datetime
-            When file or directory was created
+        data_info : _DataInfo
+            With,
+            dataset_organization : str
+                "file" or "directory"
+            num_files : int
+                Total number of files making up dataset
+            total_size : float
+                Total disk space of dataset in bytes
+            ds_creation_date : datetime
+                When file or directory was created
+            ingest_mode : str
+                How the data was ingested (None if no data was copied)
+            manifest : list[ManifestEntry]
+                The files ingested (empty if no data was copied)
+            scan : TreeScan
+                The scan of a directory dataset (None for a file)
+
+        The directory tree is only walked once, the scan used to count the
+        files is reused to copy them.
         """
 
         # Get destination directory in data registry.
@@ -767,8 +2143,8 @@ class DatasetTable(BaseTable):
             loc = old_location
 
             # In the case we are ingesting data, no data should already exist
-            # at `dest`
-            if os.path.exists(dest):
+            # at `dest` (unless we are replacing the data that is there)
+            if os.path.exists(dest) and not stage:
                 raise DataRegistryRootDirBadState(
                     f"data already exists at {dest}, it should not"
                 )
@@ -791,11 +2167,15 @@ class DatasetTable(BaseTable):
         ds_creation_date = datetime.fromtimestamp(os.path.getctime(loc))
 
         if dataset_organization == "directory":
-            num_files, total_size = get_directory_info(loc)
+            scan = _scan_tree(loc, workers=self.copy_workers)
+            num_files, total_size = scan.num_files, scan.total_size
         else:
+            scan = None
             num_files = 1
             total_size = os.path.getsize(loc)
         self.db_connection.logger.debug(f"  - took {time.time() - tic:.2f}s")
+        if job is not None:
+            job._start(num_files, total_size)
 
         # Copy data into data registry
         if old_location:
@@ -811,19 +2191,140 @@ class DatasetTable(BaseTable):
             # If owner or owner/.gen_paths subdir don't exist, create
             # These should have same permission bits as owner_type directory
             # (group write) whereas data to be copied has only group read
-            _INFRA_UMASK = 0o007
-            old_mask = os.umask(_INFRA_UMASK)
-            os.makedirs(dataset_parent, exist_ok=True)
-            _ = os.umask(old_mask)
+            _makedirs(dataset_parent, mode=_INFRA_DIR_MODE, exist_ok=True)
+
+            if not copy_data:
+                return _DataInfo(dataset_organization, num_files, total_size,
+                                 ds_creation_date, None, [], scan)
 
             tic = time.time()
             self.db_connection.logger.debug(
                 f"Copying {num_files} files ({total_size/1024/1024:.2f} Mb)..",
             )
-            _copy_data(dataset_organization, old_location, dest)
+            staged = _staging_path(dest) if stage else None
+            if journal is not None:
+                journal.start(
+                    source=old_location,
+                    dest=dest,
+                    staged=staged,
+                    dataset_organization=dataset_organization,
+                    ingest_mode=ingest_mode,
+                    checksum=checksum,
+                    ds_creation_date=ds_creation_date.isoformat(),
+                    num_files=num_files,
+                    total_size=total_size,
+                )
+
+            if not stage:
+                ingest_mode, manifest = _copy_data(
+                    dataset_organization,
+                    old_location,
+                    dest,
+                    ingest_mode=ingest_mode,
+                    checksum=checksum,
+                    scan=scan,
+                    journal=journal,
+                    job=job,
+                    **self._copy_options(),
+                )
+            else:
+                if os.path.exists(os.path.dirname(staged)):
+                    shutil.rmtree(os.path.dirname(staged))
+                try:
+                    ingest_mode, manifest = _copy_data(
+                        dataset_organization,
+                        old_location,
+                        staged,
+                        ingest_mode=ingest_mode,
+                        checksum=checksum,
+                        scan=scan,
+                        reuse=reuse,
+                        journal=journal,
+                        job=job,
+                        **self._copy_options(),
+                    )
+                    bad = _verify_manifest(staged, manifest)
+                    if len(bad) > 0:
+                        raise DataRegistryRootDirBadState(
+                            f"Staged data at {staged} does not match the "
+                            f"source ({len(bad)} bad files, e.g., {bad[0]})"
+                        )
+                except Exception:
+                    shutil.rmtree(os.path.dirname(staged), ignore_errors=True)
+                    raise
+                self._swap_in_staged(staged, dest, replaces)
             self.db_connection.logger.debug(f"- took {time.time() - tic:.2f}s")
+        else:
+            ingest_mode = None
+            manifest = []
+
+        return _DataInfo(dataset_organization, num_files, total_size,
+                         ds_creation_date, ingest_mode, manifest, scan)
+
+    def _swap_in_staged(self, staged, dest, replaces):
+        """
+        Swap the staged data of a replace in place of the data at `dest`
+        (see `_swap_in`). The old data goes to the trash of the replaced
+        dataset, to be purged as that of any deleted dataset (see
+        `_remove_data`).
+
+        Parameters
+        ----------
+        staged : str
+        dest : str
+        replaces : int
+            The dataset being replaced
+        """
+
+        old = _swap_in(staged, dest)
+        if old is None:
+            return
+
+        trash_dir = _trash_path(replaces, schema=self._schema,
+                                root_dir=self._root_dir)
+        if not _move_to_trash(old, trash_dir):
+            _parallel_rmtree(old, workers=self.purge_workers)
+        self.purge_trash(wait=False)
+
+    @staticmethod
+    def _manifest_rows(dataset_id, manifest):
+        """Rows of the `dataset_manifest` table for a dataset's manifest"""
+
+        for entry in manifest:
+            yield {
+                "dataset_id": dataset_id,
+                "relative_path": entry.relative_path,
+                "size": entry.size,
+                "mtime": datetime.fromtimestamp(entry.mtime),
+                "digest": entry.digest,
+                "digest_type": None if entry.digest is None else _MANIFEST_HASH,
+            }
+
+    def _insert_manifest(self, conn, rows):
+        """
+        Insert manifest rows (see `_manifest_rows`) in batches of
+        `_MANIFEST_BATCH_SIZE`, without committing.
+
+        Parameters
+        ----------
+        conn : sqlalchemy.engine.Connection
+        rows : iterable[dict]
+        """
+
+        manifest_table = self._get_table_metadata("dataset_manifest")
+        rows = iter(rows)
+        while batch := list(islice(rows, _MANIFEST_BATCH_SIZE)):
+            conn.execute(insert(manifest_table), batch)
 
-        return dataset_organization, num_files, total_size, ds_creation_date
+    def _copy_options(self):
+        """Keyword arguments for `_copy_data` set by this instance"""
+
+        return {
+            "copy_workers": self.copy_workers,
+            "large_file_workers": self.large_file_workers,
+            "large_file_threshold": self.large_file_threshold,
+            "logger": self.db_connection.logger,
+        }
 
     def _find_previous(
         self,
@@ -832,6 +2333,7 @@ class DatasetTable(BaseTable):
         owner,
         owner_type,
         relative_path=None,
+        conn=None,
     ):
         """
         Find all dataset entries with the same `name`, `version`,
@@ -846,6 +2348,10 @@ class DatasetTable(BaseTable):
         Parameters
         ----------
         name/version/owner/owner_type : str
+        relative_path : str, optional
+        conn : sqlalchemy.engine.Connection, optional
+            Connection to query on (within its transaction), by default a new
+            connection is used
 
         Returns
         -------
@@ -863,6 +2369,7 @@ class DatasetTable(BaseTable):
             dataset_table.c.relative_path,
             dataset_table.c.replace_iteration,
             dataset_table.c.status,
+            dataset_table.c.location_type,
         )
 
         if relative_path is not None:
@@ -885,6 +2392,9 @@ class DatasetTable(BaseTable):
             # Order by `replace_iteration`
             stmt = stmt.order_by(dataset_table.c.replace_iteration.asc())
 
+        if conn is not None:
+            return conn.execute(stmt).all()
+
         with self._engine.connect() as conn:
             result = conn.execute(stmt)
 
@@ -926,12 +2436,13 @@ class DatasetTable(BaseTable):
 
         self._delete_by_id(the_id, confirm=confirm)
 
-    def _delete_by_id(self, dataset_id, confirm=False):
+    def _delete_by_id(self, dataset_id, confirm=False, delete_data=True):
         """
         Delete an dataset entry from the DESC data registry.
 
-        This will also remove the raw data from the root dir, but the dataset
-        entry remains in the registry (now with an updated `status` field).
+        This will also move the raw data from the root dir to the trash (see
+        `purge_trash()`), but the dataset entry remains in the registry (now
+        with an updated `status` field).
 
         This is not designed to be called directly, as only needing to specify
         the `dataset_id` is loose, instead users should call the `delete()`
@@ -943,6 +2454,9 @@ class DatasetTable(BaseTable):
             Dataset we want to delete from the registry
         confirm : bool
             Will ask for a confirmation
+        delete_data : bool
+            False to only tag the entry as deleted, leaving the data (e.g.,
+            when it has already been replaced by a new iteration)
         """
 
         # First make sure the given dataset id is in the registry
@@ -985,7 +2499,434 @@ class DatasetTable(BaseTable):
             conn.execute(update_stmt)
             conn.commit()
 
-        # Delete the physical data in the root_dir
+        # Move the physical data in the root_dir to the trash
+        if previous_dataset.location_type == "dataregistry" and delete_data:
+            self._remove_data(previous_dataset)
+            self.purge_trash(wait=False)
+        msg = f"Deleted {dataset_id} from data registry"
+        self.db_connection.logger.info(msg)
+
+    def _remove_data(self, dataset):
+        """
+        Remove the physical data of a dataset from the `root_dir`.
+
+        The data is moved to the trash of the schema (see `_trash_path`) with a
+        single rename, so this is instant whatever the size of the data. Only
+        data that cannot be renamed into the trash (being on another device)
+        is removed in place.
+
+        Parameters
+        ----------
+        dataset : sqlalchemy Row
+            The dataset entry (its `owner_type`, `owner` and `relative_path`
+            locate the data)
+
+        Returns
+        -------
+        removed : bool
+            False if there was no data to remove
+        """
+
+        data_path = _form_dataset_path(
+            dataset.owner_type,
+            dataset.owner,
+            dataset.relative_path,
+            schema=self._schema,
+            root_dir=self._root_dir,
+        )
+        if not os.path.lexists(data_path):
+            warnings.warn(
+                f"Dataset {data_path} not found under the `root_dir`, "
+                "could not delete",
+                UserWarning,
+            )
+            return False
+
+        trash_dir = _trash_path(
+            dataset.dataset_id, schema=self._schema, root_dir=self._root_dir
+        )
+        self.db_connection.logger.info(f"Moving data {data_path} to {trash_dir}")
+        if not _move_to_trash(data_path, trash_dir):
+            self.db_connection.logger.info(f"Deleting data {data_path}")
+            _parallel_rmtree(data_path, workers=self.purge_workers)
+        return True
+
+    def _purge_data(self, dataset):
+        """
+        Remove the data of a dataset deleted by `delete_many` (see
+        `_remove_data`).
+
+        Failures are warned about rather than raised, as the entry is already
+        tagged deleted.
+
+        Parameters
+        ----------
+        dataset : sqlalchemy Row
+
+        Returns
+        -------
+        num_files : int
+        total_size : int
+            What was removed (see `_data_size`)
+        """
+
+        try:
+            num_files, total_size = self._data_size(dataset)
+            if not self._remove_data(dataset):
+                return 0, 0
+        except OSError as e:
+            warnings.warn(
+                f"Could not delete the data of dataset {dataset.dataset_id}: {e}",
+                UserWarning,
+            )
+            return 0, 0
+
+        return num_files, total_size
+
+    def _data_size(self, dataset):
+        """
+        Number of files, and their total size (bytes), of the data of a
+        dataset in the `root_dir`.
+
+        The values recorded in the registry are used, the data is only
+        measured on disk for entries without them (e.g., invalid datasets,
+        whose copy did not complete).
+
+        Parameters
+        ----------
+        dataset : sqlalchemy Row
+
+        Returns
+        -------
+        num_files : int
+        total_size : int
+        """
+
+        if dataset.nfiles is not None and dataset.total_disk_space is not None:
+            return dataset.nfiles, round(dataset.total_disk_space * _TO_MBYTE)
+
+        data_path = _form_dataset_path(
+            dataset.owner_type,
+            dataset.owner,
+            dataset.relative_path,
+            schema=self._schema,
+            root_dir=self._root_dir,
+        )
+        if os.path.isfile(data_path):
+            return 1, os.path.getsize(data_path)
+        elif os.path.isdir(data_path):
+            scan = _scan_tree(data_path, workers=1)
+            return scan.num_files, scan.total_size
+        return 0, 0
+
+    def _filter_clauses(self, filters):
+        """
+        Render dataregistry filters as WHERE clauses on the dataset table.
+
+        Filters can be on any column of the dataset table (e.g.,
+        "dataset.owner", or simply "owner"), or on "keyword.keyword" to select
+        the datasets tagged with a keyword.
+
+        Parameters
+        ----------
+        filters : list[Filter]
+
+        Returns
+        -------
+        clauses : list[sqlalchemy expression]
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
+
+        clauses = []
+        for f in filters:
+            if f[0] != "keyword.keyword":
+                clauses.extend(super()._filter_clauses([f]))
+                continue
+
+            keyword_table = self._get_table_metadata("keyword")
+            dataset_keyword_table = self._get_table_metadata("dataset_keyword")
+            clauses.append(
+                exists(
+                    select(dataset_keyword_table.c.dataset_id)
+                    .join(
+                        keyword_table,
+                        keyword_table.c.keyword_id
+                        == dataset_keyword_table.c.keyword_id,
+                    )
+                    .where(
+                        dataset_keyword_table.c.dataset_id
+                        == dataset_table.c.dataset_id,
+                        _filter_clause(f, keyword_table.c.keyword, False),
+                    )
+                )
+            )
+
+        return clauses
+
+    def delete_many(
+        self, filters=None, dataset_ids=None, dry_run=False, confirm=False
+    ):
+        """
+        Delete many dataset entries from the DESC data registry at once.
+
+        The datasets are selected by `filters` and/or a list of
+        `dataset_ids`. All of them are tagged deleted with a single UPDATE,
+        then their data is moved from the `root_dir` to the trash (see
+        `_remove_data`) by a pool of `purge_workers` threads.
+
+        Datasets already deleted, or replaced by a newer iteration (whose data
+        now belongs to the replacement), are not selected. Unless the user is
+        the admin user, all the selected datasets must have been created by
+        the user, otherwise nothing is deleted.
+
+        Parameters
+        ----------
+        filters : list[Filter], optional
+            Delete the datasets matching all these filters (see
+            `Query.gen_filter()`). Filters can be on the columns of the
+            dataset table, or on "keyword.keyword"
+        dataset_ids : list[int], optional
+            Delete these datasets (restricted by `filters`, if any)
+        dry_run : bool, optional
+            True to only report what would be deleted
+        confirm : bool, optional
+            Will ask for a confirmation
+
+        Returns
+        -------
+        report : DeleteReport
+            The `dataset_ids` deleted (or that would be deleted), and the
+            number of files and bytes moved out of the `root_dir`
+        """
+
+        dataset_table = self._get_table_metadata(self.which_table)
+        deleted_bit = 1 << VALID_STATUS_BITS["deleted"]
+        replaced_bit = 1 << VALID_STATUS_BITS["replaced"]
+
+        clauses = self._selection_clauses(filters, dataset_ids)
+        clauses.append(dataset_table.c.status.op("&")(deleted_bit) == 0)
+        clauses.append(dataset_table.c.status.op("&")(replaced_bit) == 0)
+
+        user = os.getenv("USER")
+        if user != _ADMIN_USER:
+            # Only needed for rows appearing between the SELECT and UPDATE
+            owned = [dataset_table.c.creator_uid == user]
+        else:
+            owned = []
+
+        columns = [
+            dataset_table.c.dataset_id,
+            dataset_table.c.name,
+            dataset_table.c.version_string,
+            dataset_table.c.owner,
+            dataset_table.c.owner_type,
+            dataset_table.c.relative_path,
+            dataset_table.c.location_type,
+            dataset_table.c.creator_uid,
+            dataset_table.c.nfiles,
+            dataset_table.c.total_disk_space,
+        ]
+
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                select(*columns)
+                .where(*clauses)
+                .order_by(dataset_table.c.dataset_id)
+            ).all()
+
+            if owned:
+                others = [r.dataset_id for r in rows if r.creator_uid != user]
+                if len(others) > 0:
+                    raise ValueError(
+                        f"{len(others)} datasets owned by other users "
+                        f"(dataset_id={others[:10]}"
+                        f"{'...' if len(others) > 10 else ''}). Cannot delete."
+                    )
+
+            to_purge = [r for r in rows if r.location_type == "dataregistry"]
+
+            if dry_run:
+                with ThreadPoolExecutor(max_workers=self.purge_workers) as pool:
+                    sizes = list(pool.map(self._data_size, to_purge))
+                return DeleteReport(
+                    [r.dataset_id for r in rows],
+                    sum(n for n, _ in sizes),
+                    sum(b for _, b in sizes),
+                    True,
+                )
+
+            if len(rows) == 0:
+                return DeleteReport([], 0, 0, False)
+
+            # Confirm the user wants to delete these datasets
+            if confirm:
+                confirmation = (
+                    input(
+                        f"Confirm delete of {len(rows)} datasets "
+                        f"({len(to_purge)} with data in the root_dir) [y/n] "
+                    )
+                    .strip()
+                    .lower()
+                )
+
+                if confirmation != "y":
+                    return DeleteReport([], 0, 0, False)
+
+            # Tag all the datasets deleted at once
+            result = conn.execute(
+                update(dataset_table)
+                .where(*clauses, *owned)
+                .values(
+                    status=dataset_table.c.status.op("|")(deleted_bit),
+                    delete_date=datetime.now(),
+                    delete_uid=self._uid,
+                )
+                .returning(*columns)
+            )
+            rows = sorted(result.all(), key=lambda r: r.dataset_id)
+            conn.commit()
+
+        # Move the physical data in the root_dir to the trash
+        to_purge = [r for r in rows if r.location_type == "dataregistry"]
+        with ThreadPoolExecutor(max_workers=self.purge_workers) as pool:
+            sizes = list(pool.map(self._purge_data, to_purge))
+        if len(to_purge) > 0:
+            self.purge_trash(wait=False)
+
+        msg = f"Deleted {len(rows)} datasets from data registry"
+        self.db_connection.logger.info(msg)
+
+        return DeleteReport(
+            [r.dataset_id for r in rows],
+            sum(n for n, _ in sizes),
+            sum(b for _, b in sizes),
+            False,
+        )
+
+    def purge_trash(self, older_than=None, dry_run=False, wait=True):
+        """
+        Remove for good the data of deleted datasets from the trash of the
+        schema (see `_remove_data`).
+
+        Each trashed dataset is removed with `_parallel_rmtree` (using
+        `purge_workers` threads). Data that cannot be removed (e.g., owned by
+        another user) is warned about and left in the trash.
+
+        Parameters
+        ----------
+        older_than : float, optional
+            Only purge the data trashed at least this many days ago, by
+            default `trash_retention` (0 to empty the trash)
+        dry_run : bool, optional
+            True to only report what would be purged
+        wait : bool, optional
+            False to purge in a background thread (only one runs at a time)
+
+        Returns
+        -------
+        report : PurgeReport
+            The `dataset_ids` whose data was (or would be) purged, and the
+            number of files and bytes freed. When `wait=False` the
+            `threading.Thread` doing the purge is returned instead
+        """
+
+        if not wait:
+            with self._jobs_lock:
+                if self._purge_thread is None or not self._purge_thread.is_alive():
+                    self._purge_thread = threading.Thread(
+                        target=self.purge_trash,
+                        kwargs={"older_than": older_than},
+                        name="dataregistry-purge",
+                        daemon=True,
+                    )
+                    self._purge_thread.start()
+                return self._purge_thread
+
+        if older_than is None:
+            older_than = self.trash_retention
+        cutoff = datetime.now() - timedelta(days=older_than)
+
+        trash_root = os.path.dirname(
+            _trash_path(0, schema=self._schema, root_dir=self._root_dir)
+        )
+        dataset_ids = []
+        num_files = 0
+        total_size = 0
+        for dataset_id, trash_dir, trashed in _list_trash(trash_root):
+            if trashed > cutoff:
+                continue
+
+            try:
+                if dry_run:
+                    n, size = get_directory_info(
+                        trash_dir, workers=self.purge_workers
+                    )
+                else:
+                    self.db_connection.logger.info(f"Purging data {trash_dir}")
+                    n, size = _parallel_rmtree(trash_dir, workers=self.purge_workers)
+            except OSError as e:
+                warnings.warn(
+                    f"Could not purge the data of dataset {dataset_id}: {e}",
+                    UserWarning,
+                )
+                continue
+
+            dataset_ids.append(dataset_id)
+            num_files += n
+            total_size += size
+
+        return PurgeReport(dataset_ids, num_files, total_size, dry_run)
+
+    def undelete(self, dataset_id):
+        """
+        Undo the deletion of a dataset.
+
+        The data of a deleted dataset can be brought back until it is purged
+        from the trash (see `purge_trash()`). The data is moved back to its
+        `relative_path` (which must not have been taken since), and the entry
+        is no longer tagged deleted.
+
+        Parameters
+        ----------
+        dataset_id : int
+            Deleted dataset to restore
+        """
+
+        dataset_table = self._get_table_metadata(self.which_table)
+        previous_dataset = self.find_entry(dataset_id, raise_if_not_found=True)
+
+        if not get_dataset_status(previous_dataset.status, "deleted"):
+            raise ValueError(f"Dataset {dataset_id} is not deleted")
+        if get_dataset_status(previous_dataset.status, "replaced"):
+            raise ValueError(
+                f"Dataset {dataset_id} has been replaced, cannot undelete"
+            )
+        if not self._check_write_permission(dataset_id):
+            raise ValueError(
+                f"Dataset {dataset_id} owned by other user. Cannot undelete."
+            )
+
+        # The relative_path must still be free (earlier iterations of a
+        # replaced dataset share it, and do not count)
+        for other in self._find_previous(
+            None,
+            None,
+            previous_dataset.owner,
+            previous_dataset.owner_type,
+            relative_path=previous_dataset.relative_path,
+        ):
+            if (
+                other.dataset_id != dataset_id
+                and not get_dataset_status(other.status, "deleted")
+                and not get_dataset_status(other.status, "replaced")
+            ):
+                raise ValueError(
+                    f"relative_path {previous_dataset.relative_path} is taken by "
+                    f"dataset {other.dataset_id}, cannot undelete {dataset_id}"
+                )
+
+        # Move the data back from the trash
         if previous_dataset.location_type == "dataregistry":
             data_path = _form_dataset_path(
                 previous_dataset.owner_type,
@@ -994,19 +2935,37 @@ class DatasetTable(BaseTable):
                 schema=self._schema,
                 root_dir=self._root_dir,
             )
-            self.db_connection.logger.info(f"Deleting data {data_path}")
-            if os.path.isfile(data_path):
-                os.remove(data_path)
-            elif os.path.isdir(data_path):
-                shutil.rmtree(data_path)
-            else:
-                warnings.warn(
-                    f"Dataset {data_path} not found under the `root_dir`, "
-                    "could not delete",
-                    UserWarning,
+            trash_dir = _trash_path(
+                dataset_id, schema=self._schema, root_dir=self._root_dir
+            )
+            trashed = os.path.join(trash_dir, os.path.basename(data_path))
+            if not os.path.lexists(trashed):
+                raise ValueError(
+                    f"The data of dataset {dataset_id} has been purged, "
+                    "cannot undelete"
                 )
-        msg = f"Deleted {dataset_id} from data registry"
-        self.db_connection.logger.info(msg)
+            if os.path.lexists(data_path):
+                raise ValueError(
+                    f"{data_path} already exists, cannot undelete {dataset_id}"
+                )
+            os.rename(trashed, data_path)
+            os.rmdir(trash_dir)
+
+        with self._engine.connect() as conn:
+            conn.execute(
+                update(dataset_table)
+                .where(dataset_table.c.dataset_id == dataset_id)
+                .values(
+                    status=set_dataset_status(
+                        previous_dataset.status, deleted=False
+                    ),
+                    delete_date=None,
+                    delete_uid=None,
+                )
+            )
+            conn.commit()
+
+        self.db_connection.logger.info(f"Undeleted {dataset_id}")
 
     def add_keywords(self, dataset_id, keyword):
         """
@@ -1034,6 +2993,81 @@ class DatasetTable(BaseTable):
         """
         self.keyword_table.remove_keywords_from_dataset(dataset_id, keyword)
 
+    def tag_many(self, keywords, filters=None, dataset_ids=None):
+        """
+        Tag many datasets with keywords at once, with a single INSERT (see
+        `KeywordTable.tag_datasets()`).
+
+        Parameters
+        ----------
+        keywords : list[str]
+            Keywords to add to the datasets
+        filters : list[Filter], optional
+            Tag the datasets matching all these filters (see
+            `Query.gen_filter()`). Filters can be on the columns of the
+            dataset table, or on "keyword.keyword"
+        dataset_ids : list[int], optional
+            Tag these datasets (restricted by `filters`, if any)
+
+        Returns
+        -------
+        - : int
+            Number of tags added
+        """
+
+        return self.keyword_table._tag(
+            self._selection_clauses(filters, dataset_ids), keywords
+        )
+
+    def untag_many(self, keywords, filters=None, dataset_ids=None):
+        """
+        Remove keywords from many datasets at once, with a single DELETE (see
+        `KeywordTable.untag_datasets()`).
+
+        Parameters
+        ----------
+        keywords : list[str]
+            Keywords to remove from the datasets
+        filters : list[Filter], optional
+            Untag the datasets matching all these filters (see `tag_many()`)
+        dataset_ids : list[int], optional
+            Untag these datasets (restricted by `filters`, if any)
+
+        Returns
+        -------
+        - : int
+            Number of tags removed
+        """
+
+        return self.keyword_table._tag(
+            self._selection_clauses(filters, dataset_ids), keywords, untag=True
+        )
+
+    def _selection_clauses(self, filters, dataset_ids):
+        """
+        WHERE clauses on the dataset table selecting the datasets matching
+        `filters` and/or in `dataset_ids`.
+
+        Parameters
+        ----------
+        filters : list[Filter] or None
+        dataset_ids : list[int] or None
+
+        Returns
+        -------
+        clauses : list[sqlalchemy expression]
+        """
+
+        if not filters and dataset_ids is None:
+            raise ValueError("Must select datasets with `filters` or `dataset_ids`")
+
+        clauses = self._filter_clauses(filters or [])
+        if dataset_ids is not None:
+            dataset_table = self._get_table_metadata(self.which_table)
+            clauses.append(dataset_table.c.dataset_id.in_(dataset_ids))
+
+        return clauses
+
     def fetch(self, query_object, dataset_id, schema_type="working",
               destination_path=None, destination_endpoint="NERSC DTN",
               no_cfs_copy=False):
@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from dataregistry.db_basic import add_table_row
+from sqlalchemy import insert, select
+
+from dataregistry.exceptions import DataRegistryMissingInputs
 
 from .base_table_class import BaseTable
 from .registrar_util import _read_configuration_file
@@ -49,6 +51,53 @@ class ExecutionTable(BaseTable):
             The execution ID of the new row relating to this entry
         """
 
+        with self._engine.connect() as conn:
+            my_id = self._insert(
+                conn,
+                name,
+                description=description,
+                execution_start=execution_start,
+                site=site,
+                configuration=configuration,
+                input_datasets=input_datasets,
+                input_production_datasets=input_production_datasets,
+                max_config_length=max_config_length,
+            )
+            conn.commit()
+        return my_id
+
+    def _insert(
+        self,
+        conn,
+        name,
+        description=None,
+        execution_start=None,
+        site=None,
+        configuration=None,
+        input_datasets=[],
+        input_production_datasets=[],
+        max_config_length=None,
+    ):
+        """
+        Insert a new execution (and its dependencies) within the transaction
+        of `conn`, without committing.
+
+        Parameters
+        ----------
+        conn : sqlalchemy.engine.Connection
+        name : str or sqlalchemy expression
+            The execution name, which can be computed by the database (see
+            `DatasetTable._insert_row()`)
+        description, execution_start, site, configuration, input_datasets,
+        input_production_datasets, max_config_length :
+            See `register()`
+
+        Returns
+        -------
+        my_id : int
+            The execution ID of the new row
+        """
+
         # Set max configuration file length
         if max_config_length is None:
             max_config_length = self._DEFAULT_MAX_CONFIG
@@ -73,25 +122,92 @@ class ExecutionTable(BaseTable):
                 configuration, max_config_length
             )
 
+        # Make sure the input datasets exist
+        missing = self._missing_inputs(
+            input_datasets, input_production_datasets, conn=conn
+        )
+        if len(missing) > 0:
+            raise DataRegistryMissingInputs(missing)
+
         # Enter row into data registry database
-        with self._engine.connect() as conn:
-            my_id = add_table_row(conn, exec_table, values, commit=False)
-
-            # handle dependencies
-            for d in input_datasets:
-                values["register_date"] = datetime.now()
-                values["input_id"] = d
-                values["input_production_id"] = None
-                values["execution_id"] = my_id
-                add_table_row(conn, dependency_table, values, commit=False)
-
-            # handle production dependencies
-            for d in input_production_datasets:
-                values["register_date"] = datetime.now()
-                values["input_id"] = None
-                values["input_production_id"] = d
-                values["execution_id"] = my_id
-                add_table_row(conn, dependency_table, values, commit=False)
+        result = conn.execute(insert(exec_table).values(values))
+        my_id = result.inserted_primary_key[0]
+
+        # handle dependencies (and production dependencies), with one
+        # multi-row INSERT
+        now = datetime.now()
+        rows = []
+        for col, ids in [
+            ("input_id", input_datasets),
+            ("input_production_id", input_production_datasets),
+        ]:
+            for d in ids:
+                row = {
+                    "register_date": now,
+                    "input_id": None,
+                    "input_production_id": None,
+                    "execution_id": my_id,
+                }
+                row[col] = d
+                rows.append(row)
+        if len(rows) > 0:
+            conn.execute(insert(dependency_table), rows)
 
-            conn.commit()
         return my_id
+
+    def _missing_inputs(self, input_datasets, input_production_datasets,
+                        conn=None):
+        """
+        Find the input datasets that do not exist, with one query per schema
+        (`input_datasets` are in the entry schema, `input_production_datasets`
+        in the production schema).
+
+        Parameters
+        ----------
+        input_datasets : list[int]
+        input_production_datasets : list[int]
+        conn : sqlalchemy.engine.Connection, optional
+            Connection to query on (within its transaction), by default a new
+            connection is used
+
+        Returns
+        -------
+        missing : dict[str, list[int]]
+            The IDs that do not exist, keyed by "input_datasets" or
+            "input_production_datasets" (only where some are missing)
+        """
+
+        if conn is None:
+            with self._engine.connect() as conn:
+                return self._missing_inputs(
+                    input_datasets, input_production_datasets, conn=conn
+                )
+
+        entry_schema = self.db_connection.entry_schema
+        checks = [("input_datasets", input_datasets, entry_schema)]
+
+        # Connected to a working schema outside of a namespace, the production
+        # schema is unknown (the foreign key still checks the production IDs).
+        # sqlite has a single schema
+        prod_schema = self.db_connection.production_schema
+        if prod_schema is None and self.db_connection.entry_schema_is_production:
+            prod_schema = entry_schema
+        if prod_schema is not None or self._dialect == "sqlite":
+            checks.append(
+                ("input_production_datasets", input_production_datasets,
+                 prod_schema)
+            )
+
+        missing = {}
+        for key, ids, schema in checks:
+            if len(ids) == 0:
+                continue
+            dataset_table = self.db_connection.get_table("dataset", schema)
+            stmt = select(dataset_table.c.dataset_id).where(
+                dataset_table.c.dataset_id.in_(set(ids))
+            )
+            not_found = set(ids) - set(conn.execute(stmt).scalars())
+            if len(not_found) > 0:
+                missing[key] = sorted(not_found)
+
+        return missing
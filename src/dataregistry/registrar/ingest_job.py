@@ -0,0 +1,220 @@
+import glob
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from dataregistry.exceptions import DataRegistryIngestCancelled
+
+from .ingest_util import _IngestJournal
+
+__all__ = ["IngestJob", "JobProgress", "_list_journals", "_DEFAULT_INGEST_WORKERS"]
+
+# Number of datasets ingested at the same time in the background (each copy
+# is itself multithreaded, see `_parallel_copytree`)
+_DEFAULT_INGEST_WORKERS = 2
+
+# How far along an ingest is. `num_files` and `total_size` are None until the
+# source data has been scanned. `state` is one of "queued", "running",
+# "done", "failed" or "cancelled" for a background job, "running" or
+# "interrupted" for an ingest found on disk (see `_list_journals`)
+JobProgress = namedtuple(
+    "JobProgress",
+    ["state", "files_done", "num_files", "bytes_done", "total_size"],
+)
+
+# An ingest found from its journal on disk, see `_list_journals`
+_JournalInfo = namedtuple(
+    "_JournalInfo", ["dataset_id", "source", "progress", "last_update"]
+)
+
+
+class IngestJob:
+    def __init__(self, dataset_id, execution_id):
+        """
+        Handle on the data ingest of a dataset registered with
+        `register(..., background=True)`.
+
+        The dataset entry exists (with an invalid status) as soon as the job
+        is created. The data is copied, and the entry completed, by a pool of
+        worker threads (see `DatasetTable.jobs()`).
+
+        Parameters
+        ----------
+        dataset_id : int
+            The dataset being ingested
+        execution_id : int
+            The execution associated with the dataset
+        """
+
+        self.dataset_id = dataset_id
+        self.execution_id = execution_id
+        self._future = None
+        self._cancel = threading.Event()
+        self._num_files = None
+        self._total_size = None
+        self._progress = None
+
+    def __repr__(self):
+        return (
+            f"IngestJob(dataset_id={self.dataset_id}, "
+            f"state={self.progress().state!r})"
+        )
+
+    def _start(self, num_files, total_size):
+        """The source data has been scanned, the copy is starting"""
+
+        self._num_files = num_files
+        self._total_size = total_size
+
+    def _track(self, progress):
+        """Report the progress of the copy from a `_Progress` tally"""
+
+        self._progress = progress
+
+    def _check_cancelled(self):
+        """Stop the ingest (by raising) if the job was cancelled"""
+
+        if self._cancel.is_set():
+            raise DataRegistryIngestCancelled(self.dataset_id)
+
+    def cancel(self):
+        """
+        Ask for the ingest to stop.
+
+        Files already being copied are finished, no new ones are started. A
+        cancelled job leaves the dataset invalid, with its ingest journal in
+        place, so the registration can be completed later with
+        `DatasetTable.resume()`.
+
+        Returns
+        -------
+        cancelled : bool
+            False if the job had already finished
+        """
+
+        if self.done():
+            return False
+        self._cancel.set()
+        return True
+
+    def cancelled(self):
+        """Was the job cancelled (before it finished)?"""
+
+        return self._cancel.is_set() and self.done() and (
+            self._future.exception() is not None
+        )
+
+    def done(self):
+        """Has the job finished (successfully or not)?"""
+
+        return self._future.done()
+
+    def progress(self):
+        """
+        How far along the ingest is.
+
+        Returns
+        -------
+        progress : JobProgress
+        """
+
+        if self._future.done():
+            if self._future.exception() is None:
+                state = "done"
+            elif self._cancel.is_set():
+                state = "cancelled"
+            else:
+                state = "failed"
+        elif self._num_files is None:
+            state = "queued"
+        else:
+            state = "running"
+
+        if state == "done":
+            files_done, bytes_done = self._num_files, self._total_size
+        elif self._progress is not None:
+            files_done = self._progress.files_done
+            bytes_done = self._progress.bytes_done
+        else:
+            files_done, bytes_done = 0, 0
+
+        return JobProgress(
+            state, files_done, self._num_files, bytes_done, self._total_size
+        )
+
+    def wait(self, timeout=None):
+        """
+        Wait for the ingest to finish.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Longest to wait (seconds), by default there is no limit
+
+        Returns
+        -------
+        dataset_id : int
+        execution_id : int
+            As returned by `register()`
+
+        Raises
+        ------
+        DataRegistryIngestCancelled
+            If the job was cancelled
+        TimeoutError
+            If the job is not done within `timeout`
+        """
+
+        e = self._future.exception(timeout=timeout)
+        if e is not None:
+            if self._cancel.is_set():
+                raise DataRegistryIngestCancelled(self.dataset_id) from e
+            raise e
+
+        return self.dataset_id, self.execution_id
+
+
+def _list_journals(journal_dir):
+    """
+    Find the ingests recorded by the ingest journals in `journal_dir` (see
+    `_journal_path`), from this process or any other.
+
+    An ingest whose journal is still open is "running", otherwise it was
+    "interrupted" (and can be resumed).
+
+    Parameters
+    ----------
+    journal_dir : str
+
+    Returns
+    -------
+    jobs : list[_JournalInfo]
+        Sorted by dataset ID
+    """
+
+    jobs = []
+    for path in glob.glob(os.path.join(journal_dir, "*.jsonl")):
+        try:
+            dataset_id = int(os.path.basename(path)[: -len(".jsonl")])
+            journal, done = _IngestJournal.read(path)
+            last_update = datetime.fromtimestamp(os.path.getmtime(path))
+        except (ValueError, OSError):
+            # Not a journal, or finished (and removed) while we looked
+            continue
+
+        # The header is only complete once the copy has started
+        header = journal.header
+        state = "running" if _IngestJournal.in_use(path) else "interrupted"
+        progress = JobProgress(
+            state,
+            len(done),
+            header.get("num_files"),
+            sum(entry.size for entry, _ in done.values()),
+            header.get("total_size"),
+        )
+        jobs.append(
+            _JournalInfo(dataset_id, header.get("source"), progress, last_update)
+        )
+
+    return sorted(jobs)
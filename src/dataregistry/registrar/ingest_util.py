@@ -0,0 +1,972 @@
+import ctypes
+import errno
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    FIRST_EXCEPTION,
+    ThreadPoolExecutor,
+    wait,
+)
+from shutil import copyfile, copystat
+
+try:
+    import fcntl
+except ImportError:  # Not available on all platforms
+    fcntl = None
+
+__all__ = [
+    "ManifestEntry",
+    "_IngestJournal",
+    "TreeScan",
+    "_scan_tree",
+    "_hash_file",
+    "_ingest_file",
+    "_manifest_of",
+    "_verify_manifest",
+    "_rename_exchange",
+    "_parallel_copytree",
+    "_same_device",
+    "_makedirs",
+    "_DATA_DIR_MODE",
+    "_DATA_FILE_MODE",
+    "_INFRA_DIR_MODE",
+    "_INGEST_MODES",
+    "_INCREMENTAL_MODES",
+    "_Reuse",
+    "_MANIFEST_HASH",
+    "_DEFAULT_COPY_WORKERS",
+    "_DEFAULT_LARGE_FILE_WORKERS",
+    "_DEFAULT_LARGE_FILE_THRESHOLD",
+    "_DEFAULT_PURGE_WORKERS",
+    "_parallel_rmtree",
+]
+
+# Ways data can be brought into the `root_dir` (see `_ingest_file`)
+_INGEST_MODES = ["copy", "reflink", "hardlink", "move", "auto"]
+
+# One file of an ingested dataset, as stored in the `dataset_manifest` table.
+# `relative_path` is relative to the dataset, `mtime` is that of the source
+# file (seconds since the epoch) and `digest` is None unless checksums were
+# requested
+ManifestEntry = namedtuple(
+    "ManifestEntry", ["relative_path", "size", "mtime", "digest"]
+)
+
+# Hash used for the manifest digests
+_MANIFEST_HASH = "sha256"
+
+# Read size when copying and/or hashing files ourselves (bytes)
+_BUFFER_SIZE = 1024 * 1024
+
+# How a replace can decide a file is unchanged from the previous iteration
+# (see `_Reuse`)
+_INCREMENTAL_MODES = ["mtime", "digest"]
+
+# renameat2 flag swapping two paths, and the "current directory" fd (Linux)
+_RENAME_EXCHANGE = 2
+_AT_FDCWD = -100
+
+# Manifest mtimes are stored to the microsecond
+_MTIME_RESOLUTION = 1e-6
+
+# ioctl request making a file share the data blocks of another (Linux)
+_FICLONE = 0x40049409
+
+# Number of threads listing directories when scanning a tree
+_DEFAULT_SCAN_WORKERS = 8
+
+# Number of threads copying "small" files
+_DEFAULT_COPY_WORKERS = 8
+
+# Number of threads copying "large" files. Large files get their own (smaller)
+# pool, so a few big files cannot starve the many small ones, and so we do
+# not have too many big streams competing with each other
+_DEFAULT_LARGE_FILE_WORKERS = 2
+
+# Files of at least this many bytes are "large"
+_DEFAULT_LARGE_FILE_THRESHOLD = 256 * 1024 * 1024
+
+# Number of threads removing files (see `_parallel_rmtree`), which are
+# unlinked in batches of `_PURGE_BATCH_SIZE`
+_DEFAULT_PURGE_WORKERS = 8
+_PURGE_BATCH_SIZE = 256
+
+# Permissions of the data ingested into the `root_dir` (group read only), and
+# of the directories made to hold it. These are set explicitly on each path
+# created (rather than through the umask, which is shared by all threads)
+_DATA_FILE_MODE = 0o640
+_DATA_DIR_MODE = 0o750
+
+# Permissions of the directories organizing the datasets (e.g., the owner
+# directories), which the group can write to
+_INFRA_DIR_MODE = 0o770
+
+# Log progress roughly this often (seconds)
+_PROGRESS_INTERVAL = 10
+
+_TO_MBYTE = 1024 * 1024
+
+
+def _makedirs(path, mode=_DATA_DIR_MODE, exist_ok=False):
+    """
+    As `os.makedirs`, but every directory created gets exactly `mode`,
+    whatever the umask.
+    """
+
+    head, tail = os.path.split(path)
+    if not tail:
+        head, tail = os.path.split(head)
+    if head and tail and not os.path.exists(head):
+        _makedirs(head, mode=mode, exist_ok=True)
+
+    try:
+        os.mkdir(path, mode)
+    except FileExistsError:
+        if not exist_ok or not os.path.isdir(path):
+            raise
+        return
+    os.chmod(path, mode)
+
+
+def _create_file(path):
+    """
+    Create (or truncate) a file to ingest data into, with exactly
+    `_DATA_FILE_MODE`, whatever the umask.
+
+    Returns
+    -------
+    fd : int
+        File descriptor, open for writing
+    """
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, _DATA_FILE_MODE)
+    try:
+        os.fchmod(fd, _DATA_FILE_MODE)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _reflink(src, dst):
+    """
+    Make `dst` a copy-on-write clone of `src` (btrfs, XFS, ...).
+
+    Raises OSError if the filesystem (or platform) does not support it.
+    """
+
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported here")
+
+    with open(src, "rb") as fsrc, open(_create_file(dst), "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+
+
+def _copy_file_range(src, dst):
+    """
+    Copy `src` to `dst` within the kernel using `copy_file_range`, which lets
+    filesystems that support it (e.g., NFS 4.2, Lustre) copy server side.
+
+    Raises OSError if `copy_file_range` is not available.
+    """
+
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+
+    with open(src, "rb") as fsrc, open(_create_file(dst), "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if n == 0:
+                break
+            remaining -= n
+
+
+def _rename_exchange(path, other_path):
+    """
+    Atomically swap two (existing) paths, files or directories, using
+    `renameat2(RENAME_EXCHANGE)`.
+
+    Raises OSError if the platform (or filesystem) does not support it.
+    """
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        raise OSError(errno.ENOSYS, "renameat2 is not available")
+
+    ret = renameat2(
+        _AT_FDCWD,
+        os.fsencode(path),
+        _AT_FDCWD,
+        os.fsencode(other_path),
+        _RENAME_EXCHANGE,
+    )
+    if ret != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path, None, other_path)
+
+
+def _hash_file(path):
+    """Digest (hex) of a file, read once with large buffers"""
+
+    hasher = hashlib.new(_MANIFEST_HASH)
+    buf = bytearray(_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb") as f:
+        while n := f.readinto(buf):
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def _copy_and_hash(src, dst):
+    """
+    Copy `src` to `dst`, hashing the data in the same read loop (so the file
+    is only read once).
+
+    Returns the digest (hex) of the file.
+    """
+
+    hasher = hashlib.new(_MANIFEST_HASH)
+    buf = bytearray(_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open(src, "rb") as fsrc, open(_create_file(dst), "wb") as fdst:
+        while n := fsrc.readinto(buf):
+            hasher.update(view[:n])
+            fdst.write(view[:n])
+    return hasher.hexdigest()
+
+
+def _same_device(path, other_path):
+    """Are two (existing) paths on the same device?"""
+
+    return os.stat(path).st_dev == os.stat(other_path).st_dev
+
+
+def _ingest_file(src, dst, ingest_mode="copy", checksum=False):
+    """
+    Bring a single file into the `root_dir`.
+
+    The `ingest_mode` can be:
+        - "copy": a regular byte copy (`shutil.copyfile`)
+        - "reflink": a copy-on-write clone, where supported
+        - "hardlink": a hard link to the source. The data (and its
+          permissions) are then shared with the source file
+        - "auto": the cheapest of a reflink, a `copy_file_range` or a regular
+          copy that works
+
+    Whenever a mode is not possible (e.g., a reflink on a filesystem without
+    support, or a hard link across devices) the file is copied instead.
+    Files written here get `_DATA_FILE_MODE` permissions.
+    ("move" is handled for a dataset as a whole, see `_copy_data`.)
+
+    With `checksum=True` a copied file is hashed as it is copied. Files that
+    are not copied through our own buffers (reflinks, hard links, ...) are
+    read once to hash them.
+
+    Parameters
+    ----------
+    src : str
+        File to ingest
+    dst : str
+        Where to put it
+    ingest_mode : str, optional
+    checksum : bool, optional
+        Compute the digest of the file
+
+    Returns
+    -------
+    mode : str
+        How the file was actually ingested, "copy", "reflink", "hardlink" or
+        "copy_file_range"
+    digest : str
+        Digest (hex) of the file, None if `checksum=False`
+    """
+
+    mode = None
+    if ingest_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            mode = "hardlink"
+        except OSError:
+            pass
+
+    elif ingest_mode in ["reflink", "auto"]:
+        try:
+            _reflink(src, dst)
+            mode = "reflink"
+        except OSError:
+            if ingest_mode == "auto":
+                try:
+                    _copy_file_range(src, dst)
+                    mode = "copy_file_range"
+                except OSError:
+                    pass
+
+    if mode is not None:
+        return mode, _hash_file(dst) if checksum else None
+
+    if checksum:
+        return "copy", _copy_and_hash(src, dst)
+
+    # Create the file first, so it has the right permissions (`copyfile`
+    # keeps them, and can then use the fastest copy the platform has)
+    os.close(_create_file(dst))
+    copyfile(src, dst)
+    return "copy", None
+
+
+def _manifest_of(path, checksum=False, scan=None):
+    """
+    Manifest of a file, or of all the files in a directory, already in place.
+
+    Parameters
+    ----------
+    path : str
+        File or directory
+    checksum : bool, optional
+        Hash the files
+    scan : TreeScan, optional
+        An existing scan of the directory (see `_scan_tree`)
+
+    Returns
+    -------
+    manifest : list[ManifestEntry]
+        Paths are relative to `path` for a directory (the file name for a
+        single file)
+    """
+
+    if not os.path.isdir(path):
+        st = os.stat(path)
+        return [
+            ManifestEntry(
+                os.path.basename(path),
+                st.st_size,
+                st.st_mtime,
+                _hash_file(path) if checksum else None,
+            )
+        ]
+
+    if scan is None:
+        scan = _scan_tree(path)
+
+    return [
+        ManifestEntry(
+            rel,
+            size,
+            mtime,
+            _hash_file(os.path.join(path, rel)) if checksum else None,
+        )
+        for rel, size, mtime in scan.files
+    ]
+
+
+def _verify_manifest(path, manifest):
+    """
+    Check the data at `path` (file or directory) has the files, of the sizes,
+    listed in `manifest` (paths as given by `_manifest_of`).
+
+    Returns
+    -------
+    bad : list[str]
+        The files that are missing, or have the wrong size
+    """
+
+    is_dir = os.path.isdir(path)
+    bad = []
+    for m in manifest:
+        try:
+            f = os.path.join(path, m.relative_path) if is_dir else path
+            size = os.stat(f).st_size
+        except OSError:
+            size = None
+        if size != m.size:
+            bad.append(m.relative_path)
+    return bad
+
+
+class _IngestJournal:
+    def __init__(self, path, **header):
+        """
+        A record of the progress of ingesting a dataset's data, so an
+        interrupted ingest can be resumed (see `DatasetTable.resume()`).
+
+        The journal is a JSON lines file. The first line is a header
+        describing the ingest (where from, where to, how, ...), each
+        following line is one file that was copied and verified (a
+        `ManifestEntry`, plus how the file was ingested).
+
+        Parameters
+        ----------
+        path : str
+            Location of the journal file
+        **header
+            Header entries, added to by `start()`
+        """
+
+        self.path = path
+        self.header = header
+        self._f = None
+        self._lock = threading.Lock()
+
+    def start(self, **header):
+        """Write the header, starting a new journal"""
+
+        self.header.update(header)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._f = open(self.path, "w")
+        self._lock_file()
+        self._write(self.header)
+
+    def reopen(self):
+        """Append to an existing journal (when resuming)"""
+
+        self._f = open(self.path, "a")
+        self._lock_file()
+
+    def _lock_file(self):
+        """
+        Hold an exclusive lock on the journal while it is open, so other
+        processes can tell the ingest is in progress (see `in_use()`)
+        """
+
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._f.close()
+            self._f = None
+            raise ValueError(
+                f"Ingest journal {self.path} is in use by another process"
+            )
+
+    @staticmethod
+    def in_use(path):
+        """
+        Is the journal at `path` open (i.e., is the ingest it records running,
+        in this or any other process)? Else it was interrupted.
+        """
+
+        if fcntl is None:
+            return False
+        with open(path) as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return True
+        return False
+
+    def _write(self, obj):
+        with self._lock:
+            self._f.write(json.dumps(obj) + "\n")
+            self._f.flush()
+
+    def record(self, entry, mode):
+        """Record a file (`ManifestEntry`) as ingested"""
+
+        if self._f is not None:
+            self._write({**entry._asdict(), "mode": mode})
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def remove(self):
+        """The ingest is complete, the journal is no longer needed"""
+
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a journal.
+
+        Any incomplete final line (from being interrupted mid write) is
+        ignored.
+
+        Returns
+        -------
+        journal : _IngestJournal
+            With the header of the journal
+        done : dict
+            Path of each file (relative to the dataset) ingested so far ->
+            (ManifestEntry, mode)
+        """
+
+        done = {}
+        with open(path) as f:
+            header = json.loads(f.readline())
+            for line in f:
+                try:
+                    d = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                mode = d.pop("mode")
+                done[d["relative_path"]] = (ManifestEntry(**d), mode)
+
+        return cls(path, **header), done
+
+
+class _Reuse:
+    def __init__(self, root, manifest, incremental="mtime"):
+        """
+        Reuse the files of a previous iteration of a dataset.
+
+        Files of the new data that are unchanged from the previous iteration
+        are hard linked to the previous iteration's files, rather than copied.
+
+        Parameters
+        ----------
+        root : str
+            Where the previous iteration's data is (file or directory)
+        manifest : list[ManifestEntry]
+            The previous iteration's manifest
+        incremental : str, optional
+            How to decide a file is unchanged, "mtime" (same size and
+            modification time) or "digest" (same size and digest, which
+            means reading the new file, and the previous manifest having
+            digests)
+        """
+
+        if incremental not in _INCREMENTAL_MODES:
+            raise ValueError(
+                f"Invalid incremental mode {incremental} "
+                f"(valid={_INCREMENTAL_MODES})"
+            )
+
+        self.root = root
+        self.incremental = incremental
+        self._is_dir = os.path.isdir(root)
+        self._manifest = {m.relative_path: m for m in manifest}
+
+    def _path(self, rel):
+        return os.path.join(self.root, rel) if self._is_dir else self.root
+
+    def link(self, rel, src, dst, size, mtime):
+        """
+        Hard link `dst` to the previous iteration's copy of file `rel`, if
+        `src` is unchanged from it.
+
+        Returns
+        -------
+        mode : str
+            "reuse" if the file was linked, else None
+        digest : str
+            Digest of the file, if known
+        """
+
+        prev = self._manifest.get(rel)
+        if prev is None or prev.size != size:
+            return None, None
+
+        digest = prev.digest
+        if self.incremental == "mtime":
+            if abs(prev.mtime - mtime) > _MTIME_RESOLUTION:
+                return None, None
+        else:
+            if prev.digest is None:
+                return None, None
+            digest = _hash_file(src)
+            if digest != prev.digest:
+                return None, None
+
+        try:
+            os.link(self._path(rel), dst)
+        except OSError:
+            return None, None
+        return "reuse", digest
+
+
+class TreeScan:
+    def __init__(self, root, dirs, files):
+        """
+        The result of scanning a directory tree (see `_scan_tree`).
+
+        All paths are relative to `root`, the root itself being "".
+
+        Parameters
+        ----------
+        root : str
+            Directory that was scanned
+        dirs : list[str]
+            Each directory, sorted (so parents come before children)
+        files : list[(str, int, float)]
+            (path, size in bytes, mtime) of each file, sorted by path
+        """
+
+        self.root = root
+        self.dirs = dirs
+        self.files = files
+
+    @property
+    def num_files(self):
+        return len(self.files)
+
+    @property
+    def total_size(self):
+        return sum(size for _, size, _ in self.files)
+
+    def path(self, rel, root=None):
+        """Full path of `rel` under `root` (default the scanned root)"""
+
+        if root is None:
+            root = self.root
+        return os.path.join(root, rel) if rel else root
+
+    def dir_counts(self):
+        """
+        Number of files, and their total size (bytes), directly within each
+        directory.
+
+        Returns
+        -------
+        counts : dict
+            Directory (relative path) -> (num_files, total_size)
+        """
+
+        counts = {d: (0, 0) for d in self.dirs}
+        for rel, size, _ in self.files:
+            d = os.path.dirname(rel)
+            num_files, total_size = counts[d]
+            counts[d] = (num_files + 1, total_size + size)
+        return counts
+
+
+def _scan_tree(root, workers=None):
+    """
+    List the directories and files under `root`, listing directories
+    concurrently with a pool of `workers` threads.
+
+    Sizes and modification times come from `DirEntry.stat()`, so each file is
+    only stat'ed once. As with `shutil.copytree(symlinks=False)`, symbolic
+    links are followed. Entries that are neither files nor directories (e.g.,
+    broken links) are skipped.
+
+    Parameters
+    ----------
+    root : str
+        Directory to scan
+    workers : int, optional
+        Number of threads
+
+    Returns
+    -------
+    scan : TreeScan
+    """
+
+    if workers is None:
+        workers = _DEFAULT_SCAN_WORKERS
+
+    def _scan_one(rel):
+        subdirs = []
+        files = []
+        with os.scandir(os.path.join(root, rel) if rel else root) as it:
+            for entry in it:
+                entry_rel = os.path.join(rel, entry.name) if rel else entry.name
+                if entry.is_dir():
+                    subdirs.append(entry_rel)
+                elif entry.is_file():
+                    st = entry.stat()
+                    files.append((entry_rel, st.st_size, st.st_mtime))
+        return subdirs, files
+
+    dirs = [""]
+    files = []
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="dataregistry-scan"
+    ) as pool:
+        pending = {pool.submit(_scan_one, "")}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                subdirs, dir_files = f.result()
+                dirs.extend(subdirs)
+                files.extend(dir_files)
+                pending.update(pool.submit(_scan_one, d) for d in subdirs)
+
+    return TreeScan(root, sorted(dirs), sorted(files))
+
+
+def _parallel_rmtree(path, workers=None):
+    """
+    Remove `path` (a file, or a directory and everything below it), listing
+    the directories and unlinking the files with a pool of `workers` threads.
+
+    Unlike `_scan_tree`, symbolic links are never followed, they are removed
+    like files.
+
+    Parameters
+    ----------
+    path : str
+    workers : int, optional
+        Number of threads
+
+    Returns
+    -------
+    num_files : int
+    total_size : int
+        Number of files (and links) removed, and their total size (bytes)
+    """
+
+    if workers is None:
+        workers = _DEFAULT_PURGE_WORKERS
+
+    if os.path.islink(path) or not os.path.isdir(path):
+        size = os.lstat(path).st_size
+        os.unlink(path)
+        return 1, size
+
+    def _list_one(d):
+        subdirs = []
+        files = []
+        with os.scandir(d) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    files.append(entry.path)
+        return subdirs, files
+
+    def _unlink_batch(batch):
+        total_size = 0
+        for f in batch:
+            total_size += os.lstat(f).st_size
+            os.unlink(f)
+        return len(batch), total_size
+
+    dirs = [path]
+    unlinks = []
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="dataregistry-purge"
+    ) as pool:
+        # Unlink the files of each directory as soon as it has been listed
+        pending = {pool.submit(_list_one, path)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                subdirs, files = f.result()
+                dirs.extend(subdirs)
+                pending.update(pool.submit(_list_one, d) for d in subdirs)
+                unlinks.extend(
+                    pool.submit(_unlink_batch, files[i : i + _PURGE_BATCH_SIZE])
+                    for i in range(0, len(files), _PURGE_BATCH_SIZE)
+                )
+
+        results = [f.result() for f in unlinks]
+
+    # Directories were listed after their parents
+    for d in reversed(dirs):
+        os.rmdir(d)
+
+    return sum(n for n, _ in results), sum(size for _, size in results)
+
+
+class _Progress:
+    """Thread safe tally of the files and bytes copied so far"""
+
+    def __init__(self, logger, num_files, total_size):
+        self.logger = logger
+        self.num_files = num_files
+        self.total_size = total_size
+        self.files_done = 0
+        self.bytes_done = 0
+        self.tic = time.time()
+        self._last_report = self.tic
+        self._lock = threading.Lock()
+
+    def rate(self):
+        """Copy speed so far (Mb/s)"""
+        elapsed = max(time.time() - self.tic, 1e-6)
+        return self.bytes_done / _TO_MBYTE / elapsed
+
+    def update(self, size):
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+
+            now = time.time()
+            if now - self._last_report < _PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+
+            self.logger.info(
+                f"  - copied {self.files_done}/{self.num_files} files "
+                f"({self.bytes_done/_TO_MBYTE:.2f}/"
+                f"{self.total_size/_TO_MBYTE:.2f} Mb, {self.rate():.2f} Mb/s)"
+            )
+
+
+def _parallel_copytree(
+    source,
+    dest,
+    copy_workers=None,
+    large_file_workers=None,
+    large_file_threshold=None,
+    logger=None,
+    ingest_mode="copy",
+    checksum=False,
+    scan=None,
+    reuse=None,
+    journal=None,
+    done=None,
+    job=None,
+):
+    """
+    Copy a directory (and its subdirectories) using a pool of threads.
+
+    Equivalent to `shutil.copytree(source, dest, copy_function=copyfile)`,
+    but with the files copied concurrently. Files of at least
+    `large_file_threshold` bytes are copied by a separate pool of
+    `large_file_workers` threads.
+
+    The directory tree is created first (`dest` must not exist), then the
+    files are copied, then the directory metadata is copied over (as
+    `copytree` does). If any copy fails, the remaining copies are cancelled
+    and the error is raised; cleaning up `dest` is left to the caller.
+
+    Progress, and the final throughput, are reported through the logger.
+
+    Parameters
+    ----------
+    source : str
+        Directory to copy
+    dest : str
+        Where to copy it to
+    copy_workers : int, optional
+        Number of threads copying small files
+    large_file_workers : int, optional
+        Number of threads copying large files
+    large_file_threshold : int, optional
+        Size (bytes) from which a file is copied by the large file pool
+    logger : logging.Logger, optional
+        Where to report progress
+    ingest_mode : str, optional
+        How each file is brought in (see `_ingest_file`)
+    checksum : bool, optional
+        Hash each file as it is copied
+    scan : TreeScan, optional
+        An existing scan of `source` (see `_scan_tree`), so the tree is not
+        walked again
+    reuse : _Reuse, optional
+        Link files unchanged from a previous iteration instead of copying
+    journal : _IngestJournal, optional
+        Record each file as it is copied (and its size checked)
+    done : dict, optional
+        Files already copied (see `_IngestJournal.read()`), which are skipped
+        if unchanged. `dest` may then already exist
+    job : IngestJob, optional
+        A background job copying the data, which reports the progress of
+        the copy and stops it when cancelled
+
+    Returns
+    -------
+    modes : set[str]
+        How the files were actually ingested
+    manifest : list[ManifestEntry]
+        The files copied (paths relative to `source`), sorted by path
+    """
+
+    if copy_workers is None:
+        copy_workers = _DEFAULT_COPY_WORKERS
+    if large_file_workers is None:
+        large_file_workers = _DEFAULT_LARGE_FILE_WORKERS
+    if large_file_threshold is None:
+        large_file_threshold = _DEFAULT_LARGE_FILE_THRESHOLD
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    if scan is None:
+        scan = _scan_tree(source, workers=copy_workers)
+
+    # Create the directory tree
+    for rel in scan.dirs:
+        _makedirs(scan.path(rel, dest), exist_ok=done is not None)
+
+    files = scan.files
+    total_size = scan.total_size
+    progress = _Progress(logger, len(files), total_size)
+    if job is not None:
+        job._track(progress)
+    logger.debug(
+        f"Copying {len(files)} files ({total_size/_TO_MBYTE:.2f} Mb) with "
+        f"{copy_workers} (+{large_file_workers} large file) threads"
+    )
+
+    def _copy_one(rel, size, mtime):
+        if job is not None:
+            job._check_cancelled()
+
+        src_file = scan.path(rel, source)
+        dest_file = scan.path(rel, dest)
+
+        # Already copied (and unchanged since) before an interruption
+        if done is not None:
+            if rel in done:
+                entry, mode = done[rel]
+                if (
+                    entry.size == size
+                    and entry.mtime == mtime
+                    and os.path.isfile(dest_file)
+                    and os.stat(dest_file).st_size == size
+                ):
+                    progress.update(size)
+                    return mode, entry
+            if os.path.lexists(dest_file):
+                os.remove(dest_file)
+
+        mode = None
+        if reuse is not None:
+            mode, digest = reuse.link(rel, src_file, dest_file, size, mtime)
+        if mode is None:
+            mode, digest = _ingest_file(src_file, dest_file, ingest_mode, checksum)
+        entry = ManifestEntry(rel, size, mtime, digest)
+
+        if journal is not None:
+            if os.stat(dest_file).st_size != size:
+                raise OSError(f"Size of {dest_file} does not match {src_file}")
+            journal.record(entry, mode)
+
+        progress.update(size)
+        return mode, entry
+
+    with ThreadPoolExecutor(
+        max_workers=copy_workers, thread_name_prefix="dataregistry-copy"
+    ) as small_pool, ThreadPoolExecutor(
+        max_workers=large_file_workers, thread_name_prefix="dataregistry-copy-large"
+    ) as large_pool:
+        futures = []
+        for rel, size, mtime in files:
+            pool = large_pool if size >= large_file_threshold else small_pool
+            futures.append(pool.submit(_copy_one, rel, size, mtime))
+
+        # Not bound to `done`: that is the journal `_copy_one` still reads
+        _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for f in pending:
+            f.cancel()
+
+    for f in futures:
+        if not f.cancelled() and f.exception() is not None:
+            raise f.exception()
+
+    # Copy directory metadata last (deepest first), as copytree does
+    for rel in reversed(scan.dirs):
+        copystat(scan.path(rel, source), scan.path(rel, dest))
+
+    logger.debug(
+        f"Copied {len(files)} files ({total_size/_TO_MBYTE:.2f} Mb) in "
+        f"{time.time() - progress.tic:.2f}s ({progress.rate():.2f} Mb/s)"
+    )
+
+    results = [f.result() for f in futures]
+    return {mode for mode, _ in results}, [entry for _, entry in results]
@@ -2,7 +2,8 @@ import os
 from datetime import datetime
 from typing import Literal
 
-from sqlalchemy import select
+from sqlalchemy import delete, select, true
+from sqlalchemy.dialects import postgresql, sqlite
 
 from dataregistry.db_basic import add_table_row
 from dataregistry.registrar.base_table_class import BaseTable
@@ -71,6 +72,7 @@ class KeywordTable(BaseTable):
                 add_table_row(conn, keywords_table, kwargs_dict, commit=False)
             if commit:
                 conn.commit()
+        self.db_connection._invalidate_keywords()
 
     def disable_keyword(self, keyword: str):
         """
@@ -158,41 +160,7 @@ class KeywordTable(BaseTable):
         keywords : list[str]
         """
 
-        # Make sure things are valid
-        if not isinstance(keywords, list):
-            raise ValueError("Passed keywords object must be a list")
-
-        if len(keywords) == 0:
-            return
-
-        # Validate (make sure keywords are in the `keyword` table & active)
-        keyword_ids = self.validate_keywords(keywords)
-
-        # Link fo the dataset-keyword association table
-        dataset_keyword_table = self._get_table_metadata("dataset_keyword")
-
-        with self._engine.connect() as conn:
-            # Loop over each keyword in the list
-            for keyword_id in keyword_ids:
-                # Check if this dataset already has this keyword
-                stmt = (
-                    select(dataset_keyword_table)
-                    .where(dataset_keyword_table.c.dataset_id == dataset_id)
-                    .where(dataset_keyword_table.c.keyword_id == keyword_id)
-                )
-
-                result = conn.execute(stmt)
-                rows = result.fetchall()
-
-                # If we don't have the keyword, add it
-                if len(rows) == 0:
-                    add_table_row(
-                        conn,
-                        dataset_keyword_table,
-                        {"dataset_id": dataset_id, "keyword_id": keyword_id},
-                        commit=False,
-                    )
-            conn.commit()
+        self.tag_datasets([dataset_id], keywords)
 
     def remove_keywords_from_dataset(
             self,
@@ -208,7 +176,127 @@ class KeywordTable(BaseTable):
         keywords : list[str]
         """
 
-        raise NotImplementedError()
+        self.untag_datasets([dataset_id], keywords)
+
+    def tag_datasets(
+            self,
+            dataset_ids: list[int],
+            keywords: list[str]
+    ) -> int:
+        """
+        Tag many datasets with keywords, with a single INSERT.
+
+        Tags the datasets already have are skipped (the `dataset_keyword`
+        table has a unique (dataset_id, keyword_id) constraint), as are
+        disabled keywords and dataset IDs that do not exist.
+
+        Parameters
+        ----------
+        dataset_ids : list[int]
+        keywords : list[str]
+            Registered keywords
+
+        Returns
+        -------
+        - : int
+            Number of tags added
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
+        return self._tag([dataset_table.c.dataset_id.in_(dataset_ids)], keywords)
+
+    def untag_datasets(
+            self,
+            dataset_ids: list[int],
+            keywords: list[str]
+    ) -> int:
+        """
+        Remove keywords from many datasets, with a single DELETE.
+
+        Parameters
+        ----------
+        dataset_ids : list[int]
+        keywords : list[str]
+            Registered keywords (enabled or not)
+
+        Returns
+        -------
+        - : int
+            Number of tags removed
+        """
+
+        dataset_table = self._get_table_metadata("dataset")
+        return self._tag(
+            [dataset_table.c.dataset_id.in_(dataset_ids)], keywords, untag=True
+        )
+
+    def _tag(self, clauses, keywords, untag=False):
+        """
+        Tag (or untag) the datasets selected by `clauses` with `keywords`, in
+        one statement.
+
+        Parameters
+        ----------
+        clauses : list[sqlalchemy expression]
+            WHERE clauses on the dataset table
+        keywords : list[str]
+        untag : bool, optional
+            True to remove the tags rather than add them
+
+        Returns
+        -------
+        - : int
+            Number of tags added (or removed)
+        """
+
+        if not isinstance(keywords, list):
+            raise ValueError("Passed keywords object must be a list")
+        for k in keywords:
+            if not isinstance(k, str):
+                raise ValueError(f"{k} is not a valid keyword string")
+
+        lowered = [k.lower() for k in keywords]
+        found = self._lookup_keywords(lowered)
+        if not all(k in found for k in lowered):
+            raise ValueError("Not all keywords selected are registered")
+
+        # Disabled keywords can be removed, not added
+        keyword_ids = sorted(
+            {found[k].keyword_id for k in lowered if untag or found[k].active}
+        )
+        if len(keyword_ids) == 0:
+            return 0
+
+        dataset_table = self._get_table_metadata("dataset")
+        dataset_keyword_table = self._get_table_metadata("dataset_keyword")
+
+        if untag:
+            stmt = delete(dataset_keyword_table).where(
+                dataset_keyword_table.c.keyword_id.in_(keyword_ids),
+                dataset_keyword_table.c.dataset_id.in_(
+                    select(dataset_table.c.dataset_id).where(*clauses)
+                ),
+            )
+        else:
+            # Every (selected dataset, keyword) pair
+            keyword_table = self._get_table_metadata("keyword")
+            tags = (
+                select(dataset_table.c.dataset_id, keyword_table.c.keyword_id)
+                .join(keyword_table, true())
+                .where(keyword_table.c.keyword_id.in_(keyword_ids), *clauses)
+            )
+            dialect = sqlite if self._dialect == "sqlite" else postgresql
+            stmt = (
+                dialect.insert(dataset_keyword_table)
+                .from_select(["dataset_id", "keyword_id"], tags)
+                .on_conflict_do_nothing()
+            )
+
+        with self._engine.connect() as conn:
+            count = conn.execute(stmt).rowcount
+            conn.commit()
+
+        return count
 
     def _set_enable_keyword(self, keyword: str, enable: bool = True):
         keywords_table = self._get_table_metadata("keyword")
@@ -223,6 +311,28 @@ class KeywordTable(BaseTable):
                 return
         modify_fields = {"active": enable}
         self._modify(modify_fields, result.keyword_id)
+        self.db_connection._invalidate_keywords()
+
+    def _lookup_keywords(self, keywords: list[str]) -> dict:
+        """
+        Look up many (lower case) keywords, through the keyword cache of the
+        connection (see `DbConnection.get_keywords()`).
+
+        Parameters
+        ----------
+        keywords : list[str]
+
+        Returns
+        -------
+        found : dict[str, sqlalchemy Row object]
+            For each registered keyword, its `keyword_id` and `active` status.
+            Keywords that are not registered are missing from the dict.
+        """
+
+        if len(keywords) == 0:
+            return {}
+
+        return self.db_connection.get_keywords(keywords)
 
     def validate_keywords(self, keywords: list) -> list[int]:
         """
@@ -243,33 +353,15 @@ class KeywordTable(BaseTable):
             The associated `keyword_id`s from the `keyword` table
         """
 
-        keyword_ids = []
-
         for k in keywords:
             # Make sure keyword is a string
             if not isinstance(k, str):
                 raise ValueError(f"{k} is not a valid keyword string")
 
         # Make sure keywords are all in the keywords table
-        keyword_table = self._get_table_metadata("keyword")
-
-        stmt = select(keyword_table.c.keyword_id,
-                      keyword_table.c.active).where(
-            keyword_table.c.keyword.in_([x.lower() for x in keywords])
-        )
-
-        with self._engine.connect() as conn:
-            result = conn.execute(stmt)
-            conn.commit()
-
-        # See if keyword not found
-        rows = result.fetchall()   # sqlite doesn't support rowcount
-        if len(rows) < len(keywords):
+        found = self._lookup_keywords([x.lower() for x in keywords])
+        if len(found) < len({x.lower() for x in keywords}):
             raise ValueError("Not all keywords selected are registered")
 
         # Keyword found
-        for r in rows:
-            if r.active:
-                keyword_ids.append(r.keyword_id)
-
-        return keyword_ids
+        return [r.keyword_id for r in found.values() if r.active]
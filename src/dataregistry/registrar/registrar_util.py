@@ -1,10 +1,29 @@
-import hashlib
+import base64
+import binascii
+import errno
 import os
 import re
 import warnings
-from shutil import copyfile, copytree, rmtree
-
-from sqlalchemy import select
+import zlib
+from datetime import datetime
+from shutil import rmtree
+
+from sqlalchemy import Text, TypeDecorator, select
+
+from dataregistry.exceptions import DataRegistryIngestCancelled
+
+from .ingest_util import (
+    _INFRA_DIR_MODE,
+    ManifestEntry,
+    _hash_file,
+    _ingest_file,
+    _makedirs,
+    _manifest_of,
+    _parallel_copytree,
+    _rename_exchange,
+    _same_device,
+    _scan_tree,
+)
 
 __all__ = [
     "_parse_version_string",
@@ -13,7 +32,14 @@ __all__ = [
     "get_directory_info",
     "_name_from_relpath",
     "_copy_data",
+    "_resume_copy",
+    "_journal_path",
     "_relpath_from_name",
+    "_staging_path",
+    "_swap_in",
+    "_trash_path",
+    "_move_to_trash",
+    "_list_trash",
 ]
 VERSION_SEPARATOR = "."
 _nonneg_int_re = "0|[1-9][0-9]*"
@@ -92,15 +118,21 @@ def _form_dataset_path(owner_type,
     return to_return
 
 
-def get_directory_info(path):
+def get_directory_info(path, per_directory=False, workers=None):
     """
     Get the total disk space used by a directory and the total number of files
-    in the directory (includes subdirectories):
+    in the directory (includes subdirectories).
+
+    The tree is walked concurrently (see `_scan_tree`).
 
     Parameters
     ----------
     path : str
         Location of directory
+    per_directory : bool, optional
+        Also return the counts for each directory
+    workers : int, optional
+        Number of threads walking the tree
 
     Returns
     -------
@@ -108,20 +140,16 @@ def get_directory_info(path):
         Total number of files in dir (including subdirectories)
     total_size : float
         Total disk space (bytes) used by directory (including subdirectories)
+    dir_counts : dict
+        Only if `per_directory=True`. Maps each directory (relative to `path`,
+        "" being `path` itself) to the (number of files, disk space) directly
+        within it
     """
 
-    num_files = 0
-    total_size = 0
-    with os.scandir(path) as it:
-        for entry in it:
-            if entry.is_file():
-                num_files += 1
-                total_size += entry.stat().st_size
-            elif entry.is_dir():
-                subdir_num_files, subdir_total_size = get_directory_info(entry.path)
-                num_files += subdir_num_files
-                total_size += subdir_total_size
-    return num_files, total_size
+    scan = _scan_tree(path, workers=workers)
+    if per_directory:
+        return scan.num_files, scan.total_size, scan.dir_counts()
+    return scan.num_files, scan.total_size
 
 
 def _bump_version(name, v_string, dataset_table, engine):
@@ -166,8 +194,30 @@ def _bump_version(name, v_string, dataset_table, engine):
             old_minor = int(r.version_minor)
             old_patch = int(r.version_patch)
 
-    # Add 1 to the relative version part.
     v_fields = {"major": old_major, "minor": old_minor, "patch": old_patch}
+
+    return _increment_version(v_fields, v_string)
+
+
+def _increment_version(v_fields, v_string):
+    """
+    Bump a version by one major, minor or patch step.
+
+    Parameters
+    ----------
+    v_fields : dict
+        Current version dict with keys "major", "minor", "patch"
+    v_string : str
+        Special version string "major", "minor", "patch"
+
+    Returns
+    -------
+    v_fields : dict
+        Updated version dict with keys "major", "minor", "patch"
+    """
+
+    # Add 1 to the relative version part.
+    v_fields = dict(v_fields)
     v_fields[v_string] = v_fields[v_string] + 1
 
     # Reset fields as needed
@@ -213,9 +263,74 @@ def _name_from_relpath(relative_path):
     return name
 
 
+# Compressed configurations (see `_compress_configuration`) start with this
+_COMPRESSED_PREFIX = "zlib:"
+
+
+def _compress_configuration(contents):
+    """
+    Compress the text of a configuration for storage: zlib compressed, base64
+    encoded and prefixed with `_COMPRESSED_PREFIX`. Text that does not shrink
+    (e.g., short text) is stored as is.
+
+    Parameters
+    ----------
+    contents : str
+
+    Returns
+    -------
+    - : str
+    """
+
+    packed = _COMPRESSED_PREFIX + base64.b64encode(
+        zlib.compress(contents.encode())
+    ).decode("ascii")
+
+    return packed if len(packed) < len(contents) else contents
+
+
+def _decompress_configuration(value):
+    """
+    Undo `_compress_configuration`. Values that were not compressed (e.g.,
+    stored before compression was introduced) are returned as is.
+
+    Parameters
+    ----------
+    value : str or None
+
+    Returns
+    -------
+    - : str or None
+    """
+
+    if not isinstance(value, str) or not value.startswith(_COMPRESSED_PREFIX):
+        return value
+
+    try:
+        return zlib.decompress(
+            base64.b64decode(value[len(_COMPRESSED_PREFIX):], validate=True)
+        ).decode()
+    except (binascii.Error, zlib.error, UnicodeDecodeError):
+        return value
+
+
+class _CompressedText(TypeDecorator):
+    """
+    Text stored compressed (see `_compress_configuration`), to select a
+    column as (e.g., with `type_coerce`) so that it is read decompressed.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return _decompress_configuration(value)
+
+
 def _read_configuration_file(configuration_file, max_config_length):
     """
-    Read a text, YAML, TOML, etc, configuration file.
+    Read a text, YAML, TOML, etc, configuration file, compressed for storage
+    (see `_compress_configuration`).
 
     Parameters
     ----------
@@ -244,13 +359,25 @@ def _read_configuration_file(configuration_file, max_config_length):
             UserWarning,
         )
 
-    return contents
-
-
-_DATA_UMASK = 0o027
-
-
-def _copy_data(dataset_organization, source, dest, do_checksum=False):
+    return _compress_configuration(contents)
+
+
+def _copy_data(
+    dataset_organization,
+    source,
+    dest,
+    do_checksum=False,
+    copy_workers=None,
+    large_file_workers=None,
+    large_file_threshold=None,
+    logger=None,
+    ingest_mode="copy",
+    checksum=False,
+    scan=None,
+    reuse=None,
+    journal=None,
+    job=None,
+):
     """
     Copy data from one location to another (for ingesting directories and files
     into the `root_dir` shared space.
@@ -267,6 +394,16 @@ def _copy_data(dataset_organization, source, dest, do_checksum=False):
     For individual files a checksum validation can be performed if
     `do_checksum=True`, there is no such check for directories.
 
+    A manifest of the ingested files (path within the dataset, size, mtime
+    and, if `checksum=True`, digest) is returned. The digests are computed
+    while the data is copied, so no second pass over the data is needed.
+
+    Directories are copied in parallel (see `_parallel_copytree`).
+
+    Rather than a regular copy, the data can also be reflinked, hard linked
+    or moved, see `ingest_mode`. Modes that are not possible fall back to a
+    regular copy.
+
     Parameters
     ----------
     dataset_organization : str
@@ -277,46 +414,106 @@ def _copy_data(dataset_organization, source, dest, do_checksum=False):
         Destination we are copying to
     do_checksum : bool
         When overwriting files, do a checksum with the old and new file
-    """
+    copy_workers : int, optional
+        Number of threads copying (small) files of a directory
+    large_file_workers : int, optional
+        Number of threads copying large files of a directory
+    large_file_threshold : int, optional
+        Size (bytes) from which a file counts as large
+    logger : logging.Logger, optional
+        Where to report copy progress
+    ingest_mode : str, optional
+        "copy" (default), "reflink", "hardlink" or "auto" (see
+        `_ingest_file`), or "move" to rename `source` to `dest` (only when
+        they are on the same device, the source is then gone)
+    checksum : bool, optional
+        Compute the digest of each file for the manifest
+    scan : TreeScan, optional
+        An existing scan of a `source` directory (see `_scan_tree`), which is
+        then not walked again
+    reuse : _Reuse, optional
+        Hard link files that are unchanged from a previous iteration of the
+        dataset, rather than copying them (not used with "move")
+    journal : _IngestJournal, optional
+        Record the files as they are copied (see `_resume_copy`)
+    job : IngestJob, optional
+        The background job ingesting the data, which can cancel the copy
 
-    def _compute_checksum(file_path):
-        hasher = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+    Returns
+    -------
+    mode : str
+        How the data was actually ingested, e.g., "copy" or "move" (a comma
+        separated list if different files were ingested differently)
+    manifest : list[ManifestEntry]
+        The ingested files, sorted by path. Paths are relative to `dest` for a
+        directory (the file name for a single file)
+    """
 
     temp_dest = dest + "_DATAREG_backup"
 
     try:
+        if job is not None:
+            job._check_cancelled()
+
         # Backup original before copy
         if os.path.exists(dest):
             os.rename(dest, temp_dest)
 
         # Create any intervening directories
-        old_umask = os.umask(_DATA_UMASK)
-        os.makedirs(os.path.dirname(dest), exist_ok=True)
-        _ = os.umask(old_umask)
+        _makedirs(os.path.dirname(dest), exist_ok=True)
+
+        # A move is only a rename on the same device (else we copy)
+        modes, manifest = set(), []
+        if ingest_mode == "move" and _same_device(source, os.path.dirname(dest)):
+            os.rename(source, dest)
+            modes = {"move"}
+            manifest = _manifest_of(dest, checksum=checksum, scan=scan)
 
         # Copy a single file
-        if dataset_organization == "file":
-            old_umask = os.umask(_DATA_UMASK)
-            copyfile(source, dest)
-            _ = os.umask(old_umask)
+        elif dataset_organization == "file":
+            st = os.stat(source)
+            mode = None
+            if reuse is not None:
+                mode, digest = reuse.link(
+                    os.path.basename(dest), source, dest, st.st_size, st.st_mtime
+                )
+            if mode is None:
+                mode, digest = _ingest_file(
+                    source, dest, ingest_mode, checksum or do_checksum
+                )
+            modes = {mode}
+            manifest = [
+                ManifestEntry(
+                    os.path.basename(dest),
+                    st.st_size,
+                    st.st_mtime,
+                    digest if checksum else None,
+                )
+            ]
+            if journal is not None:
+                journal.record(manifest[0], mode)
 
             # Checksums on the files
             if do_checksum and os.path.exists(temp_dest):
-                cs_dest = _compute_checksum(dest)
-                cs_dest_backup = _compute_checksum(temp_dest)
-
-                if cs_dest != cs_dest_backup:
+                if digest != _hash_file(temp_dest):
                     raise Exception("Checksum with backup failed")
 
         # Copy a single directory (and subdirectories)
         elif dataset_organization == "directory":
-            old_umask = os.umask(_DATA_UMASK)
-            copytree(source, dest, copy_function=copyfile)
-            _ = os.umask(old_umask)
+            modes, manifest = _parallel_copytree(
+                source,
+                dest,
+                copy_workers=copy_workers,
+                large_file_workers=large_file_workers,
+                large_file_threshold=large_file_threshold,
+                logger=logger,
+                ingest_mode=ingest_mode,
+                checksum=checksum,
+                scan=scan,
+                reuse=reuse,
+                journal=journal,
+                job=job,
+            )
 
         # If successful, delete the backup
         if os.path.exists(temp_dest):
@@ -325,6 +522,9 @@ def _copy_data(dataset_organization, source, dest, do_checksum=False):
             else:
                 rmtree(temp_dest)
 
+        # An empty directory has nothing to ingest
+        return ",".join(sorted(modes)) if len(modes) > 0 else "copy", manifest
+
     except Exception as e:
         if os.path.exists(temp_dest):
             if os.path.exists(dest):
@@ -334,6 +534,10 @@ def _copy_data(dataset_organization, source, dest, do_checksum=False):
                     rmtree(dest)
             os.rename(temp_dest, dest)
 
+        # Cancelled on purpose, leave it to the caller to report
+        if isinstance(e, DataRegistryIngestCancelled):
+            raise
+
         print(
             "Something went wrong during data copying, aborting."
             "Note an entry in the registry database will still have"
@@ -343,6 +547,277 @@ def _copy_data(dataset_organization, source, dest, do_checksum=False):
         raise Exception(e)
 
 
+def _resume_copy(
+    dataset_organization,
+    source,
+    dest,
+    done,
+    journal,
+    ingest_mode="copy",
+    checksum=False,
+    copy_workers=None,
+    large_file_workers=None,
+    large_file_threshold=None,
+    logger=None,
+):
+    """
+    Carry on copying data after an interruption, skipping the files that had
+    already been copied (according to the ingest journal).
+
+    Unlike `_copy_data`, anything already at `dest` is kept.
+
+    Parameters
+    ----------
+    dataset_organization : str
+        "file" or "directory"
+    source : str
+        Path of source file or directory
+    dest : str
+        Destination we are copying to
+    done : dict
+        Files already copied (see `_IngestJournal.read()`)
+    journal : _IngestJournal
+        Where to record the files as they are copied
+    ingest_mode, checksum, copy_workers, large_file_workers,
+    large_file_threshold, logger :
+        See `_copy_data`
+
+    Returns
+    -------
+    mode : str
+    manifest : list[ManifestEntry]
+        See `_copy_data`
+    """
+
+    # The data was moved (renamed) in one go before the interruption
+    if (
+        ingest_mode == "move"
+        and not os.path.exists(source)
+        and os.path.exists(dest)
+    ):
+        return "move", _manifest_of(dest, checksum=checksum)
+
+    _makedirs(os.path.dirname(dest), exist_ok=True)
+
+    if dataset_organization == "directory":
+        modes, manifest = _parallel_copytree(
+            source,
+            dest,
+            copy_workers=copy_workers,
+            large_file_workers=large_file_workers,
+            large_file_threshold=large_file_threshold,
+            logger=logger,
+            ingest_mode=ingest_mode,
+            checksum=checksum,
+            journal=journal,
+            done=done,
+        )
+        return ",".join(sorted(modes)) if len(modes) > 0 else "copy", manifest
+
+    rel = os.path.basename(dest)
+    st = os.stat(source)
+    if rel in done:
+        entry, mode = done[rel]
+        if (
+            entry.size == st.st_size
+            and entry.mtime == st.st_mtime
+            and os.path.isfile(dest)
+            and os.stat(dest).st_size == st.st_size
+        ):
+            return mode, [entry]
+    if os.path.lexists(dest):
+        os.remove(dest)
+
+    mode, digest = _ingest_file(source, dest, ingest_mode, checksum)
+    entry = ManifestEntry(rel, st.st_size, st.st_mtime, digest)
+    journal.record(entry, mode)
+    return mode, [entry]
+
+
+def _journal_path(dataset_id, schema=None, root_dir=None):
+    """
+    Location of the ingest journal of a dataset:
+        <root_dir>/<schema>/.ingest_journal/<dataset_id>.jsonl
+
+    Parameters
+    ----------
+    dataset_id : int
+    schema : str, optional
+        Schema we are connected to
+    root_dir : str, optional
+        Root directory of data registry
+
+    Returns
+    -------
+    path : str
+    """
+
+    to_return = os.path.join(".ingest_journal", f"{dataset_id}.jsonl")
+    if schema:
+        to_return = os.path.join(schema, to_return)
+    if root_dir:
+        to_return = os.path.join(root_dir, to_return)
+    return to_return
+
+
+def _staging_path(dest):
+    """
+    Where to build new data that is to take the place of `dest`.
+
+    This is within a hidden directory next to `dest` (so on the same device,
+    and out of the way of `relative_path`s), with the same name as `dest`.
+
+    Parameters
+    ----------
+    dest : str
+        Final location of the data
+
+    Returns
+    -------
+    staged : str
+    """
+
+    parent, name = os.path.split(dest)
+    return os.path.join(parent, f".{name}_DATAREG_staging", name)
+
+
+def _swap_in(staged, dest):
+    """
+    Put the data staged at `staged` (see `_staging_path`) in place of `dest`.
+
+    If there is data at `dest` the two are swapped with a single atomic
+    rename, so readers of `dest` see either the old or the new data. Where
+    that is not supported (`renameat2(RENAME_EXCHANGE)` is Linux only) the
+    old data is renamed out of the way first, leaving a moment with no data
+    at `dest`. Should we stop in between, calling `_swap_in` again (as
+    `resume()` does) completes the swap.
+
+    Parameters
+    ----------
+    staged : str
+    dest : str
+
+    Returns
+    -------
+    old : str
+        The staging directory, now holding the old data, for the caller to
+        dispose of (None if there was no old data)
+    """
+
+    staging_dir = os.path.dirname(staged)
+
+    # Nothing there yet, or a swap without exchange stopped in between
+    if not os.path.lexists(dest):
+        os.rename(staged, dest)
+    else:
+        try:
+            _rename_exchange(staged, dest)
+        except OSError:
+            os.rename(dest, staged + "_DATAREG_old")
+            os.rename(staged, dest)
+
+    if len(os.listdir(staging_dir)) == 0:
+        os.rmdir(staging_dir)
+        return None
+    return staging_dir
+
+
+def _trash_path(dataset_id, schema=None, root_dir=None):
+    """
+    Where the data of a deleted dataset waits to be purged (keeping its own
+    name within this directory):
+        <root_dir>/<schema>/.trash/<dataset_id>
+
+    Parameters
+    ----------
+    dataset_id : int
+    schema : str, optional
+        Schema we are connected to
+    root_dir : str, optional
+        Root directory of data registry
+
+    Returns
+    -------
+    path : str
+    """
+
+    to_return = os.path.join(".trash", str(dataset_id))
+    if schema:
+        to_return = os.path.join(schema, to_return)
+    if root_dir:
+        to_return = os.path.join(root_dir, to_return)
+    return to_return
+
+
+def _move_to_trash(data_path, trash_dir):
+    """
+    Move data into the trash (see `_trash_path`) with a single rename.
+
+    Parameters
+    ----------
+    data_path : str
+        The data (file or directory) to trash
+    trash_dir : str
+        Trash directory of the dataset
+
+    Returns
+    -------
+    trashed : bool
+        False if the data is on another device than the trash (so cannot be
+        renamed into it)
+    """
+
+    created = not os.path.isdir(trash_dir)
+    _makedirs(trash_dir, mode=_INFRA_DIR_MODE, exist_ok=True)
+    try:
+        os.rename(data_path, os.path.join(trash_dir, os.path.basename(data_path)))
+    except OSError as e:
+        # Only clean up a trash directory we made, without hiding `e`
+        if created:
+            try:
+                os.rmdir(trash_dir)
+            except OSError:
+                pass
+        if e.errno == errno.EXDEV:
+            return False
+        raise
+    return True
+
+
+def _list_trash(trash_root):
+    """
+    List the trashed data under `trash_root` (<root_dir>/<schema>/.trash).
+
+    Parameters
+    ----------
+    trash_root : str
+
+    Returns
+    -------
+    trash : list[(int, str, datetime)]
+        (dataset_id, trash directory, when it was trashed) of each entry,
+        sorted by dataset ID
+    """
+
+    if not os.path.isdir(trash_root):
+        return []
+
+    trash = []
+    with os.scandir(trash_root) as it:
+        for entry in it:
+            try:
+                dataset_id = int(entry.name)
+                trashed = datetime.fromtimestamp(
+                    entry.stat(follow_symlinks=False).st_mtime
+                )
+            except (ValueError, OSError):
+                # Not a trash directory, or purged while we looked
+                continue
+            trash.append((dataset_id, entry.path, trashed))
+
+    return sorted(trash)
+
+
 def _relpath_from_name(name, version, old_location):
     """
     Construct a relative path from the name and version of a dataset.
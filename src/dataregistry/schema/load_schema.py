@@ -21,6 +21,8 @@ def _populate_defaults(mydict):
         "cli_default": None,
         "choices": None,
         "modifiable": False,
+        "compressed": False,
+        "deferred": False,
     }
 
     # Loop over eah row and ingest
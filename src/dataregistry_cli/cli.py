@@ -3,12 +3,16 @@ import sys
 import argparse
 from dataregistry.schema import DEFAULT_NAMESPACE
 from .register import register_dataset
-from .delete import delete_dataset
+from .delete import delete_dataset, delete_datasets, purge_trash, undelete_dataset
+from .resume import resume_dataset
+from .jobs import dregs_jobs
 from .query import dregs_ls
 from .path import dregs_path
 from .show import dregs_show
-from .modify import modify_dataset
+from .modify import modify_dataset, modify_datasets
+from .keyword import tag_datasets
 from dataregistry.schema import load_schema
+from dataregistry.registrar.ingest_util import _INGEST_MODES
 
 
 def _add_generic_arguments(parser_obj, add_entry_mode=True, add_query_mode=False):
@@ -191,6 +195,83 @@ def get_parser():
     )
     _add_generic_arguments(arg_modify_dataset)
 
+    # Modify many datasets at once.
+    arg_modify_datasets = arg_modify_sub.add_parser(
+        "datasets",
+        help="Modify the datasets matching filters, or a list of dataset_ids",
+    )
+    arg_modify_datasets.add_argument(
+        "column",
+        help="Column in the dataset table to modify",
+        type=str,
+    )
+    arg_modify_datasets.add_argument(
+        "new_value",
+        help="Updated value",
+        type=str,
+    )
+    arg_modify_datasets_which = (
+        arg_modify_datasets.add_mutually_exclusive_group(required=True)
+    )
+    arg_modify_datasets_which.add_argument(
+        "--filter",
+        help="""Filter selecting the datasets to modify, of the form
+        <column><op><value>, e.g., "name~=DESC:*" or "version_major<2". Can be
+        given several times, datasets must match all the filters.""",
+        type=str,
+        action="append",
+    )
+    arg_modify_datasets_which.add_argument(
+        "--dataset_ids",
+        help="The dataset_ids you wish to modify",
+        type=int,
+        nargs="+",
+    )
+    _add_generic_arguments(arg_modify_datasets)
+
+    # -------
+    # Keyword
+    # -------
+
+    # Tag (or untag) many datasets with keywords at once.
+    arg_keyword = subparsers.add_parser(
+        "keyword", help="Tag or untag datasets with keywords"
+    )
+
+    arg_keyword_sub = arg_keyword.add_subparsers(
+        title="tag or untag?", dest="keyword_action"
+    )
+
+    for action in ["tag", "untag"]:
+        arg_keyword_action = arg_keyword_sub.add_parser(
+            action,
+            help=f"{action.capitalize()} the datasets matching filters and/or "
+            "a list of dataset_ids",
+        )
+        arg_keyword_action.add_argument(
+            "keywords",
+            help="The (registered) keywords",
+            type=str,
+            nargs="+",
+        )
+        arg_keyword_action.add_argument(
+            "--filter",
+            help=f"""Filter selecting the datasets to {action}, of the form
+            <column><op><value>, e.g., "name~=DESC:*" or "version_major<2".
+            Can be given several times, datasets must match all the
+            filters.""",
+            type=str,
+            default=[],
+            action="append",
+        )
+        arg_keyword_action.add_argument(
+            "--dataset_ids",
+            help=f"The dataset_ids you wish to {action}",
+            type=int,
+            nargs="+",
+        )
+        _add_generic_arguments(arg_keyword_action)
+
     # --------
     # Register
     # --------
@@ -202,6 +283,7 @@ def get_parser():
     _TYPE_TRANSLATE = {
         "String": str,
         "Integer": int,
+        "BigInteger": int,
         "DateTime": str,
         "StringShort": str,
         "StringLong": str,
@@ -299,6 +381,13 @@ def get_parser():
         already be at correct relative_path.""",
         type=str,
     )
+    arg_register_dataset.add_argument(
+        "--ingest_mode",
+        help="""How to bring the data from old_location into the root_dir.
+        Modes that are not possible fall back to a copy.""",
+        choices=_INGEST_MODES,
+        default="copy",
+    )
     arg_register_dataset.add_argument(
         "--execution_name", help="Typically pipeline name or program name", type=str
     )
@@ -378,6 +467,95 @@ def get_parser():
     )
     _add_generic_arguments(arg_delete_dataset)
 
+    # Delete many datasets at once
+    arg_delete_datasets = arg_delete_sub.add_parser(
+        "datasets",
+        help="Delete the datasets matching filters and/or a list of dataset_ids",
+    )
+    arg_delete_datasets.add_argument(
+        "--filter",
+        help="""Filter selecting the datasets to delete, of the form
+        <column><op><value>, e.g., "name~=DESC:*" or "version_major<2". Can be
+        given several times, datasets must match all the filters.""",
+        type=str,
+        default=[],
+        action="append",
+    )
+    arg_delete_datasets.add_argument(
+        "--dataset_ids",
+        help="The dataset_ids you wish to delete",
+        type=int,
+        nargs="+",
+    )
+    arg_delete_datasets.add_argument(
+        "--dry_run",
+        help="Only report what would be deleted (and the space freed)",
+        action="store_true",
+    )
+    _add_generic_arguments(arg_delete_datasets)
+
+    # -----
+    # Purge
+    # -----
+
+    # Empty the trash.
+    arg_purge = subparsers.add_parser(
+        "purge",
+        help="Remove for good the data of deleted datasets from the trash",
+    )
+    arg_purge.add_argument(
+        "--older_than",
+        help="""Only purge the data deleted at least this many days ago. By
+        default the retention of the registry is used, 0 empties the
+        trash.""",
+        type=float,
+    )
+    arg_purge.add_argument(
+        "--dry_run",
+        help="Only report what would be purged (and the space freed)",
+        action="store_true",
+    )
+    _add_generic_arguments(arg_purge)
+
+    # --------
+    # Undelete
+    # --------
+
+    # Restore a deleted dataset.
+    arg_undelete = subparsers.add_parser(
+        "undelete",
+        help="Restore a deleted dataset whose data has not been purged yet",
+    )
+    arg_undelete.add_argument(
+        "dataset_id", help="The dataset_id you wish to restore", type=int
+    )
+    _add_generic_arguments(arg_undelete)
+
+    # ------
+    # Resume
+    # ------
+
+    # Resume an interrupted registration.
+    arg_resume = subparsers.add_parser(
+        "resume",
+        help="Resume the registration of a dataset whose data copy was interrupted",
+    )
+    arg_resume.add_argument(
+        "dataset_id", help="The dataset_id you wish to resume", type=int
+    )
+    _add_generic_arguments(arg_resume)
+
+    # ----
+    # Jobs
+    # ----
+
+    # List the data ingests in flight.
+    arg_jobs = subparsers.add_parser(
+        "jobs",
+        help="List the dataset ingestion jobs in flight (running or interrupted)",
+    )
+    _add_generic_arguments(arg_jobs)
+
     return parser
 
 
@@ -408,6 +586,24 @@ def main(cmd=None):
     elif args.subcommand == "delete":
         if args.delete_type in ["dataset", "dataset_by_id"]:
             delete_dataset(args)
+        elif args.delete_type == "datasets":
+            delete_datasets(args)
+
+    # Empty the trash
+    elif args.subcommand == "purge":
+        purge_trash(args)
+
+    # Restore a deleted dataset
+    elif args.subcommand == "undelete":
+        undelete_dataset(args)
+
+    # Resume an interrupted registration
+    elif args.subcommand == "resume":
+        resume_dataset(args)
+
+    # List ingestion jobs in flight
+    elif args.subcommand == "jobs":
+        dregs_jobs(args)
 
     # Query database entries
     elif args.subcommand == "ls":
@@ -426,3 +622,10 @@ def main(cmd=None):
     if args.subcommand == "modify":
         if args.modify_type == "dataset":
             modify_dataset(args)
+        elif args.modify_type == "datasets":
+            modify_datasets(args)
+
+    # Tag or untag datasets
+    elif args.subcommand == "keyword":
+        if args.keyword_action in ["tag", "untag"]:
+            tag_datasets(args)
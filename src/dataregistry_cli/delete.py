@@ -1,6 +1,9 @@
 from datetime import datetime
 import os
 from dataregistry import DataRegistry
+from .query import _parse_filters
+
+_TO_MBYTE = 1024 * 1024
 
 
 def delete_dataset(args):
@@ -47,3 +50,153 @@ def delete_dataset(args):
         datareg.Registrar.dataset.delete(
             args.name, args.version_string, args.owner, args.owner_type, confirm=True
         )
+
+
+def delete_datasets(args):
+    """
+    Delete many datasets in the DESC data registry at once, selected by
+    filters and/or dataset IDs (see `DatasetTable.delete_many()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.entry_mode : str
+        Which schema to default to within the namespace
+    args.namespace : str
+        Which namespace to connect to
+
+    args.filter : list[str]
+        Filters selecting the datasets to delete, e.g., "name~=DESC:*"
+    args.dataset_ids : list[int]
+        The dataset_ids of the datasets to delete
+    args.dry_run : bool
+        True to only report what would be deleted
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    report = datareg.Registrar.dataset.delete_many(
+        filters=_parse_filters(args.filter),
+        dataset_ids=args.dataset_ids,
+        dry_run=args.dry_run,
+        confirm=not args.dry_run,
+    )
+
+    freed = (
+        f"{report.num_files} files, {report.total_size/_TO_MBYTE:.2f} Mb "
+        "in the root_dir"
+    )
+    if report.dry_run:
+        print(f"Would delete {len(report.dataset_ids)} datasets ({freed})")
+        if len(report.dataset_ids) > 0:
+            print(f"dataset_id: {' '.join(str(x) for x in report.dataset_ids)}")
+    else:
+        print(f"Deleted {len(report.dataset_ids)} datasets ({freed})")
+
+
+def purge_trash(args):
+    """
+    Remove for good the data of deleted datasets from the trash (see
+    `DatasetTable.purge_trash()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.entry_mode : str
+        Which schema to default to within the namespace
+    args.namespace : str
+        Which namespace to connect to
+
+    args.older_than : float
+        Only purge data trashed at least this many days ago
+    args.dry_run : bool
+        True to only report what would be purged
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    report = datareg.Registrar.dataset.purge_trash(
+        older_than=args.older_than, dry_run=args.dry_run
+    )
+
+    freed = f"{report.num_files} files, {report.total_size/_TO_MBYTE:.2f} Mb"
+    if report.dry_run:
+        print(
+            f"Would purge the data of {len(report.dataset_ids)} datasets ({freed})"
+        )
+    else:
+        print(f"Purged the data of {len(report.dataset_ids)} datasets ({freed})")
+
+
+def undelete_dataset(args):
+    """
+    Undo the deletion of a dataset whose data is still in the trash (see
+    `DatasetTable.undelete()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.entry_mode : str
+        Which schema to default to within the namespace
+    args.namespace : str
+        Which namespace to connect to
+
+    args.dataset_id: int
+        The dataset_id of the dataset to restore
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    datareg.Registrar.dataset.undelete(args.dataset_id)
+    print(f"Undeleted dataset {args.dataset_id}")
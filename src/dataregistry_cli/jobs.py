@@ -0,0 +1,77 @@
+from dataregistry import DataRegistry
+import pandas as pd
+
+_TO_MBYTE = 1024 * 1024
+
+
+def dregs_jobs(args):
+    """
+    List the data ingests in flight (see `DatasetTable.list_ingest_jobs()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.entry_mode : str
+        Which schema to default to within the namespace
+    args.namespace : str
+        Which namespace to connect to
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    jobs = datareg.Registrar.dataset.list_ingest_jobs()
+    if len(jobs) == 0:
+        print("No ingestion jobs in flight")
+        return
+
+    results = pd.DataFrame(jobs)
+    results["files"] = [
+        f"{j['files_done']}/{j['num_files'] if j['num_files'] is not None else '?'}"
+        for j in jobs
+    ]
+    results["Mb"] = [
+        f"{j['bytes_done']/_TO_MBYTE:.2f}/"
+        + (
+            f"{j['total_size']/_TO_MBYTE:.2f}"
+            if j["total_size"] is not None
+            else "?"
+        )
+        for j in jobs
+    ]
+    results["last_update"] = results["last_update"].dt.strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+
+    # Print
+    with pd.option_context("display.max_colwidth", 40):
+        print(
+            results[
+                [
+                    "dataset_id",
+                    "name",
+                    "version_string",
+                    "owner",
+                    "state",
+                    "files",
+                    "Mb",
+                    "last_update",
+                ]
+            ].to_string(index=False)
+        )
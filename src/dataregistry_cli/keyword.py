@@ -0,0 +1,61 @@
+from dataregistry import DataRegistry
+from .query import _parse_filters
+
+
+def tag_datasets(args):
+    """
+    Tag (or untag) many datasets in the DESC data registry with keywords at
+    once, selected by filters and/or dataset IDs (see
+    `DatasetTable.tag_many()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.keyword_action : str
+        "tag" or "untag"
+    args.keywords : list[str]
+        The keywords to add (or remove)
+    args.filter : list[str]
+        Filters selecting the datasets, e.g., "name~=DESC:*"
+    args.dataset_ids : list[int]
+        The datasets to tag (restricted by the filters, if any)
+    args.entry_mode : str
+        Which schema to default to in the namespace
+    args.namespace : str
+        Which namespace to connect to
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    # Tag datasets.
+    if args.keyword_action == "tag":
+        num_tags = datareg.Registrar.dataset.tag_many(
+            args.keywords,
+            filters=_parse_filters(args.filter),
+            dataset_ids=args.dataset_ids,
+        )
+        print(f"Added {num_tags} keyword tags")
+    else:
+        num_tags = datareg.Registrar.dataset.untag_many(
+            args.keywords,
+            filters=_parse_filters(args.filter),
+            dataset_ids=args.dataset_ids,
+        )
+        print(f"Removed {num_tags} keyword tags")
@@ -1,6 +1,7 @@
 from datetime import datetime
 import os
 from dataregistry import DataRegistry
+from .query import _column_value, _parse_filters
 
 
 def modify_dataset(args):
@@ -51,3 +52,63 @@ def modify_dataset(args):
     print(
         f"Modified dataset {args.dataset_id} column {args.column} to '{args.new_value}'"
     )
+
+
+def modify_datasets(args):
+    """
+    Modify many datasets in the DESC data registry at once, selected by
+    filters or dataset IDs (see `BaseTable.modify_many()`).
+
+    As for `modify_dataset`, one column is set to a new value.
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.filter : list[str]
+        Filters selecting the datasets to modify, e.g., "name~=DESC:*"
+    args.dataset_ids : list[int]
+        The datasets to modify (instead of filters)
+    args.column : str
+        The column in the dataset table we are modifying
+    args.value : str
+        The updated value
+    args.entry_mode : str
+        Which schema to default to in the namespace
+    args.namespace : str
+        Which namespace to connect to
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    # Modify datasets.
+    new_value = _column_value(args.column, args.new_value)
+    if args.dataset_ids is not None:
+        num_modified = datareg.Registrar.dataset.modify_many(
+            updates={x: {args.column: new_value} for x in args.dataset_ids}
+        )
+    else:
+        num_modified = datareg.Registrar.dataset.modify_many(
+            filters=_parse_filters(args.filter),
+            modify_fields={args.column: new_value},
+        )
+
+    print(
+        f"Modified {num_modified} datasets column {args.column} to '{args.new_value}'"
+    )
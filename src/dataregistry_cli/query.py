@@ -1,7 +1,84 @@
 import os
+import re
 from dataregistry import DataRegistry
 import pandas as pd
 from dataregistry import Filter
+from dataregistry.schema import load_schema
+
+# A filter given on the command line, e.g., "owner==desc" or "name~=DESC:*".
+# Longer operators are listed first so "<=" is not read as "<"
+_FILTER_RE = re.compile(r"^\s*([\w.]+)\s*(~==|~=|==|!=|<=|>=|<|>|=)\s*(.*?)\s*$")
+
+# Conversion from the column types in `schema.yaml` for values given on the
+# command line
+_VALUE_TYPES = {
+    "Integer": int,
+    "BigInteger": int,
+    "Float": float,
+    "Boolean": lambda x: x.lower() in ["true", "1", "yes"],
+}
+
+
+def _column_value(column_name, value):
+    """
+    Convert a value given on the command line to the type of a column of the
+    dataset table (as defined in `schema.yaml`).
+
+    Parameters
+    ----------
+    column_name : str
+    value : str
+
+    Returns
+    -------
+    value : str, int, float or bool
+    """
+
+    column_definitions = load_schema()["tables"]["dataset"]["column_definitions"]
+    if column_name in column_definitions:
+        column_type = column_definitions[column_name]["type"]
+        if column_type in _VALUE_TYPES:
+            return _VALUE_TYPES[column_type](value)
+    return value
+
+
+def _parse_filters(filter_strings):
+    """
+    Parse filters given on the command line (e.g., `--filter owner==desc`).
+
+    Each filter is of the form "<column><op><value>", where <op> is one of the
+    dataregistry filter operators. Columns are those of the dataset table
+    (optionally prefixed with "dataset."), or "keyword.keyword". Values are
+    converted to the type of their column.
+
+    Parameters
+    ----------
+    filter_strings : list[str]
+
+    Returns
+    -------
+    filters : list[Filter]
+    """
+
+    filters = []
+    for filter_string in filter_strings:
+        m = _FILTER_RE.match(filter_string)
+        if m is None:
+            raise ValueError(
+                f"Bad filter '{filter_string}', expected <column><op><value>"
+            )
+        property_name, bin_op, value = m.groups()
+        if "." not in property_name:
+            property_name = f"dataset.{property_name}"
+
+        # Convert the value to the column type
+        table_name, column_name = property_name.split(".", 1)
+        if table_name == "dataset":
+            value = _column_value(column_name, value)
+
+        filters.append(Filter(property_name, bin_op, value))
+
+    return filters
 
 
 def _render_filters(datareg, args):
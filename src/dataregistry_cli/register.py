@@ -52,6 +52,7 @@ def register_dataset(args):
         is_overwritable=args.is_overwritable,
         description=args.description,
         old_location=args.old_location,
+        ingest_mode=args.ingest_mode,
         owner=args.owner,
         owner_type=args.owner_type,
         execution_name=args.execution_name,
@@ -0,0 +1,42 @@
+from dataregistry import DataRegistry
+
+
+def resume_dataset(args):
+    """
+    Resume the interrupted registration of a dataset (see
+    `DatasetTable.resume()`).
+
+    Parameters
+    ----------
+    args : argparse object
+
+    args.config_file : str
+        Path to data registry config file
+    args.schema : str
+        Which schema to search
+    args.root_dir : str
+        Path to root_dir
+    args.site : str
+        Look up root_dir using a site
+    args.entry_mode : str
+        Which schema to default to within the namespace
+    args.namespace : str
+        Which namespace to connect to
+
+    args.dataset_id: int
+        The dataset_id of the dataset to resume
+    """
+
+    # Connect to database.
+    datareg = DataRegistry(
+        config_file=args.config_file,
+        schema=args.schema,
+        root_dir=args.root_dir,
+        site=args.site,
+        entry_mode=args.entry_mode,
+        namespace=args.namespace,
+    )
+
+    datareg.Registrar.dataset.resume(args.dataset_id)
+
+    print(f"Completed registration of dataset {args.dataset_id}")
@@ -1,9 +1,12 @@
 import os
+from contextlib import contextmanager
 
 import pytest
+import sqlalchemy
 
 __all__ = [
     "dummy_file",
+    "_count_statements",
     "_insert_alias_entry",
     "_insert_execution_entry",
     "_insert_dataset_entry",
@@ -303,3 +306,36 @@ def _replace_dataset_entry(
     )
 
     return dataset_id
+
+
+@contextmanager
+def _count_statements(engine):
+    """
+    Count the SQL statements executed, and the commits made, through `engine`
+    within the context.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+
+    Yields
+    ------
+    counts : dict
+        The number of "statements" and "commits" so far
+    """
+
+    counts = {"statements": 0, "commits": 0}
+
+    def _count_statement(*args):
+        counts["statements"] += 1
+
+    def _count_commit(*args):
+        counts["commits"] += 1
+
+    sqlalchemy.event.listen(engine, "before_cursor_execute", _count_statement)
+    sqlalchemy.event.listen(engine, "commit", _count_commit)
+    try:
+        yield counts
+    finally:
+        sqlalchemy.event.remove(engine, "before_cursor_execute", _count_statement)
+        sqlalchemy.event.remove(engine, "commit", _count_commit)
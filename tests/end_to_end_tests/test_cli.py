@@ -136,6 +136,44 @@ def test_delete_dataset_by_id(dummy_file, monkeypatch):
     assert results["dataset.delete_uid"][0] is not None
 
 
+def test_delete_datasets_by_filter(dummy_file, monkeypatch, capsys):
+    """Make some entries, then delete them all with a filter"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+
+    # Register the datasets
+    for i in range(3):
+        cmd = f"register dataset my_cli_datasets_to_delete_{i} 0.0.1"
+        cmd += " --location_type dummy"
+        cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+        cli.main(shlex.split(cmd))
+
+    cmd = 'delete datasets --filter "name~=my_cli_datasets_to_delete_*"'
+    cmd += " --filter version_major==0"
+    cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+
+    # Dry run
+    cli.main(shlex.split(cmd + " --dry_run"))
+    assert "Would delete 3 datasets" in capsys.readouterr().out
+
+    # Delete the datasets
+    monkeypatch.setattr("builtins.input", lambda _: "y")
+    cli.main(shlex.split(cmd))
+    assert "Deleted 3 datasets" in capsys.readouterr().out
+
+    # Check
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    f = datareg.query.gen_filter("dataset.name", "~=", "my_cli_datasets_to_delete_*")
+    results = datareg.query.find_datasets(
+        property_names=["dataset.dataset_id", "dataset.status"], filters=[f]
+    )
+
+    assert len(results["dataset.dataset_id"]) == 3
+    for status in results["dataset.status"]:
+        assert get_dataset_status(status, "deleted")
+
+
 def test_delete_dataset_by_name(dummy_file, monkeypatch):
     """Make a simple entry, then delete it"""
 
@@ -336,3 +374,73 @@ def test_path_dataset_by_id(dummy_file, capsys):
     captured = capsys.readouterr()
 
     assert captured.out.strip() == expected_path
+
+
+def test_modify_datasets_by_filter(dummy_file):
+    """Make some entries, then modify them all with a filter"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+
+    # Register the datasets
+    for i in range(3):
+        cmd = f"register dataset my_cli_datasets_to_modify_{i} 0.0.1"
+        cmd += " --location_type dummy"
+        cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+        cli.main(shlex.split(cmd))
+
+    # Modify them
+    cmd = 'modify datasets description "Modified in bulk"'
+    cmd += ' --filter "name~=my_cli_datasets_to_modify_*"'
+    cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+    cli.main(shlex.split(cmd))
+
+    # Check
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    f = datareg.query.gen_filter("dataset.name", "~=", "my_cli_datasets_to_modify_*")
+    results = datareg.query.find_datasets(
+        property_names=["dataset.description"], filters=[f]
+    )
+
+    assert list(results["dataset.description"]) == ["Modified in bulk"] * 3
+
+
+def test_tag_datasets_by_filter(dummy_file):
+    """Make some entries, then tag and untag them all with a filter"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+
+    # Register the datasets
+    for i in range(3):
+        cmd = f"register dataset my_cli_datasets_to_tag_{i} 0.0.1"
+        cmd += " --location_type dummy --keywords simulation"
+        cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+        cli.main(shlex.split(cmd))
+
+    # Tag them (they already have the "simulation" tag)
+    cmd = 'keyword tag simulation observation'
+    cmd += ' --filter "name~=my_cli_datasets_to_tag_*"'
+    cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+    cli.main(shlex.split(cmd))
+
+    # Untag "simulation" from all but one
+    cmd = 'keyword untag simulation'
+    cmd += ' --filter "name~=my_cli_datasets_to_tag_*"'
+    cmd += ' --filter "name!=my_cli_datasets_to_tag_0"'
+    cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+    cli.main(shlex.split(cmd))
+
+    # Check
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    f = datareg.query.gen_filter("dataset.name", "~=", "my_cli_datasets_to_tag_*")
+    results = datareg.query.find_datasets(
+        property_names=["dataset.name", "keyword.keyword"], filters=[f]
+    )
+
+    assert sorted(zip(results["dataset.name"], results["keyword.keyword"])) == [
+        ("my_cli_datasets_to_tag_0", "observation"),
+        ("my_cli_datasets_to_tag_0", "simulation"),
+        ("my_cli_datasets_to_tag_1", "observation"),
+        ("my_cli_datasets_to_tag_2", "observation"),
+    ]
@@ -4,7 +4,7 @@ import pytest
 from dataregistry import DataRegistry
 from dataregistry.schema import DEFAULT_NAMESPACE
 from dataregistry.registrar.dataset_util import get_dataset_status
-from dataregistry.registrar.registrar_util import _form_dataset_path
+from dataregistry.registrar.registrar_util import _form_dataset_path, _trash_path
 
 from database_test_utils import _insert_dataset_entry, dummy_file
 
@@ -119,3 +119,200 @@ def test_delete_dataset_entry(dummy_file, is_dummy, dataset_name, delete_by_id):
             datareg.registrar.dataset._delete_by_id(d_id)
         else:
             datareg.registrar.dataset.delete(DNAME, DVERSION, DOWNER, DOWNER_TYPE)
+
+
+def test_delete_many(dummy_file):
+    """
+    Delete several datasets at once with `delete_many()`, selected by a
+    filter, after a dry run.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    # Two real datasets (a file and a directory), a dummy one, and one that
+    # does not match the filter
+    d_ids = []
+    for name, data_path in [
+        ("delete_many_file", str(tmp_src_dir / "file1.txt")),
+        ("delete_many_directory", str(tmp_src_dir / "directory1")),
+        ("delete_many_dummy", None),
+        ("keep_many_dummy", None),
+    ]:
+        d_ids.append(
+            _insert_dataset_entry(
+                datareg,
+                f"DESC:datasets:{name}",
+                "0.0.1",
+                location_type="dummy" if data_path is None else "dataregistry",
+                old_location=data_path,
+            )
+        )
+
+    f = datareg.query.gen_filter("dataset.name", "~=", "DESC:datasets:delete_many_*")
+    expected_size = os.path.getsize(tmp_src_dir / "file1.txt") + os.path.getsize(
+        tmp_src_dir / "directory1" / "file2.txt"
+    )
+
+    # A dry run reports, but does not delete
+    report = datareg.registrar.dataset.delete_many(filters=[f], dry_run=True)
+    assert report.dry_run
+    assert report.dataset_ids == d_ids[:3]
+    assert report.num_files == 2
+    assert report.total_size == expected_size
+
+    # Filters and dataset IDs restrict each other
+    report = datareg.registrar.dataset.delete_many(
+        filters=[f], dataset_ids=[d_ids[2], d_ids[3]], dry_run=True
+    )
+    assert report.dataset_ids == [d_ids[2]]
+
+    # Delete for real
+    report = datareg.registrar.dataset.delete_many(filters=[f])
+    assert not report.dry_run
+    assert report.dataset_ids == d_ids[:3]
+    assert report.num_files == 2
+    assert report.total_size == expected_size
+
+    f_ids = datareg.query.gen_filter("dataset.dataset_id", ">=", d_ids[0])
+    results = datareg.query.find_datasets(
+        property_names=[
+            "dataset.dataset_id",
+            "dataset.status",
+            "dataset.owner_type",
+            "dataset.owner",
+            "dataset.relative_path",
+        ],
+        filters=[f_ids],
+    )
+    for i, d_id in enumerate(results["dataset.dataset_id"]):
+        if d_id not in d_ids:
+            continue
+        deleted = d_id in d_ids[:3]
+        assert get_dataset_status(results["dataset.status"][i], "deleted") == deleted
+
+        # Make sure the data in the root_dir has gone
+        data_path = _form_dataset_path(
+            results["dataset.owner_type"][i],
+            results["dataset.owner"][i],
+            results["dataset.relative_path"][i],
+            schema=datareg.db_connection.entry_schema,
+            root_dir=str(tmp_root_dir),
+        )
+        assert not os.path.exists(data_path)
+
+    # Nothing left to delete
+    report = datareg.registrar.dataset.delete_many(filters=[f])
+    assert report.dataset_ids == []
+
+    # Must select something
+    with pytest.raises(ValueError, match="Must select"):
+        datareg.registrar.dataset.delete_many()
+
+
+def test_delete_trash_undelete_purge(dummy_file):
+    """
+    Deleted data goes to the trash, from where the deletion can be undone
+    until the trash is purged.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    dataset_table = datareg.registrar.dataset
+
+    d_id = _insert_dataset_entry(
+        datareg,
+        "DESC:datasets:trash_and_undelete",
+        "0.0.1",
+        location_type="dataregistry",
+        old_location=str(tmp_src_dir / "directory1"),
+    )
+    entry = dataset_table.find_entry(d_id)
+    data_path = _form_dataset_path(
+        entry.owner_type,
+        entry.owner,
+        entry.relative_path,
+        schema=datareg.db_connection.entry_schema,
+        root_dir=str(tmp_root_dir),
+    )
+    trash_dir = _trash_path(
+        d_id, schema=datareg.db_connection.entry_schema, root_dir=str(tmp_root_dir)
+    )
+
+    # Delete, the data is moved to the trash
+    dataset_table._delete_by_id(d_id)
+    assert not os.path.exists(data_path)
+    assert os.path.isfile(
+        os.path.join(trash_dir, os.path.basename(data_path), "file2.txt")
+    )
+
+    # Undo the deletion
+    dataset_table.undelete(d_id)
+    assert os.path.isfile(os.path.join(data_path, "file2.txt"))
+    assert not os.path.exists(trash_dir)
+    assert not get_dataset_status(dataset_table.find_entry(d_id).status, "deleted")
+    with pytest.raises(ValueError, match="not deleted"):
+        dataset_table.undelete(d_id)
+
+    # Delete again. The data is kept for the retention period
+    dataset_table._delete_by_id(d_id)
+    report = dataset_table.purge_trash()
+    assert report.dataset_ids == []
+    assert os.path.isdir(trash_dir)
+
+    # Empty the trash
+    file_size = os.path.getsize(tmp_src_dir / "directory1" / "file2.txt")
+    report = dataset_table.purge_trash(older_than=0, dry_run=True)
+    assert report == ([d_id], 1, file_size, True)
+    assert os.path.isdir(trash_dir)
+    report = dataset_table.purge_trash(older_than=0)
+    assert report == ([d_id], 1, file_size, False)
+    assert not os.path.exists(trash_dir)
+
+    # Too late to undo
+    with pytest.raises(ValueError, match="has been purged"):
+        dataset_table.undelete(d_id)
+
+
+def test_undelete_replaced_dataset(dummy_file):
+    """
+    The latest iteration of a replaced dataset can be undeleted, the earlier
+    iterations sharing its `relative_path` do not count as taking it.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    dataset_table = datareg.registrar.dataset
+
+    _NAME = "DESC:datasets:undelete_replaced"
+    d_ids = [
+        _insert_dataset_entry(
+            datareg,
+            _NAME,
+            "0.0.1",
+            location_type="dataregistry",
+            old_location=str(tmp_src_dir / "directory1"),
+            is_overwritable=True,
+        )
+    ]
+    for _ in range(2):
+        d_id, _ = dataset_table.replace(
+            _NAME,
+            "0.0.1",
+            old_location=str(tmp_src_dir / "directory1"),
+            is_overwritable=True,
+        )
+        d_ids.append(d_id)
+    data_path = datareg.query.get_dataset_absolute_path(d_ids[-1])
+
+    report = dataset_table.delete_many(dataset_ids=[d_ids[-1]])
+    assert report.dataset_ids == [d_ids[-1]]
+    assert not os.path.exists(data_path)
+
+    dataset_table.undelete(d_ids[-1])
+    assert os.path.isfile(os.path.join(data_path, "file2.txt"))
+    entry = dataset_table.find_entry(d_ids[-1])
+    assert not get_dataset_status(entry.status, "deleted")
@@ -1,5 +1,9 @@
 import pytest
-from database_test_utils import _insert_dataset_entry, dummy_file  # noqa
+from database_test_utils import (  # noqa
+    _count_statements,
+    _insert_dataset_entry,
+    dummy_file,
+)
 
 from dataregistry import DataRegistry
 from dataregistry.schema import DEFAULT_NAMESPACE
@@ -129,6 +133,52 @@ def test_modify_dataset_with_keywords(dummy_file):
     assert results["keyword.keyword"][0] in ["simulation", "observation"]
 
 
+def test_query_collapse_keywords(dummy_file):
+    """
+    Register two datasets with keywords, then query them with
+    `collapse_keywords=True`. Each dataset should come back as a single row,
+    with its keywords gathered into a sorted list.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    d_id_1 = _insert_dataset_entry(
+        datareg,
+        "DESC:datasets:my_first_collapse_keywords_dataset",
+        "0.0.1",
+        keywords=["simulation", "observation"],
+    )
+    d_id_2 = _insert_dataset_entry(
+        datareg,
+        "DESC:datasets:my_second_collapse_keywords_dataset",
+        "0.0.1",
+        keywords=["simulation"],
+    )
+
+    f = datareg.query.gen_filter("dataset.dataset_id", ">=", d_id_1)
+    f2 = datareg.query.gen_filter("dataset.dataset_id", "<=", d_id_2)
+    results = datareg.find_datasets(
+        property_names=["dataset.dataset_id", "dataset.name", "keyword.keyword"],
+        filters=[f, f2],
+        collapse_keywords=True,
+    )
+
+    assert len(results["dataset.dataset_id"]) == 2
+    keywords = dict(zip(results["dataset.dataset_id"], results["keyword.keyword"]))
+    assert list(keywords[d_id_1]) == ["observation", "simulation"]
+    assert list(keywords[d_id_2]) == ["simulation"]
+
+    # Without the dataset columns we still get one row per dataset
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id_1)
+    results = datareg.find_datasets(
+        property_names=["keyword.keyword"], filters=[f], collapse_keywords=True
+    )
+    assert len(results["keyword.keyword"]) == 1
+    assert list(results["keyword.keyword"][0]) == ["observation", "simulation"]
+
+
 def test_create_custom_keyword(dummy_file):
     """
     Add a keyword to the keyword table.
@@ -214,3 +264,89 @@ def test_add_keywords_to_dataset(dummy_file, create_dataset_entry_for_keyword):
         "new_keyword1",
         "new_keyword2",
     ]
+
+
+def test_tag_untag_datasets(dummy_file):
+    """
+    Tag and untag many datasets at once, by dataset ID and by filter.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    d_ids = [
+        _insert_dataset_entry(
+            datareg, f"DESC:datasets:my_dataset_to_tag_{i}", "0.0.1"
+        )
+        for i in range(3)
+    ]
+    datareg.create_keywords(["bulk_keyword1", "bulk_keyword2", "bulk_disabled"])
+    datareg.registrar.keyword.disable_keyword("bulk_disabled")
+
+    def _tags():
+        return [
+            sorted(datareg.registrar.keyword.get_keywords_from_dataset(d))
+            for d in d_ids
+        ]
+
+    # By dataset ID, existing tags and disabled keywords are skipped
+    keyword_table = datareg.registrar.keyword
+    assert keyword_table.tag_datasets(d_ids[:2], ["bulk_keyword1"]) == 2
+    assert keyword_table.tag_datasets(d_ids, ["BULK_KEYWORD1", "bulk_disabled"]) == 1
+    assert _tags() == [["bulk_keyword1"]] * 3
+
+    # By filter
+    f = datareg.query.gen_filter("dataset.name", "~=", "DESC:datasets:my_dataset_to_tag_*")
+    assert datareg.registrar.dataset.tag_many(["bulk_keyword2"], filters=[f]) == 3
+    assert keyword_table.untag_datasets(d_ids[:1], ["bulk_keyword1"]) == 1
+    f_kw = datareg.query.gen_filter("keyword.keyword", "==", "bulk_keyword1")
+    assert datareg.registrar.dataset.untag_many(
+        ["bulk_keyword2"], filters=[f, f_kw]
+    ) == 2
+    assert _tags() == [["bulk_keyword2"], ["bulk_keyword1"], ["bulk_keyword1"]]
+
+    # Single dataset
+    datareg.registrar.keyword.remove_keywords_from_dataset(d_ids[0], ["bulk_keyword2"])
+    assert _tags()[0] == []
+
+    with pytest.raises(ValueError, match="Not all keywords"):
+        keyword_table.tag_datasets(d_ids, ["not_a_keyword"])
+    with pytest.raises(ValueError, match="Must select datasets"):
+        datareg.registrar.dataset.tag_many(["bulk_keyword1"])
+
+
+def test_keyword_cache(dummy_file):
+    """
+    Keywords are looked up through a cache of the connection, reloaded when a
+    keyword is missing and cleared when keywords are created or disabled.
+    """
+
+    # Establish connections to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    other = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    keyword_table = datareg.registrar.keyword
+    engine = datareg.db_connection.engine
+
+    with _count_statements(engine) as counts:
+        # One query fills the cache
+        sim_id = keyword_table.validate_keywords(["simulation"])
+        assert keyword_table.validate_keywords(["Simulation", "observation"])
+        assert counts["statements"] == 1
+
+        # A keyword created elsewhere is a miss, reloading the cache
+        other.create_keywords(["cached_keyword"])
+        assert len(keyword_table.validate_keywords(["cached_keyword"])) == 1
+        assert counts["statements"] == 2
+
+        # Unknown keywords are still rejected
+        with pytest.raises(ValueError, match="Not all keywords"):
+            keyword_table.validate_keywords(["not_a_cached_keyword"])
+
+        # Disabling a keyword clears the cache
+        keyword_table.disable_keyword("cached_keyword")
+        assert keyword_table.validate_keywords(["cached_keyword"]) == []
+        assert keyword_table.validate_keywords(["simulation"]) == sim_id
+
+    assert "cached_keyword" in datareg.get_keyword_list(query_mode="working")
@@ -1,5 +1,7 @@
+import pandas as pd
 import pytest
 from dataregistry import DataRegistry
+from dataregistry.exceptions import DataRegistryNoColumn
 from dataregistry.schema import DEFAULT_NAMESPACE
 
 from database_test_utils import dummy_file
@@ -163,3 +165,93 @@ def test_modify_not_allowed(dummy_file):
     # Try to mofify a column that doesn't exist
     with pytest.raises(ValueError, match="not exist in the schema"):
         datareg.registrar.dataset.modify(d_id, {"my_dataset_id": 10})
+
+
+def test_modify_many(dummy_file):
+    """
+    Modify several entries at once, with their own values, then with the
+    same values for those matching a filter.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    d_ids = [
+        _insert_dataset_entry(
+            datareg,
+            f"DESC:datasets:modify_many_{i}",
+            "0.0.1",
+            location_type="dummy",
+        )
+        for i in range(4)
+    ]
+
+    def _get(column):
+        f = datareg.query.gen_filter("dataset.name", "~=", "DESC:datasets:modify_many_*")
+        results = datareg.query.find_datasets(
+            property_names=["dataset.dataset_id", f"dataset.{column}"],
+            filters=[f],
+        )
+        return dict(zip(results["dataset.dataset_id"], results[f"dataset.{column}"]))
+
+    # Each entry its own values (entries modifying different columns)
+    num_modified = datareg.registrar.dataset.modify_many(
+        updates={
+            d_ids[0]: {"description": "first", "creation_date": "2023-05-16"},
+            d_ids[1]: {"description": "second", "creation_date": "2023-05-17"},
+            d_ids[2]: {"url": "https://example.org", "description": None},
+        }
+    )
+    assert num_modified == 3
+    descriptions = _get("description")
+    assert descriptions[d_ids[0]] == "first"
+    assert descriptions[d_ids[1]] == "second"
+    assert pd.isnull(descriptions[d_ids[2]])
+    assert _get("url")[d_ids[2]] == "https://example.org"
+    creation_dates = _get("creation_date")
+    assert creation_dates[d_ids[0]].day == 16
+    assert creation_dates[d_ids[1]].day == 17
+
+    # The same value for all the entries matching a filter
+    f = datareg.query.gen_filter("dataset.name", "~=", "DESC:datasets:modify_many_*")
+    num_modified = datareg.registrar.dataset.modify_many(
+        filters=[f], modify_fields={"description": "bulk"}
+    )
+    assert num_modified == 4
+    assert set(_get("description").values()) == {"bulk"}
+
+    # Nothing is modified if any entry or column is bad
+    with pytest.raises(ValueError, match="not modifiable"):
+        datareg.registrar.dataset.modify_many(
+            updates={d_ids[0]: {"description": "x"}, d_ids[1]: {"name": "x"}}
+        )
+    with pytest.raises(ValueError, match="not found"):
+        datareg.registrar.dataset.modify_many(
+            updates={d_ids[0]: {"description": "x"}, 10000000: {"description": "x"}}
+        )
+    assert set(_get("description").values()) == {"bulk"}
+
+    with pytest.raises(ValueError, match="Must give one of"):
+        datareg.registrar.dataset.modify_many()
+
+    # Filters on the columns of other tables
+    e_ids = [
+        _insert_execution_entry(
+            datareg, f"test_modify_many_execution_{i}", "original"
+        )
+        for i in range(2)
+    ]
+    f = datareg.query.gen_filter("execution_id", ">=", min(e_ids))
+    num_modified = datareg.registrar.execution.modify_many(
+        filters=[f, ("name", "==", "test_modify_many_execution_1")],
+        modify_fields={"description": "bulk"},
+    )
+    assert num_modified == 1
+    for e_id, description in zip(e_ids, ["original", "bulk"]):
+        assert datareg.registrar.execution.find_entry(e_id).description == description
+
+    with pytest.raises(DataRegistryNoColumn):
+        datareg.registrar.execution.modify_many(
+            filters=[("dataset.name", "==", "x")], modify_fields={"description": "x"}
+        )
@@ -1,9 +1,12 @@
+from datetime import datetime
+
 import pandas as pd
 import pytest
 from database_test_utils import (
     _insert_alias_entry,
     _insert_dataset_entry,
     _insert_execution_entry,
+    _replace_dataset_entry,
     dummy_file,  # noqa
 )
 
@@ -64,6 +67,53 @@ def test_query_all(dummy_file):
         assert len(v) == 1
 
 
+def test_query_projection(dummy_file):
+    """Test the named projections, and changing the default one"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(
+        root_dir=str(tmp_root_dir),
+        namespace=DEFAULT_NAMESPACE,
+        default_projection="minimal",
+    )
+
+    d_id = _insert_dataset_entry(
+        datareg,
+        "DESC:datasets:test_query_projection",
+        "0.0.1",
+    )
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+
+    # Default (here "minimal") projection
+    results = datareg.find_datasets(filters=[f])
+    assert set(results.keys()) == {
+        "dataset.dataset_id",
+        "dataset.name",
+        "dataset.version_string",
+        "dataset.owner",
+        "dataset.owner_type",
+    }
+    assert results["dataset.dataset_id"] == [d_id]
+
+    # Named projections
+    results = datareg.find_datasets(property_names="standard", filters=[f])
+    assert "dataset.relative_path" in results
+    assert "dataset.description" not in results
+    results = datareg.find_datasets(property_names="full", filters=[f])
+    assert "dataset.description" in results
+    assert "dataset.access_api_configuration" not in results
+
+    datareg.query.default_projection = "full"
+    results = datareg.find_datasets(filters=[f])
+    assert "dataset.description" in results
+
+    with pytest.raises(ValueError, match="not a valid projection"):
+        datareg.find_datasets(property_names="everything", filters=[f])
+    with pytest.raises(ValueError, match="not a valid projection"):
+        datareg.query.default_projection = "everything"
+
+
 @pytest.mark.parametrize(
     "op,offset_from_first,expected_count",
     [
@@ -235,6 +285,146 @@ def test_query_between_columns(dummy_file):
         assert results["dataset.version_string"][0] == _V_STRING
 
 
+def test_query_join_many_tables(dummy_file):
+    """
+    Query columns from several tables at once (execution, alias, keyword and
+    dependency), making sure each dataset comes back with the right rows.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    # An input dataset, and an output dataset made from it
+    _NAME = "DESC:datasets:test_query_join_many_tables"
+    in_id = _insert_dataset_entry(datareg, _NAME + "_input", "0.0.1")
+    e_id = _insert_execution_entry(
+        datareg, "test_query_join_many_tables", "test", input_datasets=[in_id]
+    )
+    out_id = _insert_dataset_entry(
+        datareg, _NAME + "_output", "0.0.1", execution_id=e_id,
+        keywords=["simulation"],
+    )
+    _insert_alias_entry(datareg.Registrar, "alias:test_query_join_many_tables", out_id)
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", out_id)
+    results = datareg.query.find_datasets(
+        property_names=[
+            "dataset.name",
+            "execution.name",
+            "dataset_alias.alias",
+            "keyword.keyword",
+        ],
+        filters=[f],
+    )
+    assert len(results["dataset.name"]) == 1
+    assert results["execution.name"][0] == "test_query_join_many_tables"
+    assert results["dataset_alias.alias"][0] == "alias:test_query_join_many_tables"
+    assert results["keyword.keyword"][0] == "simulation"
+
+    # The input dataset was used by the execution
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", in_id)
+    results = datareg.query.find_datasets(
+        property_names=["dataset.dataset_id", "dependency.execution_id"],
+        filters=[f],
+    )
+    assert results["dependency.execution_id"] == [e_id]
+
+    # The output dataset was made from the input dataset
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", out_id)
+    results = datareg.query.find_datasets(
+        property_names=["dataset.dataset_id", "dependency.input_id"],
+        filters=[f],
+        dependency_direction="output",
+    )
+    assert results["dependency.input_id"] == [in_id]
+
+
+def test_query_facets(dummy_file):
+    """
+    Count datasets per owner_type and per keyword in one call, for a set of
+    datasets restricted by a filter.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _OWNER = "test_query_facets_owner"
+    for i, (owner_type, keywords) in enumerate(
+        [
+            ("group", ["simulation", "observation"]),
+            ("group", ["simulation"]),
+            ("project", []),
+        ]
+    ):
+        _insert_dataset_entry(
+            datareg,
+            f"DESC:datasets:test_query_facets_{i}",
+            "0.0.1",
+            owner=_OWNER,
+            owner_type=owner_type,
+            keywords=keywords,
+        )
+
+    f = datareg.query.gen_filter("dataset.owner", "==", _OWNER)
+    counts = datareg.query.facets(
+        filters=[f], facets=["dataset.owner_type", "keyword.keyword"]
+    )
+
+    assert counts["dataset.owner_type"] == {"group": 2, "project": 1}
+    assert counts["keyword.keyword"] == {"simulation": 2, "observation": 1, None: 1}
+
+    # Filtering on a keyword restricts the datasets counted for every facet
+    f2 = datareg.query.gen_filter("keyword.keyword", "==", "observation")
+    counts = datareg.query.facets(filters=[f, f2], facets=["dataset.owner_type"])
+    assert counts["dataset.owner_type"] == {"group": 1}
+
+    # A facet repeated (or spelled differently) is only counted once
+    counts = datareg.query.facets(
+        filters=[f],
+        facets=["dataset.owner", "owner_type", "dataset.owner", "dataset.owner_type"],
+    )
+    assert counts == {
+        "dataset.owner": {_OWNER: 3},
+        "dataset.owner_type": {"group": 2, "project": 1},
+    }
+
+
+def test_query_as_of(dummy_file):
+    """
+    Register a dataset, replace it and then delete the replacement, checking
+    which dataset an `as_of` query returns at each point in time.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:datasets:test_query_as_of"
+
+    t0 = datetime.now()
+    d_id = _insert_dataset_entry(datareg, _NAME, "0.0.1", is_overwritable=True)
+    t1 = datetime.now()
+    d2_id = _replace_dataset_entry(datareg, _NAME, "0.0.1")
+    t2 = datetime.now()
+    datareg.registrar.dataset._delete_by_id(d2_id)
+    t3 = datetime.now()
+
+    f = datareg.query.gen_filter("dataset.name", "==", _NAME)
+    for as_of, expected in [(t0, []), (t1, [d_id]), (t2, [d2_id]), (t3, [])]:
+        results = datareg.query.find_datasets(
+            property_names=["dataset.dataset_id"], filters=[f], as_of=as_of
+        )
+        assert results.get("dataset.dataset_id", []) == expected
+
+    # Without `as_of` every entry comes back
+    results = datareg.query.find_datasets(
+        property_names=["dataset.dataset_id"], filters=[f]
+    )
+    assert sorted(results["dataset.dataset_id"]) == [d_id, d2_id]
+
+
 @pytest.mark.skipif(
     datareg.db_connection._dialect == "sqlite", reason="wildcards break for sqlite"
 )
@@ -1,5 +1,6 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import pytest
@@ -9,7 +10,7 @@ from dataregistry import DataRegistry
 from dataregistry.schema import DEFAULT_NAMESPACE
 from dataregistry.registrar.dataset_util import get_dataset_status, set_dataset_status
 from dataregistry.registrar.registrar_util import _form_dataset_path
-from database_test_utils import _insert_dataset_entry, dummy_file
+from database_test_utils import _count_statements, _insert_dataset_entry, dummy_file
 
 
 def test_register_dataset_defaults(dummy_file):
@@ -56,7 +57,7 @@ def test_register_dataset_defaults(dummy_file):
     assert results["register_date"][0] is not None
     assert results["creator_uid"][0] == os.getenv("USER")
     assert results["access_api"][0] is None
-    assert results["access_api_configuration"][0] is None
+    assert "access_api_configuration" not in results
     assert results["nfiles"][0] == 0
     assert results["total_disk_space"][0] == 0
     assert results["register_root_dir"][0] == str(tmp_root_dir)
@@ -129,7 +130,7 @@ def test_register_dataset_manual(dummy_file):
     assert results["register_date"][0] is not None
     assert results["creator_uid"][0] == os.getenv("USER")
     assert results["access_api"][0] == _ACCESS_API
-    assert results["access_api_configuration"][0] is None
+    assert "access_api_configuration" not in results
     assert results["nfiles"][0] == 0
     assert results["total_disk_space"][0] == 0
     assert results["register_root_dir"][0] == str(tmp_root_dir)
@@ -402,3 +403,201 @@ def test_dataset_bad_name_string(dummy_file, name):
             name,
             "3.2.1",
         )
+
+
+def test_register_single_transaction(dummy_file):
+    """
+    A dataset (without data to copy) is registered in a single transaction,
+    and a clashing dataset is rejected by the database without leaving
+    anything behind.
+    """
+
+    _NAME = "DESC:datasets:test_register_single_transaction"
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    engine = datareg.db_connection.engine
+
+    with _count_statements(engine) as counts:
+        d_id = _insert_dataset_entry(
+            datareg, _NAME, "1.0.0", keywords=["simulation", "observation"]
+        )
+
+        # Keyword lookup, path check, execution, dataset and keyword inserts
+        assert counts == {"statements": 5, "commits": 1}
+
+        with pytest.warns(UserWarning, match="existing entry with path"):
+            with pytest.raises(ValueError, match="already a dataset"):
+                _insert_dataset_entry(datareg, _NAME, "1.0.0")
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.query.find_datasets(
+        ["dataset.version_string", "dataset.status", "keyword.keyword"], [f]
+    )
+    assert set(results["dataset.version_string"]) == {"1.0.0"}
+    assert set(results["dataset.status"]) == {1}
+    assert set(results["keyword.keyword"]) == {"simulation", "observation"}
+
+    # The rejected dataset did not leave a fabricated execution behind
+    exec_table = datareg.registrar.execution._get_table_metadata("execution")
+    stmt = sqlalchemy.select(exec_table.c.execution_id).where(
+        exec_table.c.name == f"for_dataset_{_NAME}-1.0.0"
+    )
+    with engine.connect() as conn:
+        assert len(conn.execute(stmt).all()) == 1
+
+
+def test_concurrent_version_bumps(dummy_file):
+    """
+    Version bumps of the same name registered concurrently, from separate
+    connections and with both `register()` and `register_many()`, are each
+    given a distinct version.
+    """
+
+    _NAME = "DESC:datasets:test_concurrent_version_bumps"
+
+    tmp_src_dir, tmp_root_dir = dummy_file
+    dataregs = [
+        DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+        for _ in range(6)
+    ]
+
+    def _bump(i):
+        datareg = dataregs[i]
+        if i % 2 == 0:
+            return [_insert_dataset_entry(datareg, _NAME, "patch")]
+        d_ids, errors = datareg.registrar.dataset.register_many(
+            [{"name": _NAME, "version": "patch", "location_type": "dummy"}] * 2
+        )
+        assert errors == {}
+        return d_ids
+
+    with ThreadPoolExecutor(max_workers=len(dataregs)) as pool:
+        d_ids = [d for ids in pool.map(_bump, range(len(dataregs))) for d in ids]
+    assert len(d_ids) == 9
+
+    f = dataregs[0].query.gen_filter("dataset.name", "==", _NAME)
+    results = dataregs[0].query.find_datasets(["dataset.version_string"], [f])
+    assert sorted(results["dataset.version_string"]) == [
+        f"0.0.{p}" for p in range(1, 10)
+    ]
+
+
+def test_register_many_clashes(dummy_file, monkeypatch):
+    """
+    Clashes in `register_many()` between datasets without data in the
+    `root_dir`, within the batch or with a dataset registered concurrently,
+    are reported per entry.
+    """
+
+    _NAME = "DESC:datasets:test_register_many_clashes"
+
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    specs = [
+        {"name": _NAME, "version": "0.0.1", "location_type": "meta_only"},
+        {"name": _NAME, "version": "0.0.1", "location_type": "meta_only"},
+        {"name": _NAME + "_good", "version": "0.0.1", "location_type": "meta_only"},
+    ]
+    d_ids, errors = datareg.registrar.dataset.register_many(specs)
+    assert list(errors.keys()) == [1]
+    assert isinstance(errors[1], ValueError)
+    assert d_ids[0] is not None and d_ids[2] is not None
+
+    # Clashes with an existing dataset
+    d_ids, errors = datareg.registrar.dataset.register_many(specs[:1])
+    assert list(errors.keys()) == [0]
+    assert d_ids == [None]
+
+    # sqlite serializes the writers, so nobody can register in between
+    if datareg.db_connection._dialect == "sqlite":
+        return
+
+    # Another writer registers a clashing dataset after the clashes were
+    # checked
+    other = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    dataset = datareg.registrar.dataset
+    insert_many_rows = dataset._insert_many_rows
+
+    def _insert_after_other(conn, todo, exec_rows, now):
+        if not hasattr(_insert_after_other, "done"):
+            _insert_after_other.done = True
+            _insert_dataset_entry(other, _NAME + "_late", "0.0.1",
+                                  location_type="meta_only")
+        return insert_many_rows(conn, todo, exec_rows, now)
+
+    monkeypatch.setattr(dataset, "_insert_many_rows", _insert_after_other)
+    d_ids, errors = dataset.register_many(
+        [
+            {"name": _NAME + "_late", "version": "0.0.1",
+             "location_type": "meta_only"},
+            {"name": _NAME + "_other", "version": "0.0.1",
+             "location_type": "meta_only"},
+        ]
+    )
+    assert list(errors.keys()) == [0]
+    assert isinstance(errors[0], ValueError)
+    assert d_ids[0] is None and d_ids[1] is not None
+
+
+def test_register_dataset_compressed_configuration(dummy_file):
+    """
+    A configuration is stored compressed, left out of the default listing
+    and returned decompressed when asked for (also after a modify).
+    """
+
+    _NAME = "DESC:datasets:test_register_dataset_compressed_configuration"
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    config = "catalog:\n" + "".join(f"  - healpix: {i}\n" for i in range(2000))
+    config_file = tmp_src_dir / "access_api_configuration.yaml"
+    config_file.write_text(config)
+
+    d_id, e_id = datareg.registrar.dataset.register(
+        _NAME,
+        "0.0.1",
+        location_type="dummy",
+        access_api_configuration=str(config_file),
+        execution_configuration=str(config_file),
+    )
+
+    dataset_table = datareg.registrar.dataset._get_table_metadata("dataset")
+
+    def _stored():
+        stmt = sqlalchemy.select(dataset_table.c.access_api_configuration).where(
+            dataset_table.c.dataset_id == d_id
+        )
+        with datareg.db_connection.engine.connect() as conn:
+            return conn.execute(stmt).scalar_one()
+
+    assert _stored().startswith("zlib:")
+    assert len(_stored()) < len(config)
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.query.find_datasets(filters=[f])
+    assert "dataset.access_api_configuration" not in results
+    results = datareg.query.find_datasets(
+        ["dataset.access_api_configuration"], filters=[f]
+    )
+    assert results["dataset.access_api_configuration"] == [config]
+
+    # Every other way of reading the entries decompresses too
+    entry = datareg.registrar.dataset.find_entry(d_id)
+    assert entry.access_api_configuration == config
+    assert datareg.registrar.execution.find_entry(e_id).configuration == config
+    history = datareg.query.get_replace_history(
+        _NAME, "0.0.1", entry.owner, entry.owner_type
+    )
+    assert history["dataset.access_api_configuration"] == [config]
+
+    datareg.registrar.dataset.modify(d_id, {"access_api_configuration": config * 2})
+    assert _stored().startswith("zlib:")
+    results = datareg.query.find_datasets(
+        ["dataset.access_api_configuration"], filters=[f]
+    )
+    assert results["dataset.access_api_configuration"] == [config * 2]
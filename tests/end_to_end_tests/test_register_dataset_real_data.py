@@ -1,6 +1,10 @@
 import os
+import shlex
+import threading
 
+import dataregistry_cli.cli as cli
 import pytest
+import sqlalchemy
 from database_test_utils import (
     _insert_dataset_entry,
     _replace_dataset_entry,
@@ -8,7 +12,14 @@ from database_test_utils import (
 )  # noqa
 
 from dataregistry import DataRegistry
-from dataregistry.exceptions import DataRegistryRootDirBadState
+from dataregistry.exceptions import (
+    DataRegistryIngestCancelled,
+    DataRegistryRootDirBadState,
+)
+from dataregistry.registrar import ingest_util
+from dataregistry.registrar.ingest_job import IngestJob
+from dataregistry.registrar.dataset_util import get_dataset_status
+from dataregistry.registrar.registrar_util import _journal_path
 from dataregistry.schema import DEFAULT_NAMESPACE
 
 
@@ -310,3 +321,371 @@ def test_registering_data_already_there(dummy_file, link, dest):
             relative_path=dest,
             location_type="dataregistry",
         )
+
+
+def test_register_many(dummy_file):
+    """
+    Register a batch of datasets with `register_many()`, copying real data
+    for some of them, with a couple of bad entries mixed in.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:datasets:test_register_many"
+
+    specs = [
+        {
+            "name": _NAME + "_file",
+            "version": "0.0.1",
+            "old_location": str(tmp_src_dir / "file1.txt"),
+            "keywords": ["simulation", "observation"],
+        },
+        {
+            "name": _NAME + "_directory",
+            "version": "0.0.1",
+            "old_location": str(tmp_src_dir / "directory1"),
+        },
+        # Bad version string
+        {"name": _NAME + "_bad", "version": "not_a_version"},
+        # Two version bumps of the same dataset build on each other
+        {"name": _NAME + "_bump", "version": "minor", "location_type": "dummy"},
+        {"name": _NAME + "_bump", "version": "minor", "location_type": "dummy"},
+        # Clashes with the first entry
+        {
+            "name": _NAME + "_file",
+            "version": "0.0.1",
+            "location_type": "dummy",
+        },
+        # Data does not exist
+        {
+            "name": _NAME + "_missing",
+            "version": "0.0.1",
+            "old_location": str(tmp_src_dir / "not_a_file.txt"),
+        },
+        # A bump builds on an explicit version earlier in the batch
+        {"name": _NAME + "_mixed", "version": "1.0.0", "location_type": "dummy"},
+        {"name": _NAME + "_mixed", "version": "patch", "location_type": "dummy"},
+    ]
+
+    d_ids, errors = datareg.registrar.dataset.register_many(specs, max_workers=2)
+
+    assert len(d_ids) == len(specs)
+    assert sorted(errors.keys()) == [2, 5, 6]
+    assert isinstance(errors[5], ValueError)
+    assert isinstance(errors[6], FileNotFoundError)
+    for i in errors.keys():
+        assert d_ids[i] is None
+
+    # Check what was registered
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_ids[0])
+    results = datareg.find_datasets(
+        property_names=["dataset.name", "dataset.data_org", "dataset.nfiles",
+                        "dataset.status", "keyword.keyword"],
+        filters=[f],
+        collapse_keywords=True,
+    )
+    assert results["dataset.name"] == [_NAME + "_file"]
+    assert results["dataset.data_org"] == ["file"]
+    assert results["dataset.status"] == [1]
+    assert list(results["keyword.keyword"][0]) == ["observation", "simulation"]
+    assert os.path.isfile(datareg.get_dataset_absolute_path(d_ids[0]))
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_ids[1])
+    results = datareg.find_datasets(
+        property_names=["dataset.data_org", "dataset.nfiles", "execution.name"],
+        filters=[f],
+    )
+    assert results["dataset.data_org"] == ["directory"]
+    assert results["dataset.nfiles"] == [1]
+    assert results["execution.name"] == [
+        f"for_dataset_{_NAME}_directory-0.0.1"
+    ]
+    assert os.path.isdir(datareg.get_dataset_absolute_path(d_ids[1]))
+
+    f = datareg.query.gen_filter("dataset.name", "==", _NAME + "_bump")
+    results = datareg.find_datasets(
+        property_names=["dataset.dataset_id", "dataset.version_string"],
+        filters=[f],
+    )
+    versions = dict(
+        zip(results["dataset.dataset_id"], results["dataset.version_string"])
+    )
+    assert versions == {d_ids[3]: "0.1.0", d_ids[4]: "0.2.0"}
+
+    f = datareg.query.gen_filter("dataset.name", "==", _NAME + "_mixed")
+    results = datareg.find_datasets(
+        property_names=["dataset.dataset_id", "dataset.version_string"],
+        filters=[f],
+    )
+    versions = dict(
+        zip(results["dataset.dataset_id"], results["dataset.version_string"])
+    )
+    assert versions == {d_ids[7]: "1.0.0", d_ids[8]: "1.0.1"}
+
+
+def test_register_bump_generated_path_taken(dummy_file):
+    """
+    A generated `relative_path` with a bumped version can already be taken by
+    another dataset (e.g., an entry made before `.gen_paths` was reserved)
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:datasets:test_register_bump_generated_path_taken"
+
+    datareg.registrar.dataset.register(
+        _NAME, "0.0.1", old_location=str(tmp_src_dir / "directory1")
+    )
+    d_id, _ = datareg.registrar.dataset.register(
+        _NAME + "_other",
+        "0.0.1",
+        location_type="dummy",
+        relative_path="test_register_bump_generated_path_taken",
+    )
+    dataset_table = datareg.registrar.dataset._get_table_metadata("dataset")
+    with datareg.db_connection.engine.connect() as conn:
+        conn.execute(
+            sqlalchemy.update(dataset_table)
+            .where(dataset_table.c.dataset_id == d_id)
+            .values(relative_path=os.path.join(".gen_paths", f"{_NAME}_0.0.2"))
+        )
+        conn.commit()
+
+    with pytest.raises(ValueError, match="is taken by"):
+        datareg.registrar.dataset.register(
+            _NAME, "patch", old_location=str(tmp_src_dir / "directory1")
+        )
+
+
+@pytest.mark.parametrize("ingest_mode", ["hardlink", "auto"])
+def test_register_ingest_mode(dummy_file, ingest_mode):
+    """Register real data with a zero-copy `ingest_mode`"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = f"DESC:datasets:test_register_ingest_mode_{ingest_mode}"
+
+    d_id, _ = datareg.registrar.dataset.register(
+        _NAME,
+        "0.0.1",
+        old_location=str(tmp_src_dir / "directory1"),
+        ingest_mode=ingest_mode,
+    )
+
+    f = datareg.Query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.Query.find_datasets(["dataset.ingest_mode"], [f])
+    assert len(results["dataset.ingest_mode"]) == 1
+    if ingest_mode == "hardlink":
+        assert results["dataset.ingest_mode"][0] == "hardlink"
+    else:
+        assert results["dataset.ingest_mode"][0] in [
+            "reflink",
+            "copy_file_range",
+            "copy",
+        ]
+
+    with pytest.raises(ValueError, match="ingest_mode"):
+        datareg.registrar.dataset.register(
+            _NAME + "_bad",
+            "0.0.1",
+            old_location=str(tmp_src_dir / "directory1"),
+            ingest_mode="teleport",
+        )
+
+
+def test_register_manifest(dummy_file):
+    """Registering real data records a per-file manifest"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:datasets:test_register_manifest"
+
+    d_id, _ = datareg.registrar.dataset.register(
+        _NAME,
+        "0.0.1",
+        old_location=str(tmp_src_dir / "directory1"),
+        checksum=True,
+    )
+
+    f = datareg.Query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.Query.find_datasets(
+        [
+            "dataset.nfiles",
+            "dataset_manifest.relative_path",
+            "dataset_manifest.size",
+            "dataset_manifest.digest",
+        ],
+        [f],
+    )
+
+    nfiles = results["dataset.nfiles"][0]
+    assert len(results["dataset_manifest.relative_path"]) == nfiles
+    for path, size, digest in zip(
+        results["dataset_manifest.relative_path"],
+        results["dataset_manifest.size"],
+        results["dataset_manifest.digest"],
+    ):
+        assert size == os.path.getsize(tmp_src_dir / "directory1" / path)
+        assert len(digest) == 64
+
+
+@pytest.mark.parametrize("use_cli", [False, True])
+def test_register_resume(dummy_file, monkeypatch, use_cli):
+    """
+    Interrupt copying the data of a dataset, then resume the registration,
+    which only copies the files that were not copied before.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    datareg.registrar.dataset.copy_workers = 1
+
+    _NAME = f"DESC:datasets:test_register_resume_{use_cli}"
+
+    src = tmp_src_dir / f"resume_{use_cli}"
+    src.mkdir()
+    for i in range(10):
+        (src / f"file{i}.txt").write_text(f"file {i}")
+
+    # Fail after a few files have been copied
+    copied = []
+    interrupt = [True]
+    _ingest_file = ingest_util._ingest_file
+
+    def _interrupted(src_file, dst_file, *args):
+        if interrupt[0] and len(copied) == 4:
+            raise OSError("interrupted")
+        copied.append(src_file)
+        return _ingest_file(src_file, dst_file, *args)
+
+    monkeypatch.setattr(ingest_util, "_ingest_file", _interrupted)
+    with pytest.raises(Exception, match="interrupted"):
+        datareg.registrar.dataset.register(
+            _NAME, "0.0.1", old_location=str(src), keywords=["simulation"]
+        )
+
+    f = datareg.query.gen_filter("dataset.name", "==", _NAME)
+    results = datareg.query.find_datasets(["dataset.dataset_id"], [f])
+    d_id = results["dataset.dataset_id"][0]
+    entry = datareg.registrar.dataset.find_entry(d_id)
+    assert not get_dataset_status(entry.status, "valid")
+
+    # Resume, copying only the remaining files
+    copied.clear()
+    interrupt[0] = False
+    if use_cli:
+        cmd = f"resume {d_id}"
+        cmd += f" --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+        cli.main(shlex.split(cmd))
+    else:
+        datareg.registrar.dataset.resume(d_id)
+
+    assert len(copied) == 6
+    entry = datareg.registrar.dataset.find_entry(d_id)
+    assert get_dataset_status(entry.status, "valid")
+    assert entry.nfiles == 10
+
+    dest = datareg.query.get_dataset_absolute_path(d_id)
+    for i in range(10):
+        assert open(os.path.join(dest, f"file{i}.txt")).read() == f"file {i}"
+    assert not os.path.exists(
+        _journal_path(
+            d_id,
+            schema=datareg.registrar.dataset._schema,
+            root_dir=str(tmp_root_dir),
+        )
+    )
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.query.find_datasets(
+        ["dataset_manifest.relative_path", "keyword.keyword"], [f]
+    )
+    assert len(set(results["dataset_manifest.relative_path"])) == 10
+    assert set(results["keyword.keyword"]) == {"simulation"}
+
+    # Nothing left to resume
+    with pytest.raises(ValueError, match="already valid"):
+        datareg.registrar.dataset.resume(d_id)
+
+
+def test_register_background(dummy_file, capsys):
+    """
+    Register datasets in the background, waiting for one to complete and
+    cancelling another (which is then resumed).
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+    datareg.registrar.dataset.ingest_workers = 1
+
+    src = tmp_src_dir / "background"
+    src.mkdir()
+    for i in range(10):
+        (src / f"file{i}.txt").write_text(f"file {i}")
+
+    # Register, and wait for the ingest to finish
+    job = datareg.registrar.dataset.register(
+        "DESC:datasets:test_register_background", "0.0.1",
+        old_location=str(src), background=True,
+    )
+    assert isinstance(job, IngestJob)
+    d_id, e_id = job.wait()
+    assert d_id == job.dataset_id and e_id is not None
+    assert job.progress() == ("done", 10, 10, 60, 60)
+    entry = datareg.registrar.dataset.find_entry(d_id)
+    assert get_dataset_status(entry.status, "valid")
+    assert entry.nfiles == 10
+
+    # Hold up the only worker, so the next job stays queued
+    gate = threading.Event()
+    datareg.registrar.dataset._submit(IngestJob(None, None), lambda job: gate.wait())
+    job = datareg.registrar.dataset.register(
+        "DESC:datasets:test_register_background_cancel", "0.0.1",
+        old_location=str(src), background=True, keywords=["simulation"],
+    )
+    entry = datareg.registrar.dataset.find_entry(job.dataset_id)
+    assert not get_dataset_status(entry.status, "valid")
+    assert job.progress().state == "queued"
+    assert job in datareg.registrar.dataset.jobs()
+
+    # Cancel it before any data is copied
+    assert job.cancel()
+    gate.set()
+    with pytest.raises(DataRegistryIngestCancelled):
+        job.wait()
+    assert job.cancelled()
+    assert job.progress() == ("cancelled", 0, 10, 0, 60)
+    assert datareg.registrar.dataset.jobs() == []
+    entry = datareg.registrar.dataset.find_entry(job.dataset_id)
+    assert not get_dataset_status(entry.status, "valid")
+
+    # The cancelled ingest is listed as interrupted
+    jobs = datareg.registrar.dataset.list_ingest_jobs()
+    assert len(jobs) == 1
+    assert jobs[0]["dataset_id"] == job.dataset_id
+    assert jobs[0]["name"] == "DESC:datasets:test_register_background_cancel"
+    assert jobs[0]["state"] == "interrupted"
+    assert (jobs[0]["files_done"], jobs[0]["num_files"]) == (0, 10)
+
+    capsys.readouterr()
+    cmd = f"jobs --namespace {DEFAULT_NAMESPACE} --root_dir {str(tmp_root_dir)}"
+    cli.main(shlex.split(cmd))
+    out = capsys.readouterr().out
+    assert "test_register_background_cancel" in out
+    assert "interrupted" in out
+
+    # Which can be completed
+    datareg.registrar.dataset.resume(job.dataset_id)
+    entry = datareg.registrar.dataset.find_entry(job.dataset_id)
+    assert get_dataset_status(entry.status, "valid")
+    assert datareg.registrar.dataset.list_ingest_jobs() == []
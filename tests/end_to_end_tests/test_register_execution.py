@@ -6,7 +6,13 @@ import yaml
 from dataregistry import DataRegistry
 from dataregistry.schema import DEFAULT_NAMESPACE
 
-from database_test_utils import _insert_execution_entry, dummy_file
+from dataregistry.exceptions import DataRegistryMissingInputs
+
+from database_test_utils import (
+    _insert_dataset_entry,
+    _insert_execution_entry,
+    dummy_file,
+)
 
 
 def _make_dummy_config(tmp_src_dir):
@@ -52,3 +58,56 @@ def test_register_execution_with_config_file(dummy_file):
     assert len(results["execution.execution_id"]) == 1
     assert results["execution.configuration"][0] is not None
     assert results["execution.execution_id"][0] == ex_id
+
+
+def test_register_execution_with_inputs(dummy_file):
+    """
+    Register an execution with many input datasets, and make sure inputs
+    that do not exist are reported (and nothing is registered)
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    d_ids = [
+        _insert_dataset_entry(datareg, f"DESC:datasets:execution_input_{i}", "0.0.1")
+        for i in range(5)
+    ]
+
+    ex_id = _insert_execution_entry(
+        datareg, "execution_with_inputs", "Many inputs", input_datasets=d_ids
+    )
+
+    f = datareg.query.gen_filter("dependency.execution_id", "==", ex_id)
+    results = datareg.query.find_datasets(["dependency.input_id"], [f])
+    assert sorted(results["dependency.input_id"]) == d_ids
+
+    # Missing inputs
+    with pytest.raises(DataRegistryMissingInputs) as e:
+        _insert_execution_entry(
+            datareg,
+            "execution_with_missing_inputs",
+            "Some inputs do not exist",
+            input_datasets=d_ids + [10000000, 10000001],
+        )
+    assert e.value.missing == {"input_datasets": [10000000, 10000001]}
+
+    f = datareg.query.gen_filter(
+        "execution.name", "==", "execution_with_missing_inputs"
+    )
+    results = datareg.query.find_datasets(["execution.execution_id"], [f])
+    assert len(results.get("execution.execution_id", [])) == 0
+
+    # Datasets registered in bulk are rejected individually
+    d_ids, errors = datareg.registrar.dataset.register_many(
+        [
+            {"name": "DESC:datasets:execution_output_0", "version": "0.0.1",
+             "location_type": "dummy", "input_datasets": d_ids[:1]},
+            {"name": "DESC:datasets:execution_output_1", "version": "0.0.1",
+             "location_type": "dummy", "input_datasets": [10000000]},
+        ]
+    )
+    assert d_ids[0] is not None and d_ids[1] is None
+    assert isinstance(errors[1], DataRegistryMissingInputs)
+
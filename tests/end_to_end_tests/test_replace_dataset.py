@@ -1,4 +1,9 @@
+import os
+import shutil
+
 from dataregistry import DataRegistry
+from dataregistry.registrar import ingest_util
+from dataregistry.registrar.registrar_util import _trash_path
 from dataregistry.schema import DEFAULT_NAMESPACE
 
 from database_test_utils import dummy_file
@@ -219,3 +224,175 @@ def test_replacing_non_overwritable_dataset(dummy_file):
             "DESC:dataset:test_replacing_non_overwritable_dataset",
             "0.0.1",
         )
+
+
+def test_replace_history_and_current(dummy_file):
+    """
+    Replace a dataset a few times, then make sure `get_replace_history()`
+    walks the whole chain and `get_current()` maps every iteration to the
+    latest one.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:dataset:test_replace_history_and_current"
+    _OWNER = "test_replace_history_owner"
+
+    d_ids = [
+        _insert_dataset_entry(
+            datareg, _NAME, "0.0.1", owner=_OWNER, owner_type="group",
+            is_overwritable=True,
+        )
+    ]
+    for i in range(3):
+        d_ids.append(
+            _replace_dataset_entry(
+                datareg, _NAME, "0.0.1", owner=_OWNER, owner_type="group",
+                is_overwritable=True,
+            )
+        )
+
+    # An unrelated dataset that was never replaced
+    other_id = _insert_dataset_entry(
+        datareg, _NAME + "_other", "0.0.1", owner=_OWNER, owner_type="group"
+    )
+
+    history = datareg.query.get_replace_history(_NAME, "0.0.1", _OWNER, "group")
+    assert history["dataset.dataset_id"] == d_ids
+    assert history["dataset.replace_iteration"] == [0, 1, 2, 3]
+    assert history["dataset.replace_id"][:-1] == d_ids[1:]
+
+    current = datareg.query.get_current(d_ids + [other_id, 1000000])
+    for d_id in d_ids:
+        assert current[d_id] == d_ids[-1]
+    assert current[other_id] == other_id
+    assert current[1000000] is None
+
+    # Unknown datasets have no history
+    history = datareg.query.get_replace_history(
+        _NAME + "_missing", "0.0.1", _OWNER, "group", return_format="DataFrame"
+    )
+    assert len(history) == 0
+
+
+@pytest.mark.parametrize("incremental", ["mtime", "digest"])
+def test_replace_incremental(dummy_file, incremental):
+    """
+    An incremental replace links the files that did not change from the
+    previous iteration, and copies the rest.
+    """
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = f"DESC:dataset:test_replace_incremental_{incremental}"
+
+    # First iteration
+    src = tmp_src_dir / f"incremental_{incremental}"
+    (src / "sub").mkdir(parents=True)
+    for name in ["a.txt", "b.txt", os.path.join("sub", "c.txt")]:
+        (src / name).write_text(f"original {name}")
+
+    d_id, _ = datareg.registrar.dataset.register(
+        _NAME,
+        "0.0.1",
+        old_location=str(src),
+        is_overwritable=True,
+        checksum=incremental == "digest",
+    )
+    dest = datareg.query.get_dataset_absolute_path(d_id)
+    inode = {n: os.stat(os.path.join(dest, n)).st_ino for n in ["a.txt", "b.txt"]}
+
+    # Second iteration, with one changed and one new file
+    src2 = tmp_src_dir / f"incremental_{incremental}_2"
+    shutil.copytree(src, src2)
+    (src2 / "b.txt").write_text("changed b.txt")
+    (src2 / "sub" / "d.txt").write_text("new d.txt")
+
+    d_id2, _ = datareg.registrar.dataset.replace(
+        _NAME,
+        "0.0.1",
+        old_location=str(src2),
+        is_overwritable=True,
+        incremental=incremental,
+    )
+
+    assert datareg.query.get_dataset_absolute_path(d_id2) == dest
+    assert not os.path.exists(
+        os.path.join(
+            os.path.dirname(dest), f".{os.path.basename(dest)}_DATAREG_staging"
+        )
+    )
+    for name in ["a.txt", os.path.join("sub", "c.txt")]:
+        assert open(os.path.join(dest, name)).read() == f"original {name}"
+    assert open(os.path.join(dest, "b.txt")).read() == "changed b.txt"
+    assert open(os.path.join(dest, "sub", "d.txt")).read() == "new d.txt"
+
+    # Unchanged files were linked, changed ones copied
+    assert os.stat(os.path.join(dest, "a.txt")).st_ino == inode["a.txt"]
+    assert os.stat(os.path.join(dest, "b.txt")).st_ino != inode["b.txt"]
+
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id2)
+    results = datareg.query.find_datasets(
+        ["dataset.ingest_mode", "dataset.nfiles"], [f]
+    )
+    assert results["dataset.ingest_mode"][0] == "copy,reuse"
+    assert results["dataset.nfiles"][0] == 4
+
+    # The previous iteration is tagged as deleted and replaced
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.query.find_datasets(
+        ["dataset.delete_date", "dataset.replace_id"], [f]
+    )
+    assert results["dataset.replace_id"][0] == d_id2
+    assert results["dataset.delete_date"][0] is not None
+
+    # Its data is in the trash, until purged
+    trash_dir = _trash_path(
+        d_id, schema=datareg.db_connection.schema, root_dir=str(tmp_root_dir)
+    )
+    assert os.path.isdir(trash_dir)
+    datareg.registrar.dataset.purge_trash(older_than=0)
+    assert not os.path.exists(trash_dir)
+
+
+def test_replace_failure_keeps_old_data(dummy_file, monkeypatch):
+    """A replace that fails to copy the new data leaves the old data intact"""
+
+    # Establish connection to database
+    tmp_src_dir, tmp_root_dir = dummy_file
+    datareg = DataRegistry(root_dir=str(tmp_root_dir), namespace=DEFAULT_NAMESPACE)
+
+    _NAME = "DESC:dataset:test_replace_failure_keeps_old_data"
+
+    d_id, _ = datareg.registrar.dataset.register(
+        _NAME,
+        "0.0.1",
+        old_location=str(tmp_src_dir / "directory1"),
+        is_overwritable=True,
+    )
+    dest = datareg.query.get_dataset_absolute_path(d_id)
+    before = sorted(os.listdir(dest))
+
+    def _bad_copy(src, dst):
+        raise OSError("copy failed")
+
+    monkeypatch.setattr(ingest_util, "copyfile", _bad_copy)
+
+    with pytest.raises(Exception, match="copy failed"):
+        datareg.registrar.dataset.replace(
+            _NAME,
+            "0.0.1",
+            old_location=str(tmp_src_dir / "directory1"),
+            is_overwritable=True,
+        )
+
+    # Old data (and entry) untouched, no staging left behind
+    assert sorted(os.listdir(dest)) == before
+    assert sorted(os.listdir(os.path.dirname(dest))) == [os.path.basename(dest)]
+    f = datareg.query.gen_filter("dataset.dataset_id", "==", d_id)
+    results = datareg.query.find_datasets(["dataset.delete_date"], [f])
+    assert results["dataset.delete_date"][0] is None
@@ -0,0 +1,58 @@
+import pytest
+from dataregistry.exceptions import DataRegistryException
+from dataregistry.join_planner import JoinPlanner, JoinStep
+from dataregistry.schema import load_schema
+
+planner = JoinPlanner(load_schema())
+
+
+@pytest.mark.parametrize(
+    "tables,ans",
+    [
+        (["dataset"], []),
+        (["execution"], [JoinStep("execution", "execution_id", "dataset", "execution_id")]),
+        (
+            ["keyword"],
+            [
+                JoinStep("dataset_keyword", "dataset_id", "dataset", "dataset_id"),
+                JoinStep("keyword", "keyword_id", "dataset_keyword", "keyword_id"),
+            ],
+        ),
+        (
+            ["execution_alias", "dataset_alias"],
+            [
+                JoinStep("dataset_alias", "dataset_id", "dataset", "dataset_id"),
+                JoinStep("execution", "execution_id", "dataset", "execution_id"),
+                JoinStep("execution_alias", "execution_id", "execution", "execution_id"),
+            ],
+        ),
+        (["dependency"], [JoinStep("dependency", "input_id", "dataset", "dataset_id")]),
+    ],
+)
+def test_join_plan(tables, ans):
+    """Make sure the minimal set of joins, with explicit ON columns, is found"""
+
+    assert planner.plan(tables) == ans
+
+    # Order of the required tables must not change the plan
+    assert planner.plan(list(reversed(tables))) == ans
+
+
+def test_join_plan_dependency_output():
+    """Dependencies of the execution that produced the dataset"""
+
+    steps = planner.plan(["dependency", "execution"], dependency_direction="output")
+    assert steps == [
+        JoinStep("dependency", "execution_id", "dataset", "execution_id"),
+        JoinStep("execution", "execution_id", "dataset", "execution_id"),
+    ]
+
+    with pytest.raises(ValueError, match="dependency_direction"):
+        planner.plan(["dependency"], dependency_direction="sideways")
+
+
+def test_join_plan_unreachable():
+    """Tables with no foreign key path to `dataset` cannot be joined"""
+
+    with pytest.raises(DataRegistryException, match="No join path"):
+        planner.plan(["provenance"])
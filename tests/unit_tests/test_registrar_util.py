@@ -1,13 +1,20 @@
+import errno
 import os
 
 import pytest
+from dataregistry.registrar import registrar_util
 from dataregistry.registrar.registrar_util import (
+    _compress_configuration,
+    _decompress_configuration,
     _form_dataset_path,
+    _move_to_trash,
     _name_from_relpath,
     _parse_version_string,
     _read_configuration_file,
     get_directory_info,
     _relpath_from_name,
+    _staging_path,
+    _swap_in,
 )
 
 
@@ -79,6 +86,29 @@ def test_directory_info():
     assert total_size > 0
 
 
+@pytest.mark.parametrize("workers", [1, 4])
+def test_directory_info_per_directory(tmp_path, workers):
+    """Per directory counts from the (parallel) tree scan"""
+
+    for i in range(3):
+        d = tmp_path / f"dir{i}" / "sub"
+        d.mkdir(parents=True)
+        for j in range(i + 1):
+            (d / f"file{j}.txt").write_text("x" * 10)
+    (tmp_path / "top.txt").write_text("x" * 5)
+
+    num_files, total_size, dir_counts = get_directory_info(
+        str(tmp_path), per_directory=True, workers=workers
+    )
+
+    assert num_files == 7
+    assert total_size == 65
+    assert dir_counts[""] == (1, 5)
+    for i in range(3):
+        assert dir_counts[f"dir{i}"] == (0, 0)
+        assert dir_counts[os.path.join(f"dir{i}", "sub")] == (i + 1, 10 * (i + 1))
+
+
 @pytest.mark.parametrize(
     "owner_type,owner,rel_path,root_dir,ans",
     [
@@ -156,6 +186,26 @@ def test_read_file(tmpdir, nchars, max_config_length, ans):
     with pytest.raises(FileNotFoundError, match="not found"):
         _read_configuration_file("i_dont_exist.txt", 10)
 
+
+@pytest.mark.parametrize(
+    "contents,compressed",
+    [
+        ("short: 1", False),
+        ("run:\n" + "  - step: calibrate\n" * 500, True),
+        ("zlib:not compressed", False),
+    ],
+)
+def test_compress_configuration(contents, compressed):
+    """Configurations that shrink are compressed, and all round trip"""
+
+    stored = _compress_configuration(contents)
+
+    assert (stored != contents) == compressed
+    if compressed:
+        assert len(stored) < len(contents)
+    assert _decompress_configuration(stored) == contents
+    assert _decompress_configuration(None) is None
+
 @pytest.mark.parametrize(
     "name,version_string,ans",
     [
@@ -185,3 +235,120 @@ def test_name_from_relpath(rel_path,ans):
     """Make sure names are extracted from paths correctly"""
 
     assert _name_from_relpath(rel_path) == ans
+
+
+@pytest.mark.parametrize("exchange", [True, False])
+@pytest.mark.parametrize("is_dir", [True, False])
+def test_swap_in(tmp_path, monkeypatch, exchange, is_dir):
+    """Swap staged data in place of existing data"""
+
+    if not exchange:
+
+        def _unsupported(path, other_path):
+            raise OSError("not supported")
+
+        monkeypatch.setattr(registrar_util, "_rename_exchange", _unsupported)
+
+    def _write(path, text):
+        if is_dir:
+            path.mkdir(parents=True)
+            (path / "file.txt").write_text(text)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+
+    def _read(path):
+        return (path / "file.txt").read_text() if is_dir else path.read_text()
+
+    dest = tmp_path / "data"
+    staged = tmp_path / "staging" / "data"
+
+    # Nothing to swap out
+    _write(staged, "first")
+    assert _swap_in(str(staged), str(dest)) is None
+    assert _read(dest) == "first"
+    assert not os.path.exists(staged.parent)
+
+    # Swap out the old data, which is left in the staging directory
+    _write(staged, "second")
+    old = _swap_in(str(staged), str(dest))
+    assert old == str(staged.parent)
+    assert _read(dest) == "second"
+    assert os.listdir(old) == ["data_DATAREG_old" if not exchange else "data"]
+
+
+def test_swap_in_interrupted(tmp_path, monkeypatch):
+    """Swapping again completes a swap (without exchange) stopped halfway"""
+
+    def _unsupported(path, other_path):
+        raise OSError("not supported")
+
+    monkeypatch.setattr(registrar_util, "_rename_exchange", _unsupported)
+
+    dest = tmp_path / "data"
+    staged = tmp_path / "staging" / "data"
+    dest.write_text("old")
+    staged.parent.mkdir()
+    staged.write_text("new")
+
+    # Stop between the two renames
+    rename = os.rename
+
+    def _rename(src, dst):
+        if src == str(staged):
+            raise KeyboardInterrupt
+        rename(src, dst)
+
+    monkeypatch.setattr(registrar_util.os, "rename", _rename)
+    with pytest.raises(KeyboardInterrupt):
+        _swap_in(str(staged), str(dest))
+    assert not os.path.exists(dest)
+    monkeypatch.setattr(registrar_util.os, "rename", rename)
+
+    old = _swap_in(str(staged), str(dest))
+    assert dest.read_text() == "new"
+    assert (tmp_path / "staging" / "data_DATAREG_old").read_text() == "old"
+    assert old == str(staged.parent)
+
+
+def test_staging_path():
+    """Staged data keeps its name, in a hidden sibling directory"""
+
+    staged = _staging_path(os.path.join("a", "b", "data.txt"))
+    assert staged == os.path.join("a", "b", ".data.txt_DATAREG_staging", "data.txt")
+
+
+@pytest.mark.parametrize(
+    "err,exists",
+    [
+        (errno.EXDEV, False),
+        (errno.EXDEV, True),
+        (errno.EACCES, False),
+        (errno.EACCES, True),
+    ],
+)
+def test_move_to_trash_failure(tmp_path, monkeypatch, err, exists):
+    """
+    A failed rename leaves a trash directory that was already there, and
+    raises the rename error (returns False across devices)
+    """
+
+    data = tmp_path / "data.txt"
+    data.write_text("data")
+    trash_dir = tmp_path / "trash"
+    if exists:
+        trash_dir.mkdir()
+        (trash_dir / "other.txt").write_text("other")
+
+    def _rename(src, dst):
+        raise OSError(err, os.strerror(err))
+
+    monkeypatch.setattr(registrar_util.os, "rename", _rename)
+    if err == errno.EXDEV:
+        assert not _move_to_trash(str(data), str(trash_dir))
+    else:
+        with pytest.raises(OSError) as e:
+            _move_to_trash(str(data), str(trash_dir))
+        assert e.value.errno == err
+    assert os.path.isdir(trash_dir) == exists
+    assert data.read_text() == "data"
@@ -1,6 +1,12 @@
+import builtins
+import hashlib
 import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+from dataregistry.registrar import ingest_util
 from dataregistry.registrar.registrar_util import _copy_data
 
 
@@ -71,3 +77,310 @@ def test_copy_directory(dummy_file):
         p = tmp_dest_dir / "tmpdir" / "tmpdir2" / "dummy_file_within_folder.txt"
         assert os.path.isfile(p)
         assert p.read_text() == "dummy file within folder"
+
+
+@pytest.mark.parametrize("copy_workers,large_file_workers", [(1, 1), (4, 2)])
+def test_copy_directory_parallel(tmp_path, copy_workers, large_file_workers):
+    """
+    Copy a directory with many files of different sizes, with some large
+    enough to go to the large file pool.
+    """
+
+    src = tmp_path / "source"
+    for i in range(5):
+        d = src / f"dir{i}" / "sub"
+        d.mkdir(parents=True)
+        for j in range(10):
+            (d / f"file{j}.txt").write_text("x" * (j * 100))
+    (src / "top.txt").write_text("top level file")
+
+    dest = tmp_path / "dest"
+    _copy_data(
+        "directory",
+        str(src),
+        str(dest),
+        copy_workers=copy_workers,
+        large_file_workers=large_file_workers,
+        large_file_threshold=500,
+    )
+
+    assert (dest / "top.txt").read_text() == "top level file"
+    for i in range(5):
+        for j in range(10):
+            p = dest / f"dir{i}" / "sub" / f"file{j}.txt"
+            assert p.read_text() == "x" * (j * 100)
+
+
+def test_copy_directory_rollback(dummy_file, monkeypatch):
+    """
+    If copying a directory fails part way, the original data at the
+    destination should be restored from the `_DATAREG_backup`.
+    """
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+
+    # Original data at the destination
+    dest = tmp_dest_dir / "tmpdir"
+    dest.mkdir()
+    (dest / "original.txt").write_text("original")
+
+    def _bad_copyfile(src, dst):
+        raise OSError("copy failed")
+
+    monkeypatch.setattr(ingest_util, "copyfile", _bad_copyfile)
+
+    with pytest.raises(Exception, match="copy failed"):
+        _copy_data("directory", str(tmp_src_dir / "tmpdir"), str(dest))
+
+    assert (dest / "original.txt").read_text() == "original"
+    assert not os.path.exists(str(dest) + "_DATAREG_backup")
+
+
+def test_ingest_hardlink(dummy_file):
+    """Hard linked files share their inode with the source"""
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+
+    src = tmp_src_dir / "tmpdir"
+    dest = tmp_dest_dir / "tmpdir"
+    mode, _ = _copy_data("directory", str(src), str(dest), ingest_mode="hardlink")
+
+    assert mode == "hardlink"
+    name = os.path.join("tmpdir2", "dummy_file_within_folder.txt")
+    assert os.stat(src / name).st_ino == os.stat(dest / name).st_ino
+
+
+def test_ingest_move(dummy_file):
+    """Moving (on the same device) renames the source into place"""
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+
+    src = tmp_src_dir / "dummy_standalone_file.txt"
+    dest = tmp_dest_dir / "dummy_standalone_file.txt"
+    mode, _ = _copy_data("file", str(src), str(dest), ingest_mode="move")
+
+    assert mode == "move"
+    assert not os.path.exists(src)
+    assert dest.read_text() == "dummy stand alone file"
+
+
+@pytest.mark.parametrize("ingest_mode", ["reflink", "auto"])
+def test_ingest_fallback(dummy_file, monkeypatch, ingest_mode):
+    """Zero-copy modes fall back to copying when they are not supported"""
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+
+    def _unsupported(src, dst):
+        raise OSError("not supported")
+
+    monkeypatch.setattr(ingest_util, "_reflink", _unsupported)
+    monkeypatch.setattr(ingest_util, "_copy_file_range", _unsupported)
+
+    dest = tmp_dest_dir / "dummy_standalone_file.txt"
+    mode, _ = _copy_data(
+        "file",
+        str(tmp_src_dir / "dummy_standalone_file.txt"),
+        str(dest),
+        ingest_mode=ingest_mode,
+    )
+
+    assert mode == "copy"
+    assert dest.read_text() == "dummy stand alone file"
+
+
+@pytest.mark.parametrize("ingest_mode", ["copy", "hardlink"])
+def test_copy_manifest(dummy_file, ingest_mode):
+    """The manifest lists each file, with digests computed during the copy"""
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+
+    src = tmp_src_dir / "tmpdir"
+    (src / "big.dat").write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+
+    _, manifest = _copy_data(
+        "directory",
+        str(src),
+        str(tmp_dest_dir / "tmpdir"),
+        ingest_mode=ingest_mode,
+        checksum=True,
+    )
+
+    assert [m.relative_path for m in manifest] == [
+        "big.dat",
+        os.path.join("tmpdir2", "dummy_file_within_folder.txt"),
+    ]
+    for m in manifest:
+        data = (src / m.relative_path).read_bytes()
+        assert m.size == len(data)
+        assert m.mtime == os.stat(src / m.relative_path).st_mtime
+        assert m.digest == hashlib.sha256(data).hexdigest()
+        assert (tmp_dest_dir / "tmpdir" / m.relative_path).read_bytes() == data
+
+    # Without checksums there are no digests
+    _, manifest = _copy_data(
+        "file",
+        str(tmp_src_dir / "dummy_standalone_file.txt"),
+        str(tmp_dest_dir / "dummy_standalone_file.txt"),
+    )
+    assert len(manifest) == 1
+    assert manifest[0].relative_path == "dummy_standalone_file.txt"
+    assert manifest[0].digest is None
+
+
+@pytest.mark.parametrize("ingest_mode", ["hardlink", "move"])
+def test_copy_without_reading(dummy_file, monkeypatch, ingest_mode):
+    """Hard linking or moving data (without checksums) never reads it"""
+
+    tmp_src_dir, tmp_dest_dir = dummy_file
+    src = tmp_src_dir / "tmpdir"
+    (src / "big.dat").write_bytes(os.urandom(1024 * 1024))
+
+    opened = []
+    builtin_open = builtins.open
+
+    def _open(file, mode="r", *args, **kwargs):
+        opened.append((str(file), mode))
+        return builtin_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", _open)
+
+    mode, manifest = _copy_data(
+        "directory",
+        str(src),
+        str(tmp_dest_dir / "tmpdir"),
+        ingest_mode=ingest_mode,
+    )
+
+    assert mode == ingest_mode
+    assert len(manifest) == 2
+    assert [
+        f for f, m in opened
+        if f.startswith((str(src), str(tmp_dest_dir))) and "r" in m
+    ] == []
+
+
+def test_ingest_journal(tmp_path):
+    """A journal interrupted mid write can still be read"""
+
+    path = str(tmp_path / "journal" / "1.jsonl")
+    journal = ingest_util._IngestJournal(path, keywords=["a"])
+    journal.start(source="/src", dest="/dest")
+    for i in range(3):
+        journal.record(
+            ingest_util.ManifestEntry(f"file{i}", i, 1.5, None), "copy"
+        )
+
+    # Open journals are in use, and cannot be resumed elsewhere
+    if ingest_util.fcntl is not None:
+        assert ingest_util._IngestJournal.in_use(path)
+        with pytest.raises(ValueError, match="in use"):
+            ingest_util._IngestJournal(path).reopen()
+    journal.close()
+    assert not ingest_util._IngestJournal.in_use(path)
+
+    # Partial final line
+    with open(path, "a") as f:
+        f.write('{"relative_path": "fi')
+
+    journal, done = ingest_util._IngestJournal.read(path)
+    assert journal.header == {"keywords": ["a"], "source": "/src", "dest": "/dest"}
+    assert sorted(done.keys()) == ["file0", "file1", "file2"]
+    assert done["file2"] == (ingest_util.ManifestEntry("file2", 2, 1.5, None), "copy")
+
+    journal.remove()
+    assert not os.path.exists(path)
+
+
+def test_concurrent_ingest_modes(tmp_path):
+    """
+    Many ingests at once, from a pool of threads (while something else keeps
+    changing the umask), all give the data the same permissions.
+    """
+
+    src = tmp_path / "source"
+    for i in range(4):
+        d = src / f"dir{i}"
+        d.mkdir(parents=True)
+        for j in range(20):
+            (d / f"file{j}.txt").write_text(f"file {j}")
+    (src / "file.txt").write_text("single file")
+    os.chmod(src / "dir0", 0o755)
+
+    stop = threading.Event()
+
+    def _flip_umask():
+        while not stop.is_set():
+            for mask in [0o000, 0o077, 0o022]:
+                os.umask(mask)
+
+    def _ingest(i):
+        dest = tmp_path / "dest" / f"owner{i}" / "ingest"
+        if i % 2 == 0:
+            _copy_data("directory", str(src), str(dest), copy_workers=4,
+                       checksum=i % 4 == 0)
+        else:
+            _copy_data("file", str(src / "file.txt"), str(dest / "file.txt"),
+                       checksum=i % 4 == 1)
+        return dest
+
+    old_umask = os.umask(0o022)
+    flipper = threading.Thread(target=_flip_umask)
+    flipper.start()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            dests = list(pool.map(_ingest, range(32)))
+    finally:
+        stop.set()
+        flipper.join()
+        os.umask(old_umask)
+
+    for i, dest in enumerate(dests):
+        # Directories made to hold the data
+        for d in [dest.parent, dest]:
+            if i % 2 == 1 or d == dest.parent:
+                assert stat.S_IMODE(os.stat(d).st_mode) == 0o750
+
+        # The data itself
+        if i % 2 == 1:
+            files = [dest / "file.txt"]
+        else:
+            files = list(dest.rglob("*.txt"))
+            assert len(files) == 81
+            # Copied directories keep the permissions of the source
+            assert stat.S_IMODE(os.stat(dest / "dir0").st_mode) == 0o755
+        for f in files:
+            assert stat.S_IMODE(os.stat(f).st_mode) == 0o640
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parallel_rmtree(tmp_path, workers, monkeypatch):
+    """
+    Remove a tree with many files (in several unlink batches), without
+    following the symbolic links within it.
+    """
+
+    monkeypatch.setattr(ingest_util, "_PURGE_BATCH_SIZE", 7)
+
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("keep me")
+
+    tree = tmp_path / "tree"
+    for i in range(3):
+        d = tree / f"dir{i}" / "sub"
+        d.mkdir(parents=True)
+        for j in range(20):
+            (d / f"file{j}.txt").write_text("x" * j)
+    os.symlink(outside, tree / "dir0" / "link_to_outside")
+
+    num_files, total_size = ingest_util._parallel_rmtree(str(tree), workers=workers)
+
+    assert not os.path.lexists(tree)
+    assert num_files == 3 * 20 + 1
+    assert total_size == 3 * sum(range(20)) + len(str(outside))
+    assert (outside / "keep.txt").read_text() == "keep me"
+
+    # A single file
+    (tmp_path / "single.txt").write_text("single")
+    assert ingest_util._parallel_rmtree(str(tmp_path / "single.txt")) == (1, 6)
+    assert not os.path.exists(tmp_path / "single.txt")